@@ -1,8 +1,10 @@
-from Bio import pairwise2
-from Bio.pairwise2 import format_alignment
+from alignment_utils import EBF2, make_aligner, alignment_stats
 
-ebf2 = """MSGIFRFSGDEDCLLGGSMYLSPGSCPGVYYPARKRLRVAATSFYSGFEEKQTSIDVLPEECLFEILRRLPSGQERSACACVSKHWLNLLSSISRSEVNESSVQDVEEGEGFLSRSLEGKKATDLRLAAIAVGTSSRGGLGKLQIRGSGFESKVTDVGLGAVAHGCPSLRIVSLWNLPAVSDLGLSEIARSCPMIEKLDLSRCPGITDSGLVAIAENCVNLSDLTIDSCSGVGNEGLRAIARRCVNLRSISIRSCPRIGDQGVAFLLAQAGSYLTKVKLQMLNVSGLSLAVIGHYGAAVTDLVLHGLQGVNEKGFWVMGNAKGLKKLKSLSVMSCRGMTDVGLEAVGNGCPDLKHVSLNKCLLVSGKGLVALAKSALSLESLKLEECHRINQFGLMGFLMNCGSKLKAFSLANCLGISDFNSESSLPSPSCSSLRSLSIRCCPGFGDASLAFLGKFCHQLQDVELCGLNGVTDAGVRELLQSNNVGLVKVNLSECINVSDNTVSAISVCHGRTLESLNLDGCKNITNASLVAVAKNCYSVNDLDISNTLVSDHGIKALASSPNHLNLQVLSIGGCSSITDKSKACIQKLGRTLLGLNIQRCGRISSSTVDTLLENLWRCDILY"""
+ebf2 = EBF2
 ebf1 = """MSQIFSFAGENDFYRRGAIYPNPKDASLLLSLGSFADVYFPPSKRSRVVAPTIFSAFEKKPVSIDVLPDECLFEIFRRLSGPQERSACAFVSKQWLTLVSSIRQKEIDVPSKITEDGDDCEGCLSRSLDGKKATDVRLAAIAVGTAGRGGLGKLSIRGSNSAKVSDLGLRSIGRSCPSLGSLSLWNVSTITDNGLLEIAEGCAQLEKLELNRCSTITDKGLVAIAKSCPNLTELTLEACSRIGDEGLLAIARSCSKLKSVSIKNCPLVRDQGIASLLSNTTCSLAKLKLQMLNVTDVSLAVVGHYGLSITDLVLAGLSHVSEKGFWVMGNGVGLQKLNSLTITACQGVTDMGLESVGKGCPNMKKAIISKSPLLSDNGLVSFAKASLSLESLQLEECHRVTQFGFFGSLLNCGEKLKAFSLVNCLSIRDLTTGLPASSHCSALRSLSIRNCPGFGDANLAAIGKLCPQLEDIDLCGLKGITESGFLHLIQSSLVKINFSGCSNLTDRVISAITARNGWTLEVLNIDGCSNITDASLVSIAANCQILSDLDISKCAISDSGIQALASSDKLKLQILSVAGCSMVTDKSLPAIVGLGSTLLGLNLQQCRSISNSTVDFLVERLYKCDILS"""
 
-alignments = pairwise2.align.globalxx(ebf2, ebf1)
-print(format_alignment(*alignments[0]))
\ No newline at end of file
+aligner = make_aligner("globalxx")
+print(aligner.align(ebf2, ebf1)[0])
+
+stats = alignment_stats(ebf2, ebf1, mode="blosum62")
+print(f"Identidad: {stats['identity']:.2f}% | Cobertura: {stats['coverage']:.2f}% | Score: {stats['score']}")
\ No newline at end of file
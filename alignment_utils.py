@@ -0,0 +1,207 @@
+import argparse
+import hashlib
+import os
+import sqlite3
+from concurrent.futures import ProcessPoolExecutor
+
+DB_PATH = "species_records.db"
+CACHE_PATH = os.path.join(".cache", "alignments.db")
+
+EBF2 = """MSGIFRFSGDEDCLLGGSMYLSPGSCPGVYYPARKRLRVAATSFYSGFEEKQTSIDVLPEECLFEILRRLPSGQERSACACVSKHWLNLLSSISRSEVNESSVQDVEEGEGFLSRSLEGKKATDLRLAAIAVGTSSRGGLGKLQIRGSGFESKVTDVGLGAVAHGCPSLRIVSLWNLPAVSDLGLSEIARSCPMIEKLDLSRCPGITDSGLVAIAENCVNLSDLTIDSCSGVGNEGLRAIARRCVNLRSISIRSCPRIGDQGVAFLLAQAGSYLTKVKLQMLNVSGLSLAVIGHYGAAVTDLVLHGLQGVNEKGFWVMGNAKGLKKLKSLSVMSCRGMTDVGLEAVGNGCPDLKHVSLNKCLLVSGKGLVALAKSALSLESLKLEECHRINQFGLMGFLMNCGSKLKAFSLANCLGISDFNSESSLPSPSCSSLRSLSIRCCPGFGDASLAFLGKFCHQLQDVELCGLNGVTDAGVRELLQSNNVGLVKVNLSECINVSDNTVSAISVCHGRTLESLNLDGCKNITNASLVAVAKNCYSVNDLDISNTLVSDHGIKALASSPNHLNLQVLSIGGCSSITDKSKACIQKLGRTLLGLNIQRCGRISSSTVDTLLENLWRCDILY"""
+
+# globalxx: equivalente a pairwise2.align.globalxx (coincidencia 1, sin penalizaciones)
+# blosum62: local con BLOSUM62 y gaps afines, como BLASTP
+# dna: nucleótidos con puntuación de BLASTN (2/-3, gaps -5/-2), global sin penalizar gaps en los extremos
+ALIGN_MODES = ("globalxx", "blosum62", "dna")
+
+_worker_aligners = {}
+
+
+def make_aligner(mode="blosum62"):
+    # Biopython se importa al primer alineamiento, no al importar el módulo
+    from Bio.Align import PairwiseAligner, substitution_matrices
+
+    aligner = PairwiseAligner()
+    if mode == "globalxx":
+        aligner.mode = "global"
+        aligner.match_score = 1
+        aligner.mismatch_score = 0
+        aligner.open_gap_score = 0
+        aligner.extend_gap_score = 0
+    elif mode == "blosum62":
+        aligner.mode = "local"
+        aligner.substitution_matrix = substitution_matrices.load("BLOSUM62")
+        aligner.open_gap_score = -11
+        aligner.extend_gap_score = -1
+    elif mode == "dna":
+        aligner.mode = "global"
+        aligner.match_score = 2
+        aligner.mismatch_score = -3
+        aligner.open_gap_score = -5
+        aligner.extend_gap_score = -2
+        aligner.end_gap_score = 0
+    else:
+        raise ValueError(f"Modo de alineamiento desconocido: {mode}")
+    return aligner
+
+
+def _get_aligner(mode):
+    aligner = _worker_aligners.get(mode)
+    if aligner is None:
+        aligner = _worker_aligners[mode] = make_aligner(mode)
+    return aligner
+
+
+def alignment_stats(query, target, mode="blosum62", score_only=False):
+    """Score, % identidad (estilo BLAST) y % cobertura de query sobre target.
+
+    Con score_only solo se calcula el score; en globalxx ese score es el
+    número de coincidencias y la identidad se da respecto a len(query).
+    """
+    aligner = _get_aligner(mode)
+    if score_only:
+        score = aligner.score(query, target)
+        identity = 100.0 * score / len(query) if mode == "globalxx" else None
+        return {"score": score, "identity": identity, "coverage": None}
+
+    # Solo el primer alineamiento óptimo; no se enumeran todos como en pairwise2
+    alignment = aligner.align(query, target)[0]
+    q_blocks, t_blocks = alignment.aligned
+    if len(q_blocks) == 0:
+        return {"score": alignment.score, "identity": 0.0, "coverage": 0.0}
+
+    identities = 0
+    aligned_cols = 0
+    for (qs, qe), (ts, te) in zip(q_blocks, t_blocks):
+        identities += sum(a == b for a, b in zip(query[qs:qe], target[ts:te]))
+        aligned_cols += qe - qs
+    gaps = sum(
+        (q_blocks[i + 1][0] - q_blocks[i][1]) + (t_blocks[i + 1][0] - t_blocks[i][1])
+        for i in range(len(q_blocks) - 1)
+    )
+    return {
+        "score": alignment.score,
+        "identity": 100.0 * identities / (aligned_cols + gaps),
+        "coverage": 100.0 * (q_blocks[-1][1] - q_blocks[0][0]) / len(query),
+    }
+
+
+def _cache_key(query, target, mode, score_only):
+    raw = f"{mode}:{int(score_only)}:{query}:{target}"
+    return hashlib.sha1(raw.encode()).hexdigest()
+
+
+def _open_cache(cache_path=CACHE_PATH):
+    os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+    conn = sqlite3.connect(cache_path)
+    conn.execute("CREATE TABLE IF NOT EXISTS alignments (key TEXT PRIMARY KEY, score REAL, identity REAL, coverage REAL)")
+    return conn
+
+
+def _cached_stats(conn, keys):
+    cached = {}
+    for i in range(0, len(keys), 500):
+        chunk = keys[i:i + 500]
+        rows = conn.execute(
+            f"SELECT key, score, identity, coverage FROM alignments WHERE key IN ({','.join('?' * len(chunk))})", chunk
+        )
+        cached.update({r[0]: {"score": r[1], "identity": r[2], "coverage": r[3]} for r in rows})
+    return cached
+
+
+def _store_stats(conn, keyed_results):
+    with conn:
+        conn.executemany(
+            "INSERT OR REPLACE INTO alignments VALUES (?, ?, ?, ?)",
+            [(key, r["score"], r["identity"], r["coverage"]) for key, r in keyed_results],
+        )
+
+
+def _align_task(args):
+    query, target, mode, score_only = args
+    return alignment_stats(query, target, mode, score_only)
+
+
+def align_pairs(pairs, mode="blosum62", score_only=False, workers=None, cache_path=CACHE_PATH, progress=None):
+    """Alinea {clave: (query, target)} en paralelo; los pares ya calculados salen de la caché en disco.
+
+    Devuelve {clave: estadísticas}. progress(hechos, total) se llama tras cada
+    alineamiento nuevo; si lanza una excepción, lo ya alineado queda guardado.
+    """
+    keys = {pid: _cache_key(query, target, mode, score_only) for pid, (query, target) in pairs.items()}
+    conn = _open_cache(cache_path)
+    try:
+        stats = _cached_stats(conn, list(set(keys.values())))
+        # Un alineamiento por clave de caché aunque varios pares tengan las mismas secuencias
+        pending = {}
+        for pid, key in keys.items():
+            if key not in stats:
+                pending.setdefault(key, pairs[pid])
+        if pending:
+            tasks = [(query, target, mode, score_only) for query, target in pending.values()]
+            computed = []
+            try:
+                with ProcessPoolExecutor(max_workers=workers) as pool:
+                    results = pool.map(_align_task, tasks, chunksize=max(1, len(tasks) // 64))
+                    for done, (key, r) in enumerate(zip(pending, results), start=1):
+                        computed.append((key, r))
+                        if progress:
+                            progress(done, len(pending))
+            finally:
+                _store_stats(conn, computed)
+            stats.update(computed)
+    finally:
+        conn.close()
+    return {pid: stats[key] for pid, key in keys.items()}
+
+
+def align_many(query, targets, mode="blosum62", score_only=False, workers=None, cache_path=CACHE_PATH):
+    """Alinea query contra {id: secuencia} en paralelo; los pares ya calculados salen de la caché."""
+    return align_pairs({tid: (query, seq) for tid, seq in targets.items()}, mode, score_only, workers, cache_path)
+
+
+def recompute_identity(protein_fasta, db_path=DB_PATH, query=EBF2, mode="blosum62", workers=None):
+    """Recalcula percent_identity de todos los registros con secuencia en protein_fasta."""
+    from fasta_index_utils import open_indexed_fasta
+
+    proteome = open_indexed_fasta(protein_fasta)
+    conn = sqlite3.connect(db_path)
+    try:
+        records = conn.execute("SELECT id, ortholog_id FROM Records WHERE ortholog_id != ''").fetchall()
+        targets = {}
+        missing = []
+        for record_id, ortholog_id in records:
+            seq = proteome.get(ortholog_id)
+            if seq:
+                targets[record_id] = seq.rstrip("*")
+            else:
+                missing.append(ortholog_id)
+
+        results = align_many(query, targets, mode=mode, workers=workers)
+        with conn:
+            conn.executemany(
+                "UPDATE Records SET percent_identity = ? WHERE id = ?",
+                [(round(r["identity"], 3), record_id) for record_id, r in results.items() if r["identity"] is not None],
+            )
+    finally:
+        conn.close()
+    return results, missing
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Recalcula % identidad de EBF2 frente a todos los ortólogos")
+    parser.add_argument("protein_fasta", help="FASTA con las proteínas ortólogas (IDs como en ortholog_id)")
+    parser.add_argument("--db", default=DB_PATH)
+    parser.add_argument("--mode", choices=("globalxx", "blosum62"), default="blosum62")
+    parser.add_argument("--workers", type=int, default=None)
+    args = parser.parse_args()
+
+    results, missing = recompute_identity(args.protein_fasta, args.db, mode=args.mode, workers=args.workers)
+    for record_id, r in sorted(results.items()):
+        print(f"{record_id}\t{r['identity']:.3f}\t{r['coverage']:.2f}")
+    if missing:
+        print("Sin secuencia en el FASTA:", ", ".join(missing))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,139 @@
+import argparse
+import os
+import sqlite3
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+
+from gff_store_utils import gff_store_path, resolve_genes
+
+DB_PATH = "species_records.db"
+MAPPING_PATH = "annotations.tsv"
+
+
+def load_mapping(path=MAPPING_PATH):
+    """Lee el mapeo especie -> anotación (TSV: species<TAB>ruta_gff3)."""
+    mapping = {}
+    if not os.path.exists(path):
+        return mapping
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if line.startswith("#") or not line.strip():
+                continue
+            species, _, annotation = line.rstrip("\n").partition("\t")
+            if annotation:
+                mapping[species.strip()] = annotation.strip()
+    return mapping
+
+
+def save_mapping(mapping, path=MAPPING_PATH):
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("# species\tannotation\n")
+        for species, annotation in sorted(mapping.items()):
+            f.write(f"{species}\t{annotation}\n")
+
+
+def group_records_by_annotation(records, mapping):
+    # records: (id, species, ortholog_id); un grupo por archivo de anotación
+    groups = defaultdict(list)
+    missing = []
+    for record_id, species, ortholog_id in records:
+        annotation = mapping.get(species)
+        if not ortholog_id:
+            continue
+        if annotation:
+            groups[annotation].append((record_id, ortholog_id))
+        else:
+            missing.append(species)
+    return groups, missing
+
+
+def resolve_annotation(annotation, items):
+    """Exones y 3'UTR de todos los IDs de una anotación (se ejecuta en un proceso aparte)."""
+    results = []
+    not_found = []
+    # pyarrow solo se carga al lanzar el lote, no al importar la página
+    from parquet_cache_utils import batch_gene_architecture
+
+    # Una sola pasada por archivo y todos los IDs resueltos a su gen de una vez; los modelos
+    # se montan solo con las filas de esos genes, leídas del caché Parquet
+    db_path = gff_store_path(annotation)
+    genes = resolve_genes(db_path, [ortholog_id for _, ortholog_id in items])
+    architecture = batch_gene_architecture(db_path, [gene["id"] for gene in genes.values() if gene])
+
+    for record_id, ortholog_id in items:
+        gene = genes[ortholog_id]
+        arch = architecture[gene["id"]] if gene else None
+        if arch is None:
+            not_found.append(ortholog_id)
+            continue
+        num_exons, utr3_len = arch
+        results.append((num_exons, str(utr3_len), record_id))
+    return annotation, results, not_found
+
+
+def write_architecture(results, db_path=DB_PATH):
+    conn = sqlite3.connect(db_path)
+    try:
+        with conn:
+            conn.executemany("UPDATE Records SET exons = ?, utr3 = ? WHERE id = ?", results)
+    finally:
+        conn.close()
+
+
+def run_batch(mapping, db_path=DB_PATH, workers=None, progress=None):
+    conn = sqlite3.connect(db_path)
+    try:
+        records = conn.execute("SELECT id, species, ortholog_id FROM Records").fetchall()
+    finally:
+        conn.close()
+
+    groups, missing = group_records_by_annotation(records, mapping)
+    updates = []
+    not_found = []
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(resolve_annotation, annotation, items) for annotation, items in groups.items()]
+        try:
+            for done, future in enumerate(futures, start=1):
+                annotation, results, missing_ids = future.result()
+                updates.extend(results)
+                not_found.extend(missing_ids)
+                if progress:
+                    progress(done, len(futures), annotation)
+        except BaseException:
+            # Si el callback de progreso cancela, no se procesan las anotaciones pendientes
+            pool.shutdown(cancel_futures=True)
+            raise
+
+    write_architecture(updates, db_path)
+    return {
+        "updated": len(updates),
+        "annotations": len(groups),
+        "species_without_annotation": sorted(set(missing)),
+        "ids_not_found": not_found,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Rellena exons/utr3 de todos los registros desde sus anotaciones GFF3")
+    parser.add_argument("--mapping", default=MAPPING_PATH, help="TSV species<TAB>ruta_gff3")
+    parser.add_argument("--db", default=DB_PATH)
+    parser.add_argument("--workers", type=int, default=None)
+    args = parser.parse_args()
+
+    mapping = load_mapping(args.mapping)
+    if not mapping:
+        parser.error(f"No hay anotaciones en {args.mapping}")
+
+    summary = run_batch(
+        mapping, args.db, args.workers,
+        progress=lambda done, total, annotation: print(f"[{done}/{total}] {annotation}"),
+    )
+    print(f"Registros actualizados: {summary['updated']} ({summary['annotations']} anotaciones)")
+    if summary["species_without_annotation"]:
+        print("Especies sin anotación:", ", ".join(summary["species_without_annotation"]))
+    if summary["ids_not_found"]:
+        print("IDs no encontrados:", ", ".join(summary["ids_not_found"]))
+
+
+if __name__ == "__main__":
+    main()
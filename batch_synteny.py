@@ -0,0 +1,192 @@
+import argparse
+import sqlite3
+from concurrent.futures import ProcessPoolExecutor
+
+from batch_architecture import MAPPING_PATH, group_records_by_annotation, load_mapping
+from gff_store_utils import connect_store, gff_store_path, resolve_genes
+
+DB_PATH = "species_records.db"
+REFERENCE_SPECIES = "Arabidopsis thaliana"
+REFERENCE_GENE = "AT5G25350"
+
+# Mapa gen/proteína -> ortogrupo, cargado una vez por proceso
+_orthogroups = {}
+
+
+def load_orthogroups(path):
+    """Lee un TSV ortogrupo<TAB>gen o un Orthogroups.tsv de OrthoFinder (genes separados por comas)."""
+    groups = {}
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if line.startswith("#") or not line.strip():
+                continue
+            fields = line.rstrip("\n").split("\t")
+            if fields[0] == "Orthogroup":
+                continue  # cabecera de OrthoFinder
+            group = fields[0]
+            for cell in fields[1:]:
+                for gene in cell.split(","):
+                    gene = gene.strip()
+                    if gene:
+                        groups[gene] = group
+    return groups
+
+
+def _init_worker(orthogroups_path):
+    _orthogroups.update(load_orthogroups(orthogroups_path))
+
+
+def _match_orthogroup(candidates, groups):
+    # El mapa puede usar IDs de transcrito o de proteína (con o sin sufijo de versión)
+    for candidate in candidates:
+        for key in (candidate, candidate.split(".")[0]):
+            if key in groups:
+                return groups[key]
+    return None
+
+
+def _store_orthogroup(conn, gene_name, groups):
+    gene = conn.execute(
+        "SELECT id FROM features WHERE type = 'gene' AND (name = ? OR id = ?) LIMIT 1", (gene_name, gene_name)
+    ).fetchone()
+    if gene is None:
+        return None
+    candidates = [row[0] for row in conn.execute(
+        "SELECT name FROM features WHERE parent = ? AND name IS NOT NULL "
+        "UNION ALL SELECT DISTINCT protein_id FROM features "
+        "WHERE type = 'CDS' AND protein_id IS NOT NULL "
+        "AND (parent = ? OR parent IN (SELECT id FROM features WHERE parent = ?))",
+        (gene[0], gene[0], gene[0]),
+    )]
+    return _match_orthogroup(candidates, groups)
+
+
+def gene_orthogroups(db_path, gene_names, groups=None):
+    """Ortogrupo de cada gen de gene_names (None si no tiene), con una sola conexión al store.
+
+    groups es el mapa de load_orthogroups; por defecto el cargado en el proceso.
+    """
+    groups = _orthogroups if groups is None else groups
+    found = [groups.get(name) for name in gene_names]
+    pending = [i for i, group in enumerate(found) if group is None]
+    if pending:
+        conn = connect_store(db_path)
+        try:
+            for i in pending:
+                found[i] = _store_orthogroup(conn, gene_names[i], groups)
+        finally:
+            conn.close()
+    return found
+
+
+def annotation_orthogroups(annotation, ortholog_ids, flank_genes=10, window_bp=None):
+    """{ortólogo: ortogrupos de sus vecinos} de una anotación (None si el gen no está en ella).
+
+    Los IDs se resuelven a su gen de una vez; vecinos y productos de los
+    vecinos salen del caché Parquet leyendo solo los cromosomas y genes implicados.
+    """
+    # pyarrow solo se carga al lanzar el lote, no al importar la página
+    from parquet_cache_utils import batch_neighbors, gene_products
+
+    db_path = gff_store_path(annotation)
+    genes = resolve_genes(db_path, ortholog_ids)
+    neighbors = batch_neighbors(db_path, [gene["name"] for gene in genes.values() if gene], flank_genes, window_bp)
+
+    names = {name for found in neighbors.values() if found for name in found}
+    group_of = {name: _orthogroups.get(name) for name in names}
+    products = gene_products(db_path, [name for name, group in group_of.items() if group is None])
+    for name, candidates in products.items():
+        group_of[name] = _match_orthogroup(candidates, _orthogroups)
+
+    result = {}
+    for ortholog_id in ortholog_ids:
+        found = neighbors.get(genes[ortholog_id]["name"]) if genes[ortholog_id] else None
+        result[ortholog_id] = None if found is None else {group_of[name] for name in found if group_of.get(name)}
+    return result
+
+
+def neighbor_orthogroups(annotation, ortholog_id, flank_genes=10, window_bp=None):
+    """Ortogrupos de los vecinos del ortólogo (None si el gen no está en la anotación)."""
+    return annotation_orthogroups(annotation, [ortholog_id], flank_genes, window_bp)[ortholog_id]
+
+
+def _annotation_task(args):
+    annotation, items, flank_genes, window_bp = args
+    groups = annotation_orthogroups(annotation, [ortholog_id for _, ortholog_id in items], flank_genes, window_bp)
+    return [(record_id, groups[ortholog_id]) for record_id, ortholog_id in items]
+
+
+def synteny_score(reference_groups, species_groups):
+    shared = len(reference_groups & species_groups)
+    total = len(reference_groups)
+    score = shared / total if total else 0.0
+    return score, shared, total
+
+
+def run_synteny(mapping, orthogroups_path, db_path=DB_PATH, flank_genes=10, window_bp=None,
+                reference_species=REFERENCE_SPECIES, reference_gene=REFERENCE_GENE, workers=None, progress=None):
+    if reference_species not in mapping:
+        raise ValueError(f"Falta la anotación de la referencia ({reference_species}) en el mapeo")
+
+    conn = sqlite3.connect(db_path)
+    try:
+        records = conn.execute("SELECT id, species, ortholog_id FROM Records WHERE ortholog_id != ''").fetchall()
+    finally:
+        conn.close()
+
+    # La referencia también se puntúa: con su propio gen como ortólogo da 1.00
+    groups, _ = group_records_by_annotation(records, mapping)
+    tasks = [(annotation, items, flank_genes, window_bp) for annotation, items in groups.items()]
+    total = sum(len(items) for items in groups.values())
+
+    _init_worker(orthogroups_path)
+    reference_groups = neighbor_orthogroups(mapping[reference_species], reference_gene, flank_genes, window_bp)
+    if reference_groups is None:
+        raise ValueError(f"No se encontró {reference_gene} en la anotación de referencia")
+
+    updates = []
+    not_found = []
+    done = 0
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(orthogroups_path,)) as pool:
+        # Una tarea por anotación: el store y el índice de genes se abren una vez por archivo
+        for results in pool.map(_annotation_task, tasks):
+            for record_id, species_groups in results:
+                if species_groups is None:
+                    not_found.append(record_id)
+                else:
+                    score, shared, size = synteny_score(reference_groups, species_groups)
+                    updates.append((f"{score:.2f} ({shared}/{size})", record_id))
+            done += len(results)
+            if progress:
+                progress(done, total)
+
+    conn = sqlite3.connect(db_path)
+    try:
+        with conn:
+            conn.executemany("UPDATE Records SET synteny = ? WHERE id = ?", updates)
+    finally:
+        conn.close()
+    return {"updated": len(updates), "not_found": not_found, "reference_neighbors": len(reference_groups)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Sintenia de todos los ortólogos frente a Arabidopsis AT5G25350")
+    parser.add_argument("orthogroups", help="TSV ortogrupo<TAB>gen(es) u Orthogroups.tsv de OrthoFinder")
+    parser.add_argument("--mapping", default=MAPPING_PATH, help="TSV species<TAB>ruta_gff3")
+    parser.add_argument("--db", default=DB_PATH)
+    parser.add_argument("--flank", type=int, default=10, help="Genes vecinos a cada lado")
+    parser.add_argument("--window-bp", type=int, default=None, help="Usar una ventana en pb en lugar de --flank")
+    parser.add_argument("--workers", type=int, default=None)
+    args = parser.parse_args()
+
+    summary = run_synteny(
+        load_mapping(args.mapping), args.orthogroups, args.db, args.flank, args.window_bp, workers=args.workers,
+        progress=lambda done, total: print(f"[{done}/{total}]"),
+    )
+    print(f"Registros actualizados: {summary['updated']} (vecinos de referencia con ortogrupo: {summary['reference_neighbors']})")
+    if summary["not_found"]:
+        print("Registros cuyo gen no está en su anotación:", ", ".join(map(str, summary["not_found"])))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,161 @@
+import argparse
+import gzip
+import time
+
+from gff_scan_utils import iter_gff_chunks
+from gff_store_utils import connect_store, gff_store_path, resolve_genes
+from gff_utils import gene_architecture
+from protein_to_gene_utils import gene_id_from_protein
+from upload_cache_utils import open_text
+
+DEFAULT_GFF = "Data/Ostreococcus_lucimarinus.ASM9206v1.61.gff3.gz"
+
+
+# Bucles anteriores de cada helper (una lectura completa del archivo por consulta)
+
+def legacy_exons_utr3(path, gene_id):
+    exons, utr3s = [], []
+    with open_text(path) as f:
+        for line in f:
+            if line.startswith("#"):
+                continue
+            fields = line.strip().split("\t")
+            if len(fields) < 9:
+                continue
+            seqid, source, feature_type, start, end, score, strand, phase, attributes = fields
+            if gene_id in attributes:
+                if feature_type == "exon":
+                    exons.append((int(start), int(end)))
+                elif feature_type == "three_prime_UTR":
+                    utr3s.append((int(start), int(end)))
+    return len(exons), sum(e - s + 1 for s, e in utr3s)
+
+
+def legacy_neighbors(path, gene_id, flank_genes=3):
+    features = []
+    with open_text(path) as f:
+        for line in f:
+            if line.startswith("#") or not line.strip():
+                continue
+            fields = line.strip().split("\t")
+            if len(fields) < 9:
+                continue
+            seqid, source, feature, start, end, score, strand, phase, attributes = fields
+            if feature == "gene":
+                gene_name = ""
+                for attr in attributes.split(";"):
+                    if attr.startswith("ID="):
+                        gene_name = attr.replace("ID=", "").split(":")[-1]
+                        break
+                features.append({"gene": gene_name, "seqid": seqid, "start": int(start), "end": int(end)})
+    features.sort(key=lambda x: x["start"])
+    index = next((i for i, feat in enumerate(features) if gene_id in feat["gene"]), None)
+    if index is None:
+        return None
+    return features[max(0, index - flank_genes):index + 1 + flank_genes]
+
+
+def legacy_protein_to_gene(path, protein_id):
+    with open_text(path) as f:
+        for line in f:
+            if line.startswith("#"):
+                continue
+            fields = line.strip().split("\t")
+            if len(fields) < 9:
+                continue
+            if protein_id in fields[8]:
+                for part in fields[8].split(";"):
+                    if part.startswith("Parent="):
+                        return part.replace("Parent=", "").split(":")[-1]
+    return None
+
+
+def legacy_parse_gff3(path, gene_id):
+    exons = []
+    found_gene = False
+    with open_text(path) as f:
+        for line in f:
+            if line.startswith("#"):
+                continue
+            parts = line.strip().split("\t")
+            if len(parts) != 9:
+                continue
+            seqid, source, feature_type, start, end, score, strand_, phase, attributes = parts
+            attr_dict = {kv.split("=")[0]: kv.split("=")[1] for kv in attributes.split(";") if "=" in kv}
+            if not found_gene and feature_type == "gene" and gene_id in attr_dict.get("ID", ""):
+                found_gene = True
+            if found_gene and feature_type == "exon" and gene_id in attr_dict.get("Parent", ""):
+                exons.append((int(start), int(end)))
+    return sorted(exons)
+
+
+def count_lines(path):
+    opener = gzip.open if path.endswith(".gz") else open
+    with opener(path, "rb") as f:
+        return sum(1 for _ in f)
+
+
+def _timed(fn, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def run_benchmark(path, gene_id, protein_id, repeat=3):
+    lines = count_lines(path)
+    legacy = {
+        "extract_exons_utr3": lambda: legacy_exons_utr3(path, gene_id),
+        "extract_neighbors": lambda: legacy_neighbors(path, gene_id),
+        "find_gene_id_from_protein": lambda: legacy_protein_to_gene(path, protein_id),
+        "parse_gff3": lambda: legacy_parse_gff3(path, gene_id),
+    }
+    results = []
+    total_legacy = 0.0
+    for name, fn in legacy.items():
+        seconds = _timed(fn, repeat)
+        total_legacy += seconds
+        results.append((f"legacy {name}", seconds, lines / seconds))
+    results.append(("legacy: 4 consultas (4 lecturas)", total_legacy, 4 * lines / total_legacy))
+
+    seconds = _timed(lambda: sum(len(c) for c in iter_gff_chunks(path)), repeat)
+    results.append(("iter_gff_chunks (modelo génico)", seconds, lines / seconds))
+
+    # Con el store ya construido las consultas no vuelven a leer el GFF3
+    db_path = gff_store_path(path)
+    seconds = _timed(lambda: (gene_architecture(db_path, gene_id), gene_id_from_protein(db_path, protein_id)), repeat)
+    results.append(("store: arquitectura + proteína", seconds, lines / seconds))
+
+    # Lote de IDs de proteína: uno a uno frente a resolve_genes (consultas IN por bloques)
+    conn = connect_store(db_path)
+    try:
+        proteins = [row[0] for row in conn.execute(
+            "SELECT DISTINCT protein_id FROM features WHERE protein_id IS NOT NULL LIMIT 1000"
+        )]
+    finally:
+        conn.close()
+    seconds = _timed(lambda: [gene_id_from_protein(db_path, p) for p in proteins], repeat)
+    results.append((f"store: {len(proteins)} proteínas, una a una", seconds, lines / seconds))
+    seconds = _timed(lambda: resolve_genes(db_path, proteins), repeat)
+    results.append((f"store: {len(proteins)} proteínas, resolve_genes", seconds, lines / seconds))
+    return lines, results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Throughput del escáner GFF3 frente a los bucles por helper")
+    parser.add_argument("gff", nargs="?", default=DEFAULT_GFF)
+    parser.add_argument("--gene", default="OSTLU_23818")
+    parser.add_argument("--protein", default="ABO93650")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    lines, results = run_benchmark(args.gff, args.gene, args.protein, args.repeat)
+    print(f"{args.gff}: {lines} líneas (mejor de {args.repeat})")
+    for name, seconds, rate in results:
+        print(f"{name:<40} {seconds * 1000:9.1f} ms {rate:>14,.0f} líneas/s")
+
+
+if __name__ == "__main__":
+    main()
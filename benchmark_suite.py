@@ -0,0 +1,227 @@
+import argparse
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+import pandas as pd
+
+from synthetic_genome_utils import SYNTHETIC_DIR, write_synthetic_genome
+
+BENCH_DIR = os.path.join(".cache", "bench")
+BASELINE_PATH = "benchmark_baseline.json"
+DEFAULT_SIZES = (1000, 10000, 100000)
+# Margen antes de marcar una regresión; los tiempos por debajo de MIN_SECONDS se consideran ruido
+TOLERANCE = 0.25
+MIN_SECONDS = 0.005
+METRICS = ("cold_s", "warm_s", "peak_rss_mb")
+
+
+# Casos: helpers sueltos y los flujos completos de la app. Cada uno recibe el
+# dict de write_synthetic_genome y se importa dentro del proceso hijo.
+
+def _extract_neighbors(info):
+    from synteny_utils import extract_neighbors
+    return extract_neighbors(info["gff"], info["gene"])
+
+
+def _extract_exons_utr3(info):
+    from gff_utils import extract_exons_utr3
+    return extract_exons_utr3(info["gff"], info["gene"])
+
+
+def _find_gene_id_from_protein(info):
+    from protein_to_gene_utils import find_gene_id_from_protein
+    return find_gene_id_from_protein(info["gff"], info["protein"])
+
+
+def _extraer_secuencia(info):
+    from sequence_utils import extraer_secuencia
+    return extraer_secuencia(info["gff"], info["genome"], None, info["gene"], "mRNA")
+
+
+def _flow_architecture(info):
+    # Proteína -> gen -> exones y 3'UTR (expanders de arquitectura)
+    from gff_utils import extract_exons_utr3
+    from protein_to_gene_utils import find_gene_id_from_protein
+    return extract_exons_utr3(info["gff"], find_gene_id_from_protein(info["gff"], info["protein"]))
+
+
+def _flow_synteny(info):
+    # Comparación de sintenia A/B con gráfico; ambas "especies" salen del mismo archivo
+    from compare_neighbors_utils import compare_gene_neighbors
+    from protein_to_gene_utils import find_gene_id_from_protein
+    from synteny_utils import extract_neighbors
+    from visual_synteny import plot_synteny_tracks
+    center_a, up_a, down_a = extract_neighbors(info["gff"], info["gene"])
+    center_b, up_b, down_b = extract_neighbors(info["gff"], find_gene_id_from_protein(info["gff"], info["protein"]))
+    shared, _, _ = compare_gene_neighbors(up_a, down_a, up_b, down_b)
+    return plot_synteny_tracks(center_a, up_a, down_a, center_b, up_b, down_b, shared)
+
+
+def _flow_extraction(info):
+    from sequence_utils import extraer_secuencia
+    return [extraer_secuencia(info["gff"], info["genome"], None, info["gene"], tipo)
+            for tipo in ("DNA", "mRNA", "Proteína")]
+
+
+def _flow_multifasta(info):
+    from sequence_utils import write_multifasta
+    with open(os.devnull, "w", encoding="utf-8") as out:
+        return write_multifasta(out, info["gff"], info["genome"], info["sample_genes"])
+
+
+CASES = {
+    "extract_neighbors": _extract_neighbors,
+    "extract_exons_utr3": _extract_exons_utr3,
+    "find_gene_id_from_protein": _find_gene_id_from_protein,
+    "extraer_secuencia": _extraer_secuencia,
+    "flujo arquitectura": _flow_architecture,
+    "flujo sintenia": _flow_synteny,
+    "flujo extracción": _flow_extraction,
+    "flujo multi-FASTA (100 genes)": _flow_multifasta,
+}
+
+
+def _peak_rss_mb():
+    try:
+        import resource
+    except ImportError:  # Windows
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux lo da en KiB, macOS en bytes
+    return peak / 1024 ** 2 if sys.platform == "darwin" else peak / 1024
+
+
+def run_case(name, info, repeat):
+    """Mide un caso en este proceso: primera llamada (construye store/índices) y mejor de repeat en caliente."""
+    fn = CASES[name]
+    t0 = time.perf_counter()
+    fn(info)
+    cold = time.perf_counter() - t0
+    warm = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn(info)
+        warm = min(warm, time.perf_counter() - t0)
+    return {"cold_s": cold, "warm_s": warm, "peak_rss_mb": _peak_rss_mb()}
+
+
+def _run_isolated(name, info, repeat, bench_dir):
+    # Proceso nuevo con su propio .cache/: la primera llamada es realmente en frío y el RSS es solo del caso
+    os.makedirs(bench_dir, exist_ok=True)
+    workdir = tempfile.mkdtemp(dir=bench_dir)
+    try:
+        out = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), "--case", name, "--info", json.dumps(info),
+             "--repeat", str(repeat)],
+            cwd=workdir, capture_output=True, text=True, check=True,
+        )
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def run_suite(sizes=DEFAULT_SIZES, formats=("plain", "gz"), cases=None, repeat=3, seed=0,
+              data_dir=SYNTHETIC_DIR, bench_dir=BENCH_DIR, progress=None):
+    """Ejecuta cada caso sobre genomas sintéticos de cada tamaño y formato; devuelve un DataFrame."""
+    rows = []
+    for n_genes in sizes:
+        for fmt in formats:
+            info = write_synthetic_genome(n_genes, data_dir, seed, gz=fmt == "gz")
+            info["gff"], info["genome"] = os.path.abspath(info["gff"]), os.path.abspath(info["genome"])
+            step = max(1, n_genes // 100)
+            info["sample_genes"] = [f"SYN_{g:06d}" for g in range(1, n_genes + 1, step)][:100]
+            for name in cases or CASES:
+                if progress:
+                    progress(f"{name} · {n_genes} genes · {fmt}")
+                result = _run_isolated(name, info, repeat, bench_dir)
+                rows.append({
+                    "case": name, "genes": n_genes, "format": fmt, "lines": info["lines"], **result,
+                    "lines_per_s": info["lines"] / result["cold_s"],
+                })
+    return pd.DataFrame(rows)
+
+
+def _key(row):
+    return f"{row['case']}|{row['genes']}|{row['format']}"
+
+
+def save_baseline(results, path=BASELINE_PATH):
+    baseline = {_key(row): {m: row[m] for m in METRICS} for row in results.to_dict("records")}
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(baseline, f, indent=1, sort_keys=True)
+
+
+def compare_baseline(results, path=BASELINE_PATH, tolerance=TOLERANCE):
+    """Filas que empeoran más de tolerance respecto a la línea base guardada."""
+    with open(path, encoding="utf-8") as f:
+        baseline = json.load(f)
+    regressions = []
+    for row in results.to_dict("records"):
+        base = baseline.get(_key(row))
+        if base is None:
+            continue
+        for metric in METRICS:
+            old, new = base.get(metric), row[metric]
+            if old is None or new is None:
+                continue
+            floor = MIN_SECONDS if metric.endswith("_s") else 0.0
+            if new - old > max(tolerance * old, floor):
+                regressions.append({"case": row["case"], "genes": row["genes"], "format": row["format"],
+                                    "metric": metric, "baseline": old, "now": new,
+                                    "ratio": new / old if old else float("inf")})
+    return pd.DataFrame(regressions)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Tiempo, pico de RSS y líneas/s de los helpers GFF/FASTA")
+    parser.add_argument("--sizes", default=",".join(map(str, DEFAULT_SIZES)), help="Genes por genoma sintético")
+    parser.add_argument("--formats", default="plain,gz")
+    parser.add_argument("--cases", help=f"Subconjunto separado por comas de: {', '.join(CASES)}")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--baseline", default=BASELINE_PATH)
+    parser.add_argument("--save-baseline", action="store_true", help="Guardar estos resultados como línea base")
+    parser.add_argument("--tolerance", type=float, default=TOLERANCE)
+    parser.add_argument("--csv", help="Guardar los resultados en CSV")
+    # Uso interno: un caso en un proceso aislado
+    parser.add_argument("--case", help=argparse.SUPPRESS)
+    parser.add_argument("--info", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.case:
+        print(json.dumps(run_case(args.case, json.loads(args.info), args.repeat)))
+        return
+
+    cases = [c.strip() for c in args.cases.split(",")] if args.cases else None
+    unknown = [c for c in cases or () if c not in CASES]
+    if unknown:
+        parser.error(f"Casos desconocidos: {', '.join(unknown)}")
+    results = run_suite(
+        [int(s) for s in args.sizes.split(",")], tuple(args.formats.split(",")), cases, args.repeat, args.seed,
+        progress=lambda label: print(f"… {label}", file=sys.stderr, flush=True),
+    )
+    with pd.option_context("display.width", 200, "display.float_format", "{:,.4f}".format):
+        print(results.to_string(index=False))
+    if args.csv:
+        results.to_csv(args.csv, index=False)
+
+    if args.save_baseline:
+        save_baseline(results, args.baseline)
+        print(f"Línea base guardada en {args.baseline}")
+    elif os.path.exists(args.baseline):
+        regressions = compare_baseline(results, args.baseline, args.tolerance)
+        if regressions.empty:
+            print(f"Sin regresiones respecto a {args.baseline} (tolerancia {args.tolerance:.0%})")
+        else:
+            print(f"Regresiones respecto a {args.baseline}:")
+            print(regressions.to_string(index=False))
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,171 @@
+import sqlite3
+import threading
+
+import pandas as pd
+import streamlit as st
+
+from perf_utils import timed
+from records_query_utils import identity_quantiles_sql, records_where
+
+DB_PATH = "species_records.db"
+
+# Serializa las escrituras de este proceso; las lecturas van por conexiones de cada hilo
+_lock = threading.Lock()
+_local = threading.local()
+
+
+def _connect():
+    conn = sqlite3.connect(DB_PATH, check_same_thread=False)
+    conn.execute("PRAGMA journal_mode = WAL")
+    conn.execute("PRAGMA synchronous = NORMAL")
+    conn.execute("PRAGMA busy_timeout = 5000")
+    return conn
+
+
+@st.cache_resource
+def get_connection():
+    from replica_utils import ensure_row_versions
+
+    # Conexión de escritura, compartida por todas las sesiones (escrituras serializadas con _lock)
+    conn = _connect()
+    with conn:
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_records_clade ON Records (clade)")
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_records_species ON Records (species)")
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_records_ortholog ON Records (ortholog_id)")
+    # Versión por fila: el paquete de solo lectura (replica_utils) se actualiza solo con lo que cambió
+    ensure_row_versions(conn)
+    return conn
+
+
+def _reader():
+    # Una conexión de lectura por hilo (cada sesión corre en el suyo): con WAL leen en paralelo
+    conn = getattr(_local, "conn", None)
+    if conn is None:
+        get_connection()  # índices y esquema listos antes de la primera lectura
+        conn = _local.conn = _connect()
+    return conn
+
+
+@st.cache_resource
+def _write_version():
+    # data_version de una conexión propia cambia con cada commit de otra conexión
+    # (scripts por lotes, importador, workers de trabajos en segundo plano)
+    return {"n": 0, "watcher": _connect(), "lock": threading.Lock()}
+
+
+def bump_version():
+    """Invalida los datos memorizados tras cualquier escritura en la base de datos."""
+    with _lock:
+        _write_version()["n"] += 1
+
+
+def _data_version():
+    state = _write_version()
+    with state["lock"]:
+        external = state["watcher"].execute("PRAGMA data_version").fetchone()[0]
+    return state["n"], external
+
+
+@st.cache_data(show_spinner=False)
+def _load_records(version):
+    return pd.read_sql_query("SELECT * FROM Records", _reader())
+
+
+@timed
+def get_all_records():
+    return _load_records(_data_version())
+
+
+@st.cache_data(show_spinner=False)
+def _record_columns(version):
+    return [row[1] for row in _reader().execute("PRAGMA table_info(Records)")]
+
+
+def record_columns():
+    return _record_columns(_data_version())
+
+
+# Consultas filtradas: el filtrado, orden, paginado y agregados se hacen en SQLite
+
+@st.cache_data(show_spinner=False)
+def _query_records(version, filters, sort_by, ascending, limit, offset):
+    if sort_by not in _record_columns(version):
+        raise ValueError(f"Campo desconocido: {sort_by}")
+    where, params = records_where(filters)
+    sql = f"SELECT * FROM Records{where} ORDER BY {sort_by} {'ASC' if ascending else 'DESC'}, id"
+    if limit is not None:
+        sql += " LIMIT ? OFFSET ?"
+        params += [limit, offset]
+    return pd.read_sql_query(sql, _reader(), params=params)
+
+
+def query_records(filters=None, sort_by="id", ascending=True, limit=50, offset=0):
+    return _query_records(_data_version(), filters, sort_by, ascending, limit, offset)
+
+
+@st.cache_data(show_spinner=False)
+def _count_records(version, filters):
+    where, params = records_where(filters)
+    return _reader().execute(f"SELECT COUNT(*) FROM Records{where}", params).fetchone()[0]
+
+
+def count_records(filters=None):
+    return _count_records(_data_version(), filters)
+
+
+@st.cache_data(show_spinner=False)
+def _distinct_values(version, column):
+    if column not in _record_columns(version):
+        raise ValueError(f"Campo desconocido: {column}")
+    rows = _reader().execute(
+        f"SELECT DISTINCT {column} FROM Records WHERE {column} IS NOT NULL ORDER BY {column}"
+    ).fetchall()
+    return [r[0] for r in rows]
+
+
+def distinct_values(column):
+    return _distinct_values(_data_version(), column)
+
+
+@st.cache_data(show_spinner=False)
+def _clade_counts(version, filters):
+    where, params = records_where(filters)
+    sql = f"SELECT clade, COUNT(*) AS count FROM Records{where} GROUP BY clade ORDER BY clade"
+    return pd.read_sql_query(sql, _reader(), params=params)
+
+
+def clade_counts(filters=None):
+    return _clade_counts(_data_version(), filters)
+
+
+@st.cache_data(show_spinner=False)
+def _identity_quantiles(version, filters):
+    where, params = records_where(filters)
+    return pd.read_sql_query(identity_quantiles_sql(where), _reader(), params=params)
+
+
+def identity_quantiles(filters=None):
+    """Cuartiles de % identidad por clado (una fila por clado)."""
+    return _identity_quantiles(_data_version(), filters)
+
+
+def execute_write(sql, params=()):
+    with _lock:
+        conn = get_connection()
+        with conn:
+            conn.execute(sql, params)
+    bump_version()
+
+
+def update_record(record_id, field, value):
+    if field not in record_columns():
+        raise ValueError(f"Campo desconocido: {field}")
+    execute_write(f"UPDATE Records SET {field} = ? WHERE id = ?", (value, record_id))
+
+
+def update_architecture(ortholog_id, num_exons, utr3_len):
+    execute_write("UPDATE Records SET exons = ?, utr3 = ? WHERE ortholog_id = ?", (num_exons, utr3_len, ortholog_id))
+
+
+def export_csv(df):
+    return df.to_csv(index=False).encode('utf-8')
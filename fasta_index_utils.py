@@ -0,0 +1,294 @@
+import gzip
+import hashlib
+import mmap
+import os
+import re
+import shutil
+import struct
+import tempfile
+import threading
+import zlib
+from bisect import bisect_right
+from collections import OrderedDict
+from contextlib import contextmanager
+
+from perf_utils import span
+from upload_cache_utils import evict, is_gzip_file, local_path, touch
+
+FASTA_DIR = os.path.join(".cache", "fasta")
+CHUNK_SIZE = 1 << 20
+
+_COMPLEMENT = bytes.maketrans(b"ACGTRYKMBVDHNacgtrykmbvdhn", b"TGCAYRMKVBHDNtgcayrmkvbhdn")
+# Claves adicionales para buscar proteínas por gen/transcrito en la cabecera
+_HEADER_KEYS = re.compile(r"\b(?:gene|transcript|locus_tag|gene_symbol|GN)[:=]([^\s\]\[;]+)")
+
+# Lectores abiertos (cada uno con su archivo y mmap); al superar el límite se suelta el menos usado
+OPEN_READERS = 8
+_open_readers = OrderedDict()
+_readers_lock = threading.Lock()
+
+
+def reverse_complement(seq):
+    return seq.encode("ascii").translate(_COMPLEMENT)[::-1].decode("ascii")
+
+
+def reverse_complement_bytes(data):
+    return data.translate(_COMPLEMENT)[::-1]
+
+
+def _index_key(path):
+    stat = os.stat(path)
+    raw = f"{os.path.realpath(path)}:{stat.st_size}:{stat.st_mtime_ns}"
+    return hashlib.sha1(raw.encode()).hexdigest()
+
+
+@contextmanager
+def _replacing(path, mode="wb"):
+    """Escribe en un temporal único del mismo directorio y lo renombra a path al terminar.
+
+    Varios procesos pueden indexar el mismo FASTA a la vez sin pisarse: cada
+    uno escribe su temporal y el último os.replace gana (el contenido es el mismo).
+    """
+    fd, tmp_path = tempfile.mkstemp(suffix=".tmp", dir=os.path.dirname(path) or ".")
+    try:
+        with os.fdopen(fd, mode) as out:
+            yield out
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def _is_bgzf(path):
+    with open(path, "rb") as f:
+        header = f.read(18)
+    # Cabecera gzip con subcampo extra "BC" (BGZF)
+    return len(header) == 18 and header[:4] == b"\x1f\x8b\x08\x04" and header[12:14] == b"BC"
+
+
+def build_gzi(path, gzi_path):
+    """Índice de bloques BGZF en formato .gzi de samtools."""
+    entries = []
+    coffset = uoffset = 0
+    with open(path, "rb") as f:
+        while True:
+            header = f.read(18)
+            if len(header) < 18:
+                break
+            bsize = struct.unpack("<H", header[16:18])[0]
+            f.seek(coffset + bsize - 3)
+            isize = struct.unpack("<I", f.read(4))[0]
+            coffset += bsize + 1
+            uoffset += isize
+            if isize:
+                entries.append((coffset, uoffset))
+            f.seek(coffset)
+    # El último bloque no abre ningún tramo nuevo
+    if entries and entries[-1][0] == os.path.getsize(path):
+        entries.pop()
+    with _replacing(gzi_path) as out:
+        out.write(struct.pack("<Q", len(entries)))
+        for c, u in entries:
+            out.write(struct.pack("<QQ", c, u))
+
+
+def build_fai(stream, fai_path, pidx_path=None):
+    """Índice .fai (nombre, longitud, offset, bases/línea, bytes/línea) en una pasada."""
+    records = []
+    keys = []
+    offset = 0
+    current = None
+    for line in stream:
+        length = len(line)
+        if line.startswith(b">"):
+            header = line[1:].decode("utf-8", "replace").strip()
+            name = header.split()[0] if header else ""
+            current = [name, 0, offset + length, 0, 0]
+            records.append(current)
+            if pidx_path:
+                keys.append((name, name))
+                if "." in name:
+                    keys.append((name.rsplit(".", 1)[0], name))
+                for key in _HEADER_KEYS.findall(header):
+                    keys.append((key.split(":")[-1], name))
+        elif current is not None:
+            bases = len(line.rstrip(b"\r\n"))
+            if current[3] == 0:
+                current[3] = bases
+                current[4] = length
+            current[1] += bases
+        offset += length
+
+    if pidx_path:
+        # El .pidx se renombra antes que el .fai: un .fai completo siempre tiene su .pidx
+        with _replacing(pidx_path, "w") as out:
+            for key, name in keys:
+                out.write(f"{key}\t{name}\n")
+    with _replacing(fai_path, "w") as out:
+        for name, seq_len, seq_offset, line_bases, line_width in records:
+            out.write(f"{name}\t{seq_len}\t{seq_offset}\t{line_bases}\t{line_width}\n")
+
+
+class IndexedFasta:
+    """Lector de FASTA (plano o bgzip) por acceso aleatorio sobre mmap."""
+
+    def __init__(self, path, fai_path, gzi_path=None, pidx_path=None):
+        self.path = path
+        self.index = {}
+        with open(fai_path) as f:
+            for line in f:
+                name, seq_len, offset, line_bases, line_width = line.rstrip("\n").split("\t")
+                self.index[name] = (int(seq_len), int(offset), int(line_bases), int(line_width))
+
+        self.keys = {}
+        if pidx_path and os.path.exists(pidx_path):
+            with open(pidx_path) as f:
+                for line in f:
+                    key, name = line.rstrip("\n").split("\t")
+                    self.keys.setdefault(key, name)
+
+        self._file = None
+        self._mm = None
+        self._open()
+
+        self._blocks = None
+        self._block_cache = {}
+        if gzi_path:
+            coffsets, uoffsets = [0], [0]
+            with open(gzi_path, "rb") as f:
+                count = struct.unpack("<Q", f.read(8))[0]
+                for _ in range(count):
+                    c, u = struct.unpack("<QQ", f.read(16))
+                    coffsets.append(c)
+                    uoffsets.append(u)
+            self._blocks = (coffsets, uoffsets)
+
+    def _open(self):
+        self._file = open(self.path, "rb")
+        self._mm = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ) if os.path.getsize(self.path) else b""
+        return self._mm
+
+    def _map(self):
+        # Un lector cerrado con close() que se siga usando se vuelve a abrir
+        return self._mm if self._mm is not None else self._open()
+
+    def __contains__(self, name):
+        return name in self.index
+
+    def _read_block(self, coffset):
+        data = self._block_cache.get(coffset)
+        if data is None:
+            mm = self._map()
+            xlen = struct.unpack("<H", mm[coffset + 10:coffset + 12])[0]
+            bsize = struct.unpack("<H", mm[coffset + 16:coffset + 18])[0]
+            payload = mm[coffset + 12 + xlen:coffset + bsize + 1 - 8]
+            data = zlib.decompress(payload, -15)
+            if len(self._block_cache) > 64:
+                self._block_cache.clear()
+            self._block_cache[coffset] = data
+        return data
+
+    def _read(self, start, end):
+        if self._blocks is None:
+            return self._map()[start:end]
+        coffsets, uoffsets = self._blocks
+        i = bisect_right(uoffsets, start) - 1
+        parts = []
+        pos = start
+        while pos < end and i < len(coffsets):
+            block = self._read_block(coffsets[i])
+            block_start = uoffsets[i]
+            parts.append(block[pos - block_start:end - block_start])
+            pos = block_start + len(block)
+            i += 1
+        return b"".join(parts)
+
+    def _fetch_bytes(self, name, start, end):
+        entry = self.index.get(name)
+        if entry is None:
+            return None
+        seq_len, offset, line_bases, line_width = entry
+        end = seq_len if end is None else min(end, seq_len)
+        start0 = max(start, 1) - 1
+        if start0 >= end or line_bases == 0:
+            return b""
+        first = offset + (start0 // line_bases) * line_width + start0 % line_bases
+        last = offset + ((end - 1) // line_bases) * line_width + (end - 1) % line_bases + 1
+        raw = self._read(first, last)
+        return raw.replace(b"\n", b"").replace(b"\r", b"")
+
+    def fetch(self, name, start=1, end=None):
+        """Secuencia de name entre start y end (1-based, inclusivos)."""
+        raw = self._fetch_bytes(name, start, end)
+        return None if raw is None else raw.decode("ascii")
+
+    def fetch_into(self, buf, pos, name, start, end):
+        """Copia la región en buf[pos:] sin crear cadenas intermedias; devuelve las bases escritas."""
+        raw = self._fetch_bytes(name, start, end)
+        if not raw:
+            return 0
+        buf[pos:pos + len(raw)] = raw
+        return len(raw)
+
+    def get(self, key):
+        name = key if key in self.index else self.keys.get(key)
+        return self.fetch(name) if name else None
+
+    def close(self):
+        mm, self._mm = self._mm, None
+        if isinstance(mm, mmap.mmap):
+            mm.close()
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        self._block_cache.clear()
+
+
+def open_indexed_fasta(file_obj, cache_dir=FASTA_DIR):
+    """Abre un FASTA (ruta, archivo local o subido) creando sus índices la primera vez."""
+    os.makedirs(cache_dir, exist_ok=True)
+    path = local_path(file_obj)
+    key = _index_key(path)
+
+    with _readers_lock:
+        reader = _open_readers.get(key)
+        if reader is not None:
+            _open_readers.move_to_end(key)
+            return reader
+
+    gzi_path = None
+    if is_gzip_file(path):
+        if _is_bgzf(path):
+            gzi_path = os.path.join(cache_dir, key + ".gzi")
+            if not os.path.exists(gzi_path):
+                with span("fasta.build_gzi"):
+                    build_gzi(path, gzi_path)
+        else:
+            # gzip normal no admite acceso aleatorio: se descomprime una vez
+            plain_path = os.path.join(cache_dir, key + ".fa")
+            if not os.path.exists(plain_path):
+                with span("fasta.gunzip"), gzip.open(path, "rb") as src, _replacing(plain_path) as out:
+                    shutil.copyfileobj(src, out, CHUNK_SIZE)
+            path = plain_path
+
+    fai_path = os.path.join(cache_dir, key + ".fai")
+    pidx_path = os.path.join(cache_dir, key + ".pidx")
+    built = not os.path.exists(fai_path)
+    if built:
+        opener = gzip.open if gzi_path else open
+        with span("fasta.build_fai"), opener(path, "rb") as stream:
+            build_fai(stream, fai_path, pidx_path)
+    else:
+        touch(fai_path)
+
+    reader = IndexedFasta(path, fai_path, gzi_path, pidx_path)
+    with _readers_lock:
+        _open_readers[key] = reader
+        # Solo se suelta la referencia: otro hilo puede estar leyendo de ese lector,
+        # y su archivo y mmap se cierran cuando el recolector lo libere
+        for _ in range(len(_open_readers) - OPEN_READERS):
+            _open_readers.popitem(last=False)
+    if built:
+        evict(keep=fai_path)
+    return reader
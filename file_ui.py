@@ -0,0 +1,33 @@
+import os
+
+import streamlit as st
+
+
+def listar_archivos_desde_data(extensiones):
+    carpeta = "data"
+    if not os.path.exists(carpeta):
+        return []
+    return [f for f in os.listdir(carpeta) if any(f.endswith(ext) for ext in extensiones)]
+
+
+# Helper para cargar archivo (de streamlit u open local)
+def cargar_archivo_con_opcion(label, extensiones, key_prefix):
+    fuente = st.radio(f"Selecciona origen del archivo para {label}:", ["Subir desde PC", "Elegir desde carpeta 'data'"], key=key_prefix+"_fuente")
+
+    archivo = None
+    archivo_nombre = None
+
+    if fuente == "Subir desde PC":
+        archivo = st.file_uploader(f"Sube archivo {label} aquí", type=extensiones, key=key_prefix+"_upload")
+        if archivo is not None:
+            archivo_nombre = archivo.name
+    else:
+        archivos = listar_archivos_desde_data(extensiones)
+        archivo_sel = st.selectbox(f"Selecciona archivo {label} desde carpeta 'data'", archivos, key=key_prefix+"_select")
+        if archivo_sel:
+            ruta = os.path.join("data", archivo_sel)
+            archivo = open(ruta, "rb")
+            archivo_nombre = archivo_sel
+
+    return archivo, archivo_nombre, fuente
+
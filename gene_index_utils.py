@@ -0,0 +1,110 @@
+from array import array
+from bisect import bisect_left, bisect_right
+
+from gff_store_utils import get_genes, strip_gene_prefix
+
+# Un índice por store (el nombre del store ya es el hash del GFF)
+_index_cache = {}
+
+
+def build_gene_index(db_path):
+    return index_genes(get_genes(db_path))
+
+
+def index_genes(rows):
+    """Índice a partir de filas (seqid, start, end, strand, name) ordenadas por seqid y start."""
+    seqids = {}
+    by_name = {}
+    for seqid, start, end, strand, name in rows:
+        track = seqids.get(seqid)
+        if track is None:
+            track = seqids[seqid] = {
+                "starts": array("q"),
+                "ends": array("q"),
+                "strands": [],
+                "names": [],
+                "max_len": 0,
+            }
+        pos = (seqid, len(track["names"]))
+        by_name.setdefault(name, pos)
+        # También sin prefijo de gen: "AT5G25350" encuentra "gene-AT5G25350"
+        by_name.setdefault(strip_gene_prefix(name), pos)
+        track["starts"].append(start)
+        track["ends"].append(end)
+        track["strands"].append(strand)
+        track["names"].append(name)
+        track["max_len"] = max(track["max_len"], end - start + 1)
+    return {"seqids": seqids, "by_name": by_name}
+
+
+def get_gene_index(db_path):
+    index = _index_cache.get(db_path)
+    if index is None:
+        index = _index_cache[db_path] = build_gene_index(db_path)
+    return index
+
+
+def _gene_at(track, seqid, i):
+    return {
+        "gene": track["names"][i],
+        "seqid": seqid,
+        "start": track["starts"][i],
+        "end": track["ends"][i],
+        "strand": track["strands"][i],
+    }
+
+
+def locate_gene(index, gene_id):
+    """(seqid, posición) del gen por nombre exacto, con o sin prefijo de gen; None si no está."""
+    gene_id = (gene_id or "").strip()
+    if not gene_id:
+        return None
+    hit = index["by_name"].get(gene_id)
+    if hit is None:
+        hit = index["by_name"].get(strip_gene_prefix(gene_id))
+    return hit
+
+
+def flanking_genes(index, gene_id, k=3):
+    """Gen central y k vecinos a cada lado en el mismo cromosoma.
+
+    Upstream/downstream siguen la hebra del gen central: en hebra "-"
+    upstream son las coordenadas mayores. Ambas listas van en orden de
+    transcripción (upstream del más lejano al más cercano).
+    """
+    hit = locate_gene(index, gene_id)
+    if hit is None:
+        return None, None, None
+    seqid, i = hit
+    track = index["seqids"][seqid]
+    n = len(track["names"])
+
+    left = [_gene_at(track, seqid, j) for j in range(max(0, i - k), i)]
+    right = [_gene_at(track, seqid, j) for j in range(i + 1, min(n, i + 1 + k))]
+    center = _gene_at(track, seqid, i)
+
+    if center["strand"] == "-":
+        return center, right[::-1], left[::-1]
+    return center, left, right
+
+
+def genes_within(index, gene_id, window_bp):
+    """Genes del mismo cromosoma que solapan [start - window_bp, end + window_bp]."""
+    hit = locate_gene(index, gene_id)
+    if hit is None:
+        return None, []
+    seqid, i = hit
+    track = index["seqids"][seqid]
+    center = _gene_at(track, seqid, i)
+
+    win_start = center["start"] - window_bp
+    win_end = center["end"] + window_bp
+    # Cualquier gen que solape empieza como mucho max_len antes de la ventana
+    lo = bisect_left(track["starts"], win_start - track["max_len"])
+    hi = bisect_right(track["starts"], win_end)
+    genes = [
+        _gene_at(track, seqid, j)
+        for j in range(lo, hi)
+        if j != i and track["ends"][j] >= win_start
+    ]
+    return center, genes
@@ -0,0 +1,125 @@
+import csv
+
+import numpy as np
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+except ImportError:  # pyarrow es opcional: sin él se parte cada línea en Python
+    pa = None
+
+from upload_cache_utils import open_text
+
+GFF_COLUMNS = ["seqid", "source", "type", "start", "end", "score", "strand", "phase", "attributes"]
+# Tipos del modelo génico; el resto de filas (chromosome, region, ...) no se parsea
+GENE_MODEL_TYPES = ("gene", "mRNA", "transcript", "exon", "CDS", "five_prime_UTR", "three_prime_UTR")
+ATTRIBUTE_KEYS = ("ID", "Parent", "protein_id", "Name")
+CHUNK_ROWS = 500000
+
+
+def _attributes(attributes, keys):
+    """Columnas {clave: valores} de la columna attributes, con una sola partición por ";".
+
+    Si una clave se repite en la línea gana la primera; NaN/None si no está.
+    """
+    if pa is not None:
+        # Vectorizado en arrow: pares clave=valor aplanados con la fila de la que salen
+        parts = pc.split_pattern(pa.array(attributes, type=pa.string()), ";")
+        rows = pc.list_parent_indices(parts).to_numpy()
+        pairs = pc.split_pattern(parts.flatten(), "=", max_splits=1)
+        has_value = pc.greater(pc.list_value_length(pairs), 1)
+        rows = rows[has_value.to_numpy(zero_copy_only=False)]
+        pairs = pc.filter(pairs, has_value)
+        names = pc.utf8_ltrim_whitespace(pc.list_element(pairs, 0))
+        values = pc.list_element(pairs, 1)
+        columns = {}
+        for key in keys:
+            mask = pc.equal(names, key)
+            column = np.full(len(attributes), np.nan, dtype=object)
+            # En orden inverso, para que la primera aparición sea la que queda
+            column[rows[mask.to_numpy(zero_copy_only=False)][::-1]] = (
+                pc.filter(values, mask).to_numpy(zero_copy_only=False)[::-1]
+            )
+            columns[key] = pd.Series(column, index=attributes.index)
+        return columns
+
+    wanted = set(keys)
+    columns = {key: [] for key in keys}
+    for text in attributes.tolist():
+        found = {}
+        for part in text.split(";"):
+            name, sep, value = part.partition("=")
+            name = name.lstrip()
+            if sep and name in wanted and name not in found:
+                found[name] = value
+        for key in keys:
+            columns[key].append(found.get(key))
+    return {key: pd.Series(values, index=attributes.index) for key, values in columns.items()}
+
+
+def _short_id(ids):
+    # "gene:OSTLU_23817" -> "OSTLU_23817"
+    return ids.str.replace(r"^.*:", "", regex=True)
+
+
+def iter_gff_chunks(path, types=GENE_MODEL_TYPES, keys=ATTRIBUTE_KEYS, chunk_rows=CHUNK_ROWS):
+    """Recorre un GFF3 por bloques y devuelve DataFrames tipados con los atributos pedidos.
+
+    El filtro por tipo se aplica antes de parsear atributos. seqid, type y
+    strand son categóricos; start/end enteros.
+    """
+    with open_text(path) as f:
+        # Sin comment="#": un "#" dentro de los atributos cortaría la línea.
+        # Las líneas de comentario quedan con type vacío y caen en el filtro.
+        reader = pd.read_csv(
+            f, sep="\t", header=None, names=GFF_COLUMNS, dtype=object, chunksize=chunk_rows,
+            quoting=csv.QUOTE_NONE, na_filter=False, on_bad_lines="skip", engine="c",
+        )
+        for chunk in reader:
+            if types is not None:
+                chunk = chunk[chunk["type"].isin(types)]
+            else:
+                chunk = chunk[(chunk["attributes"] != "") & ~chunk["seqid"].str.startswith("#")]
+            if chunk.empty:
+                continue
+            chunk = chunk.astype({"seqid": "category", "type": "category", "strand": "category", "phase": "category"})
+            chunk["start"] = chunk["start"].astype("int64")
+            chunk["end"] = chunk["end"].astype("int64")
+            for key, values in _attributes(chunk["attributes"], keys).items():
+                chunk[key] = values
+            yield chunk
+
+
+STORE_COLUMNS = ["seqid", "type", "start", "end", "strand", "phase", "id", "name",
+                 "parent", "parent_name", "protein_id", "alias", "attributes"]
+
+
+def feature_frame(chunk):
+    """Bloque normalizado: una fila por Parent, con name/parent_name cortos."""
+    frame = pd.DataFrame({
+        "seqid": chunk["seqid"].astype(str),
+        "type": chunk["type"].astype(str),
+        "start": chunk["start"],
+        "end": chunk["end"],
+        "strand": chunk["strand"].astype(str),
+        "phase": chunk["phase"].astype(str),
+        "id": chunk["ID"],
+        "parent": chunk["Parent"].str.split(","),
+        "protein_id": chunk["protein_id"],
+        "alias": chunk["Name"],
+        "attributes": chunk["attributes"],
+    }).explode("parent")
+    frame["name"] = _short_id(frame["id"])
+    frame["parent_name"] = _short_id(frame["parent"])
+    return frame[STORE_COLUMNS]
+
+
+def store_rows(chunk):
+    """Filas para la tabla features del store (una por Parent)."""
+    frame = feature_frame(chunk)
+    # NaN -> None para SQLite, columna a columna
+    return zip(*(
+        frame[c].tolist() if c in ("start", "end") else frame[c].astype(object).where(frame[c].notna(), None).tolist()
+        for c in STORE_COLUMNS
+    ))
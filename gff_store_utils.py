@@ -0,0 +1,265 @@
+import os
+import sqlite3
+import tempfile
+
+from gff_scan_utils import iter_gff_chunks, store_rows
+from perf_utils import span
+from upload_cache_utils import content_digest, evict, local_path, touch
+
+STORE_DIR = os.path.join(".cache", "gff")
+# Prefijos de ID de gen que se aceptan en las búsquedas (ej: "gene-AT5G25350" en NCBI)
+GENE_ID_PREFIXES = ("gene-", "gene:")
+
+
+def _create_schema(conn):
+    conn.execute("""
+        CREATE TABLE features (
+            seqid TEXT,
+            type TEXT,
+            start INTEGER,
+            end INTEGER,
+            strand TEXT,
+            phase TEXT,
+            id TEXT,
+            name TEXT,
+            parent TEXT,
+            parent_name TEXT,
+            protein_id TEXT,
+            alias TEXT,
+            attributes TEXT
+        )
+    """)
+
+
+def _create_indexes(conn):
+    conn.execute("CREATE INDEX idx_features_id ON features (id)")
+    conn.execute("CREATE INDEX idx_features_name ON features (name, type)")
+    conn.execute("CREATE INDEX idx_features_parent ON features (parent)")
+    conn.execute("CREATE INDEX idx_features_alias ON features (alias)")
+    conn.execute("CREATE INDEX idx_features_protein ON features (protein_id)")
+    conn.execute("CREATE INDEX idx_features_pos ON features (seqid, start)")
+
+
+def ingest_gff3(path, db_path, progress=None):
+    """Crea el store de path en db_path; progress(filas) se llama tras cada bloque.
+
+    Si progress lanza una excepción (p. ej. un trabajo cancelado) no queda ningún store a medias.
+    """
+    # Escribe en un temporal y lo renombra: otra sesión nunca ve un store a medias
+    fd, tmp_path = tempfile.mkstemp(suffix=".tmp", dir=os.path.dirname(db_path))
+    os.close(fd)
+    conn = sqlite3.connect(tmp_path)
+    try:
+        conn.execute("PRAGMA journal_mode = OFF")
+        conn.execute("PRAGMA synchronous = OFF")
+        _create_schema(conn)
+
+        # Una sola pasada por bloques; solo se parsean atributos del modelo génico
+        with span("gff.parse_insert", rows=0) as s:
+            for chunk in iter_gff_chunks(path):
+                conn.executemany("INSERT INTO features VALUES (?,?,?,?,?,?,?,?,?,?,?,?,?)", store_rows(chunk))
+                s["rows"] += len(chunk)
+                if progress:
+                    progress(s["rows"])
+
+        with span("gff.create_indexes"):
+            _create_indexes(conn)
+        conn.commit()
+    except BaseException:
+        conn.close()
+        os.remove(tmp_path)
+        raise
+    conn.close()
+    os.replace(tmp_path, db_path)
+
+
+def gff_store_path(file_obj, is_gz=None, store_dir=STORE_DIR, progress=None):
+    """Ruta del store SQLite del GFF3; lo crea la primera vez que se ve el contenido.
+
+    file_obj puede ser una ruta, un archivo local o uno subido; gzip se
+    detecta por contenido, is_gz se mantiene por compatibilidad. progress
+    se pasa a ingest_gff3 si hay que crear el store.
+    """
+    path = local_path(file_obj)
+    os.makedirs(store_dir, exist_ok=True)
+    db_path = os.path.join(store_dir, content_digest(path) + ".db")
+    if os.path.exists(db_path):
+        touch(db_path)
+    else:
+        with span("gff.ingest"):
+            ingest_gff3(path, db_path, progress)
+        evict(keep=db_path)
+    return db_path
+
+
+def connect_store(db_path):
+    conn = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True, check_same_thread=False)
+    conn.row_factory = sqlite3.Row
+    return conn
+
+
+# Consultas
+
+def strip_gene_prefix(gene_id):
+    """ID sin un prefijo conocido de gen ("gene-AT5G25350" -> "AT5G25350")."""
+    for prefix in GENE_ID_PREFIXES:
+        if gene_id.startswith(prefix):
+            return gene_id[len(prefix):]
+    return gene_id
+
+
+def find_gene(db_path, gene_id):
+    gene_id = (gene_id or "").strip()
+    if not gene_id:
+        return None
+    conn = connect_store(db_path)
+    try:
+        row = conn.execute(
+            "SELECT * FROM features WHERE name = ? AND type = 'gene' LIMIT 1", (gene_id,)
+        ).fetchone()
+        if row is None:
+            row = conn.execute(
+                "SELECT * FROM features WHERE (id = ? OR alias = ?) AND type = 'gene' LIMIT 1",
+                (gene_id, gene_id),
+            ).fetchone()
+        if row is None:
+            # Último recurso: el mismo ID con o sin prefijo de gen (ej: "gene-AT5G25350"), nunca parcial
+            bare = strip_gene_prefix(gene_id)
+            names = [bare] + [prefix + bare for prefix in GENE_ID_PREFIXES]
+            row = conn.execute(
+                f"SELECT * FROM features WHERE name IN ({','.join('?' * len(names))}) AND type = 'gene' LIMIT 1",
+                names,
+            ).fetchone()
+        return dict(row) if row else None
+    finally:
+        conn.close()
+
+
+def _rows_in(conn, sql, values, chunk=500):
+    # sql lleva {marks} en la lista IN; por bloques para no pasar del límite de parámetros de SQLite
+    rows = []
+    for i in range(0, len(values), chunk):
+        part = values[i:i + chunk]
+        rows += conn.execute(sql.format(marks=",".join("?" * len(part))), part).fetchall()
+    return rows
+
+
+def resolve_genes(db_path, ids):
+    """Gen de cada ID (de gen, transcrito o proteína) con una sola conexión y consultas por lotes.
+
+    Devuelve {id: fila del gen como dict, o None}. Mismo orden de búsqueda que
+    gene_id_from_protein + find_gene: protein_id, ID o nombre de cualquier
+    feature (subiendo por Parent hasta el gen), alias del gen y, por último,
+    el ID con o sin prefijo de gen.
+    """
+    keys = {gene_id: (gene_id or "").strip() for gene_id in ids}
+    found = {}
+    conn = connect_store(db_path)
+    try:
+        lookups = (
+            ("protein_id", "SELECT * FROM features WHERE protein_id IN ({marks})"),
+            ("id", "SELECT * FROM features WHERE id IN ({marks})"),
+            ("name", "SELECT * FROM features WHERE name IN ({marks})"),
+            ("alias", "SELECT * FROM features WHERE type = 'gene' AND alias IN ({marks})"),
+        )
+        pending = sorted({key for key in keys.values() if key})
+        for column, sql in lookups:
+            for row in _rows_in(conn, sql, pending):
+                previous = found.get(row[column])
+                # Entre varias coincidencias gana el gen; si no, la primera
+                if previous is None or (previous["type"] != "gene" and row["type"] == "gene"):
+                    found[row[column]] = row
+            pending = [key for key in pending if key not in found]
+
+        # IDs con o sin prefijo de gen (ej: "gene-AT5G25350"), nunca parciales
+        variants = {}
+        for key in pending:
+            bare = strip_gene_prefix(key)
+            for name in [bare] + [prefix + bare for prefix in GENE_ID_PREFIXES]:
+                variants.setdefault(name, key)
+        for row in _rows_in(conn, "SELECT * FROM features WHERE type = 'gene' AND name IN ({marks})", list(variants)):
+            found.setdefault(variants[row["name"]], row)
+
+        # CDS/exón -> transcrito -> gen, un nivel por consulta
+        for _ in range(3):
+            parents = sorted({row["parent"] for row in found.values() if row["type"] != "gene" and row["parent"]})
+            if not parents:
+                break
+            by_id = {}
+            for row in _rows_in(conn, "SELECT * FROM features WHERE id IN ({marks})", parents):
+                by_id.setdefault(row["id"], row)
+            found = {key: (by_id.get(row["parent"]) if row["type"] != "gene" else row) for key, row in found.items()}
+            found = {key: row for key, row in found.items() if row is not None}
+    finally:
+        conn.close()
+    return {
+        gene_id: dict(found[key]) if key in found and found[key]["type"] == "gene" else None
+        for gene_id, key in keys.items()
+    }
+
+
+def get_children(db_path, parent_ids, feature_types=None):
+    if not parent_ids:
+        return []
+    conn = connect_store(db_path)
+    try:
+        marks = ",".join("?" * len(parent_ids))
+        sql = f"SELECT * FROM features WHERE parent IN ({marks})"
+        params = list(parent_ids)
+        if feature_types:
+            sql += f" AND type IN ({','.join('?' * len(feature_types))})"
+            params += list(feature_types)
+        return [dict(r) for r in conn.execute(sql + " ORDER BY start", params)]
+    finally:
+        conn.close()
+
+
+def get_gene_transcripts(db_path, gene_id):
+    gene = find_gene(db_path, gene_id)
+    if gene is None:
+        return None, []
+    transcripts = [t for t in get_children(db_path, [gene["id"]]) if t["id"]]
+    return gene, transcripts
+
+
+def get_gene_features(db_path, gene_id, feature_types):
+    # gene -> transcritos -> exones/UTR/CDS por enlaces Parent
+    gene, transcripts = get_gene_transcripts(db_path, gene_id)
+    if gene is None:
+        return None, []
+    parents = [gene["id"]] + [t["id"] for t in transcripts]
+    return gene, get_children(db_path, parents, feature_types)
+
+
+def find_by_protein(db_path, protein_id):
+    conn = connect_store(db_path)
+    try:
+        row = conn.execute(
+            "SELECT * FROM features WHERE protein_id = ? LIMIT 1", (protein_id,)
+        ).fetchone()
+        if row is None:
+            row = conn.execute(
+                "SELECT * FROM features WHERE id = ? OR name = ? LIMIT 1", (protein_id, protein_id)
+            ).fetchone()
+        return dict(row) if row else None
+    finally:
+        conn.close()
+
+
+def get_feature(db_path, feat_id):
+    conn = connect_store(db_path)
+    try:
+        row = conn.execute("SELECT * FROM features WHERE id = ? LIMIT 1", (feat_id,)).fetchone()
+        return dict(row) if row else None
+    finally:
+        conn.close()
+
+
+def get_genes(db_path):
+    conn = connect_store(db_path)
+    try:
+        return conn.execute(
+            "SELECT seqid, start, end, strand, name FROM features WHERE type = 'gene' ORDER BY seqid, start"
+        ).fetchall()
+    finally:
+        conn.close()
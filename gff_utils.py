@@ -1,24 +1,25 @@
-import gzip
+from gff_store_utils import gff_store_path
+from perf_utils import timed
+from transcript_model_utils import get_transcript_models, gene_transcripts, isoform_metrics
 
-def extract_exons_utr3(file_obj, gene_id, is_gz=False):
-    exons = []
-    utr3s = []
-    opener = gzip.open if is_gz else lambda f, mode: f
+def gene_architecture(db_path, gene_id):
+    # Exones y 3'UTR del transcrito canónico (no se mezclan isoformas)
+    gene, transcripts = gene_transcripts(db_path, gene_id)
+    if gene is None:
+        return None
+    if not transcripts:
+        return 0, 0
+
+    models = get_transcript_models(db_path)
+    canonical = transcripts[0]
+    return models["n_exons"][canonical], models["utr3_len"][canonical]
 
-    with opener(file_obj, 'rt') as f:
-        for line in f:
-            if line.startswith("#"):
-                continue
-            fields = line.strip().split("\t")
-            if len(fields) < 9:
-                continue
-            seqid, source, feature_type, start, end, score, strand, phase, attributes = fields
-            if gene_id in attributes:
-                if feature_type == "exon":
-                    exons.append((int(start), int(end)))
-                elif feature_type == "three_prime_UTR":
-                    utr3s.append((int(start), int(end)))
+@timed
+def extract_exons_utr3(file_obj, gene_id, is_gz=False):
+    db_path = gff_store_path(file_obj, is_gz=is_gz)
+    return gene_architecture(db_path, gene_id) or (0, 0)
 
-    num_exons = len(exons)
-    utr3_length = sum(end - start + 1 for start, end in utr3s)
-    return num_exons, utr3_length
\ No newline at end of file
+@timed
+def extract_isoforms(file_obj, gene_id, is_gz=False):
+    db_path = gff_store_path(file_obj, is_gz=is_gz)
+    return isoform_metrics(db_path, gene_id) or []
@@ -0,0 +1,102 @@
+import argparse
+import ast
+import glob
+import os
+import subprocess
+import sys
+
+# Lo que Streamlit ya carga en cualquier página: no cuenta contra el presupuesto
+BASELINE_IMPORTS = "import streamlit, pandas"
+# ms de importación propios de cada página (medidos con -X importtime, con margen)
+IMPORT_BUDGET_MS = {
+    "app.py": 30,
+    "viewer.py": 30,
+    "pages/1_Arquitectura_por_lotes.py": 60,
+    "pages/2_Comparar_RNA.py": 100,
+    "pages/3_Consultas_GFF3.py": 50,
+    "pages/4_Sintenia_comparada.py": 50,
+    "pages/5_Extraer_secuencias.py": 60,
+    "pages/6_Comparar_con_Arabidopsis.py": 50,
+    "pages/7_Sintenia_multiespecie.py": 60,
+}
+MARK = "--import-budget--"
+
+
+def page_imports(path):
+    """Sentencias import de nivel superior de un script (sin ejecutar la interfaz)."""
+    with open(path, encoding="utf-8") as f:
+        tree = ast.parse(f.read(), path)
+    return "\n".join(ast.unparse(node) for node in tree.body if isinstance(node, (ast.Import, ast.ImportFrom)))
+
+
+def import_times(statements, baseline=BASELINE_IMPORTS):
+    """Importa baseline y luego statements en un intérprete nuevo con -X importtime.
+
+    Devuelve (ms totales de statements, ms totales del proceso, [(módulo, ms
+    acumulados)] de los imports de primer nivel de statements).
+    """
+    code = f"{baseline}\nimport sys\nsys.stderr.write({MARK!r} + '\\n')\n{statements}"
+    err = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        cwd=os.path.dirname(os.path.abspath(__file__)), capture_output=True, text=True, check=True,
+    ).stderr
+    before, _, after = err.partition(MARK + "\n")
+
+    def parse(text):
+        rows = []
+        for line in text.splitlines():
+            if not line.startswith("import time:"):
+                continue
+            self_us, cumulative_us, name = line[len("import time:"):].split("|")
+            try:
+                rows.append((int(self_us), int(cumulative_us), name.rstrip()))
+            except ValueError:
+                continue  # cabecera "self [us] | cumulative | imported package"
+        return rows
+
+    own = parse(after)
+    total = sum(r[0] for r in parse(before)) + sum(r[0] for r in own)
+    # Primer nivel: sin sangría extra tras "import time: ... | "
+    top = sorted(((name.strip(), cum / 1000) for _, cum, name in own if not name.startswith("  ")), key=lambda r: -r[1])
+    return sum(r[0] for r in own) / 1000, total / 1000, top
+
+
+def measure(pages, repeat=3):
+    """Mejor de repeat por página: (página, ms propios, ms del proceso, imports más caros)."""
+    results = []
+    for page in pages:
+        statements = page_imports(page)
+        runs = [import_times(statements) for _ in range(repeat)]
+        own, total, top = min(runs, key=lambda r: r[0])
+        results.append((page, own, total, top))
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Tiempo de importación de la app y de cada página frente al presupuesto")
+    parser.add_argument("pages", nargs="*", help="Scripts a medir (por defecto app.py, viewer.py y pages/*.py)")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--top", type=int, default=3, help="Imports más caros a mostrar por página")
+    args = parser.parse_args()
+
+    root = os.path.dirname(os.path.abspath(__file__))
+    pages = args.pages or ["app.py", "viewer.py"] + sorted(
+        os.path.relpath(p, root).replace(os.sep, "/") for p in glob.glob(os.path.join(root, "pages", "*.py"))
+    )
+    print(f"Base no contabilizada: {BASELINE_IMPORTS}")
+    over = []
+    for page, own, total, top in measure([os.path.join(root, p) for p in pages], args.repeat):
+        name = os.path.relpath(page, root).replace(os.sep, "/")
+        budget = IMPORT_BUDGET_MS.get(name)
+        status = "sin presupuesto" if budget is None else ("OK" if own <= budget else "EXCEDIDO")
+        if budget is not None and own > budget:
+            over.append(name)
+        heaviest = ", ".join(f"{m} {ms:.0f}" for m, ms in top[:args.top])
+        print(f"{name:<40} {own:7.1f} ms propios / {total:7.1f} ms total  "
+              f"(presupuesto {budget if budget is not None else '-'} ms) {status}  [{heaviest}]")
+    if over:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,210 @@
+import argparse
+import csv
+import hashlib
+import os
+import sqlite3
+from itertools import islice
+
+DB_PATH = "species_records.db"
+DATA_DIR = "Data"
+HIT_TABLE_SUFFIX = "-Alignment-HitTable.csv"
+NO_HITS_MARKER = "No significant similarity found.txt"
+CHUNK_ROWS = 10000
+
+# Columnas de la tabla de hits (BLAST outfmt 6 + % positivos)
+COL_SUBJECT, COL_PIDENT, COL_LENGTH, COL_EVALUE, COL_BITSCORE = 1, 2, 3, 10, 11
+
+# Comentarios que escribe este importador; cualquier otro texto es una nota del curador y no se toca
+AUTO_COMMENT_PREFIXES = ("Extraído desde ", "No se encontraron resultados BLAST (", "Sin resultados BLAST: ")
+
+
+def _ensure_import_table(conn):
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS ImportedFiles (
+            path TEXT PRIMARY KEY,
+            size INTEGER,
+            mtime_ns INTEGER,
+            sha1 TEXT
+        )
+    """)
+
+
+def _sha1(path):
+    h = hashlib.sha1()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def scan_data_tree(data_dir=DATA_DIR):
+    """Archivos de resultados por (clado, especie) en Data/<clado>/<especie>/."""
+    species_files = {}
+    for clade in sorted(os.listdir(data_dir)):
+        clade_dir = os.path.join(data_dir, clade)
+        if not os.path.isdir(clade_dir):
+            continue
+        for species in sorted(os.listdir(clade_dir)):
+            species_dir = os.path.join(clade_dir, species)
+            if not os.path.isdir(species_dir):
+                continue
+            files = [
+                f"{data_dir}/{clade}/{species}/{name}"
+                for name in sorted(os.listdir(species_dir))
+                if name.endswith(HIT_TABLE_SUFFIX) or name == NO_HITS_MARKER
+            ]
+            if files:
+                species_files[(clade, species)] = files
+    return species_files
+
+
+def best_hit(path, chunk_rows=CHUNK_ROWS):
+    """Mejor hit (mayor bitscore, menor e-value) leyendo la tabla por bloques."""
+    best = None
+    best_key = None
+    with open(path, newline="", encoding="utf-8") as f:
+        reader = csv.reader(f)
+        while True:
+            chunk = list(islice(reader, chunk_rows))
+            if not chunk:
+                break
+            for row in chunk:
+                if len(row) <= COL_BITSCORE:
+                    continue
+                try:
+                    key = (float(row[COL_BITSCORE]), -float(row[COL_EVALUE]))
+                except ValueError:
+                    continue  # cabecera u otra línea no numérica
+                if best_key is None or key > best_key:
+                    best_key = key
+                    best = row
+    if best is None:
+        return None
+    return {
+        "ortholog_id": best[COL_SUBJECT],
+        "percent_identity": float(best[COL_PIDENT]),
+        "coverage": int(best[COL_LENGTH]),
+        "evalue": float(best[COL_EVALUE]),
+        "bitscore": best_key[0],
+    }
+
+
+def summarize_species(files):
+    best = None
+    source = None
+    for path in files:
+        if not path.endswith(HIT_TABLE_SUFFIX):
+            continue
+        hit = best_hit(path)
+        if hit and (best is None or hit["bitscore"] > best["bitscore"]):
+            best, source = hit, path
+    if best:
+        return best, f"Extraído desde {source}"
+    marker = next((p for p in files if p.endswith(NO_HITS_MARKER)), files[0])
+    empty = {"ortholog_id": "", "percent_identity": None, "coverage": None, "evalue": None}
+    return empty, f"No se encontraron resultados BLAST ({marker})"
+
+
+def merge_comment(stored, generated):
+    """Comentario a guardar: el generado si el actual está vacío o también es automático."""
+    if not stored or stored.startswith(AUTO_COMMENT_PREFIXES):
+        return generated
+    return stored
+
+
+def import_hit_tables(data_dir=DATA_DIR, db_path=DB_PATH, force=False):
+    conn = sqlite3.connect(db_path)
+    try:
+        _ensure_import_table(conn)
+        known = {
+            path: (size, mtime_ns, sha1)
+            for path, size, mtime_ns, sha1 in conn.execute("SELECT path, size, mtime_ns, sha1 FROM ImportedFiles")
+        }
+
+        species_files = scan_data_tree(data_dir)
+        changed_species = {}
+        file_rows = []
+        for key, files in species_files.items():
+            changed = force
+            for path in files:
+                stat = os.stat(path)
+                previous = known.get(path)
+                if previous and previous[:2] == (stat.st_size, stat.st_mtime_ns) and not force:
+                    continue
+                sha1 = _sha1(path)
+                file_rows.append((path, stat.st_size, stat.st_mtime_ns, sha1))
+                # Solo cambia la fecha: se registra pero no se reimporta
+                if force or previous is None or previous[2] != sha1:
+                    changed = True
+            if changed:
+                changed_species[key] = True
+
+        # Archivos importados antes que ya no están: la especie se recalcula con lo que quede
+        # o, si no le queda ninguno, se vacían sus valores de hit
+        scanned = {path for files in species_files.values() for path in files}
+        removed = [path for path in known if path.startswith(f"{data_dir}/") and path not in scanned]
+        gone_species = {}
+        for path in removed:
+            key = tuple(path[len(data_dir) + 1:].split("/")[:2])
+            if key in species_files:
+                changed_species[key] = True
+            else:
+                gone_species[key] = True
+
+        existing = {
+            (clade, species): (record_id, comments)
+            for record_id, clade, species, comments in conn.execute("SELECT id, clade, species, comments FROM Records")
+        }
+        updates = []
+        inserts = []
+        for clade, species in changed_species:
+            hit, comment = summarize_species(species_files[(clade, species)])
+            values = (hit["ortholog_id"], hit["percent_identity"], hit["coverage"], hit["evalue"])
+            if (clade, species) not in existing:
+                inserts.append((clade, species) + values + ("", "", "", comment))
+            else:
+                record_id, stored = existing[(clade, species)]
+                updates.append(values + (merge_comment(stored, comment), record_id))
+        cleared = [
+            ("", None, None, None,
+             merge_comment(existing[key][1], f"Sin resultados BLAST: se eliminaron sus archivos de {data_dir}/"),
+             existing[key][0])
+            for key in gone_species if key in existing
+        ]
+
+        with conn:
+            conn.executemany(
+                "UPDATE Records SET ortholog_id = ?, percent_identity = ?, coverage = ?, evalue = ?, comments = ? "
+                "WHERE id = ?",
+                updates + cleared,
+            )
+            conn.executemany(
+                "INSERT INTO Records (clade, species, ortholog_id, percent_identity, coverage, evalue, evalue_rev, utr3, synteny, comments) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                inserts,
+            )
+            conn.executemany("INSERT OR REPLACE INTO ImportedFiles VALUES (?, ?, ?, ?)", file_rows)
+            conn.executemany("DELETE FROM ImportedFiles WHERE path = ?", [(path,) for path in removed])
+    finally:
+        conn.close()
+
+    return {
+        "updated": len(updates), "inserted": len(inserts), "cleared": len(cleared),
+        "skipped": len(species_files) - len(changed_species),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Importa las tablas de hits BLAST de Data/ a species_records.db")
+    parser.add_argument("--data", default=DATA_DIR)
+    parser.add_argument("--db", default=DB_PATH)
+    parser.add_argument("--force", action="store_true", help="Reimporta aunque los archivos no hayan cambiado")
+    args = parser.parse_args()
+
+    summary = import_hit_tables(args.data, args.db, args.force)
+    print(f"Actualizados: {summary['updated']} | Nuevos: {summary['inserted']} | Vaciados: {summary['cleared']} | "
+          f"Sin cambios: {summary['skipped']}")
+
+
+if __name__ == "__main__":
+    main()
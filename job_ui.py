@@ -0,0 +1,48 @@
+import os
+
+import streamlit as st
+
+from job_utils import JobRunner, submit, get_job, cancel, FAILED, CANCELLED, FINISHED
+
+JOB_WORKERS = int(os.environ.get("EBF2_JOB_WORKERS", 2))
+
+
+@st.cache_resource
+def get_runner():
+    # Un pool de workers por proceso de Streamlit, compartido por todas las sesiones
+    return JobRunner(workers=JOB_WORKERS).start()
+
+
+def enviar_job(kind, params, force=False):
+    get_runner()
+    return submit(kind, params, force=force)
+
+
+@st.fragment(run_every=1.0)
+def _progreso_job(job_id, key):
+    job = get_job(job_id)
+    if job["status"] in FINISHED:
+        st.rerun()  # rerun completo para pintar el resultado
+    st.progress(min(job["progress"] or 0.0, 1.0), text=job["message"] or "En cola…")
+    if st.button("✖️ Cancelar", key=f"{key}_cancel"):
+        cancel(job_id)
+
+
+def seguir_job(job_id, key):
+    """Muestra el progreso de un trabajo sin bloquear la sesión; devuelve el job solo si terminó bien."""
+    job = get_job(job_id)
+    if job is None:
+        return None
+    if job["status"] not in FINISHED:
+        _progreso_job(job_id, key)
+        return None
+    if job["status"] in (FAILED, CANCELLED):
+        if job["status"] == FAILED:
+            st.error(f"El análisis falló: {job['error']}")
+        else:
+            st.warning("Análisis cancelado.")
+        if st.button("🔁 Reintentar", key=f"{key}_retry"):
+            submit(job["kind"], job["params"], force=True)
+            st.rerun()
+        return None
+    return job
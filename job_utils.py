@@ -0,0 +1,394 @@
+import argparse
+import hashlib
+import json
+import multiprocessing
+import os
+import sqlite3
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+JOBS_DB = os.path.join(".cache", "jobs.db")
+EXPORT_DIR = os.path.join(".cache", "exports")
+POLL_SECONDS = 0.5
+
+# Estados de un trabajo
+QUEUED, RUNNING, DONE, FAILED, CANCELLED = "queued", "running", "done", "failed", "cancelled"
+FINISHED = (DONE, FAILED, CANCELLED)
+
+
+class JobCancelled(Exception):
+    pass
+
+
+def connect(db_path=JOBS_DB):
+    # Cada proceso (app, dispatcher, workers) abre su propia conexión
+    os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+    conn = sqlite3.connect(db_path, timeout=30, check_same_thread=False)
+    conn.row_factory = sqlite3.Row
+    conn.execute("PRAGMA journal_mode = WAL")
+    conn.execute("PRAGMA busy_timeout = 30000")
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS Jobs (
+            id TEXT PRIMARY KEY,
+            kind TEXT,
+            params TEXT,
+            status TEXT,
+            progress REAL DEFAULT 0,
+            message TEXT DEFAULT '',
+            result TEXT,
+            error TEXT,
+            cancel_requested INTEGER DEFAULT 0,
+            pid INTEGER,
+            created REAL,
+            updated REAL
+        )
+    """)
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_jobs_status ON Jobs (status, created)")
+    return conn
+
+
+# Tipos de trabajo: función que recibe los parámetros y un callback progress(done, total, mensaje).
+# Cada una importa sus módulos al ejecutarse: la app solo carga job_utils para encolar.
+
+def _annotation_store(gff, progress, done, total):
+    from gff_store_utils import gff_store_path
+
+    # Un aviso por bloque al indexar un GFF nuevo: cancelar no espera a que termine la ingesta
+    progress(done, total, "Indexando la anotación")
+    return gff_store_path(gff, progress=lambda rows: progress(done, total, f"Anotación: {rows} filas"))
+
+
+def _run_extraction(params, progress):
+    from sequence_utils import cargar_fasta, extraer_secuencia
+    from transcript_model_utils import get_transcript_models
+
+    # Un aviso por paso: cancelar no espera a que termine todo
+    total = 4
+    db_path = _annotation_store(params["gff"], progress, 0, total)
+    progress(1, total, "Modelos de transcritos")
+    get_transcript_models(db_path)
+    # El FASTA que se lee primero: el proteoma si se pide proteína y lo hay (el genoma solo si falta en él)
+    if params["tipo"] == "Proteína" and params["protein"]:
+        progress(2, total, "Indexando el proteoma")
+        cargar_fasta(params["protein"])
+    else:
+        progress(2, total, "Indexando el genoma")
+        cargar_fasta(params["genome"])
+    progress(3, total, "Extrayendo secuencia")
+    return extraer_secuencia(params["gff"], params["genome"], params["protein"], params["gene_id"], params["tipo"])
+
+
+def _run_multifasta(params, progress):
+    from sequence_utils import write_multifasta
+
+    # El archivo queda en disco y la UI lo descarga; el nombre sale de las entradas
+    os.makedirs(EXPORT_DIR, exist_ok=True)
+    path = os.path.join(EXPORT_DIR, job_key("multifasta", params) + ".fa")
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as out:
+        records = write_multifasta(
+            out, params["gff"], params["genome"], params["ids"], params["kinds"],
+            progress=lambda done, total: progress(done, total, f"{done}/{total} genes"),
+        )
+    os.replace(tmp_path, path)
+    return {"path": path, "records": records}
+
+
+def _run_architecture(params, progress):
+    from gff_utils import gene_architecture
+    from transcript_model_utils import isoform_metrics
+
+    db_path = _annotation_store(params["gff"], progress, 0, 2)
+    progress(1, 2, "Transcrito canónico e isoformas")
+    num_exons, utr3_len = gene_architecture(db_path, params["gene_id"]) or (0, 0)
+    return {"exons": num_exons, "utr3": utr3_len, "isoforms": isoform_metrics(db_path, params["gene_id"]) or []}
+
+
+def _run_protein_to_gene(params, progress):
+    from protein_to_gene_utils import gene_id_from_protein
+
+    db_path = _annotation_store(params["gff"], progress, 0, 1)
+    return gene_id_from_protein(db_path, params["protein_id"])
+
+
+def _run_neighbors(params, progress):
+    from gene_index_utils import flanking_genes, get_gene_index
+    from protein_to_gene_utils import gene_id_from_protein
+
+    # gene_id directo o, si no, el gen de protein_id
+    total = 2
+    db_path = _annotation_store(params["gff"], progress, 0, total)
+    gene_id = params.get("gene_id") or gene_id_from_protein(db_path, params["protein_id"])
+    if not gene_id:
+        return None
+    progress(1, total, "Genes vecinos")
+    center, upstream, downstream = flanking_genes(get_gene_index(db_path), gene_id, params["flank_genes"])
+    return {"gene": gene_id, "center": center, "upstream": upstream, "downstream": downstream}
+
+
+def _neighbors(gff, gene_id, flank_genes, window_bp):
+    from synteny_utils import extract_neighbors, extract_neighbors_within
+
+    if window_bp:
+        center, neighbors = extract_neighbors_within(gff, gene_id, window_bp)
+        return center, neighbors, []
+    return extract_neighbors(gff, gene_id, flank_genes=flank_genes)
+
+
+def _run_synteny(params, progress):
+    from compare_neighbors_utils import compare_gene_neighbors
+
+    progress(0, 2, "Especie A")
+    center_a, up_a, down_a = _neighbors(params["gff_a"], params["gene_a"], params["flank_genes"], params["window_bp"])
+    progress(1, 2, "Especie B")
+    center_b, up_b, down_b = _neighbors(params["gff_b"], params["gene_b"], params["flank_genes"], params["window_bp"])
+    if not (center_a and center_b):
+        return None
+    shared, unique_a, unique_b = compare_gene_neighbors(up_a, down_a, up_b, down_b)
+    return {
+        "a": [center_a, up_a, down_a],
+        "b": [center_b, up_b, down_b],
+        "shared": sorted(shared),
+        "unique_a": sorted(unique_a),
+        "unique_b": sorted(unique_b),
+    }
+
+
+def _run_batch_architecture(params, progress):
+    from batch_architecture import run_batch
+
+    return run_batch(
+        params["mapping"], params["db"], workers=params["workers"],
+        progress=lambda done, total, annotation: progress(done, total, annotation),
+    )
+
+
+def _run_rna_compare(params, progress):
+    from rna_compare_utils import compare_rna, length_table, matrix_path
+
+    progress(0, 1, "Extrayendo secuencias")
+    seqs, matrix, missing = compare_rna(
+        params["mapping"], params["genomes"], params["seq_type"], params["db"], workers=params["workers"],
+        progress=lambda done, total: progress(done, total, f"{done}/{total} alineamientos"),
+    )
+    return {
+        "matrix": matrix_path(seqs, params["seq_type"]),
+        "lengths": length_table(seqs).to_dict("records"),
+        "missing": missing,
+    }
+
+
+TASKS = {
+    "extraction": _run_extraction,
+    "architecture": _run_architecture,
+    "protein_to_gene": _run_protein_to_gene,
+    "neighbors": _run_neighbors,
+    "multifasta": _run_multifasta,
+    "synteny": _run_synteny,
+    "batch_architecture": _run_batch_architecture,
+    "rna_compare": _run_rna_compare,
+}
+# Parámetros que son archivos: la clave del trabajo usa su identidad en disco, no solo la ruta
+FILE_PARAMS = {"gff", "genome", "protein", "gff_a", "gff_b"}
+
+
+def _file_key(path):
+    # (ruta real, tamaño, mtime) sin leer el archivo: encolar no hashea GB en el hilo de la UI.
+    # El hash del contenido lo calcula el worker al crear el store o los índices
+    stat = os.stat(path)
+    return [os.path.realpath(path), stat.st_size, stat.st_mtime_ns]
+
+
+def job_key(kind, params):
+    """Hash de las entradas: el mismo análisis sobre los mismos archivos (sin modificar) reutiliza el resultado."""
+    keyed = {}
+    for name, value in params.items():
+        if name in FILE_PARAMS and value:
+            value = _file_key(value)
+        elif name in ("mapping", "genomes"):
+            value = {species: _file_key(path) for species, path in value.items()}
+        keyed[name] = value
+    blob = json.dumps([kind, keyed], sort_keys=True, default=str)
+    return hashlib.sha1(blob.encode("utf-8")).hexdigest()
+
+
+def submit(kind, params, force=False, db_path=JOBS_DB):
+    """Encola un trabajo y devuelve su id.
+
+    Si ya existe uno con las mismas entradas se reutiliza tal cual (en cola,
+    en curso o terminado); force=True vuelve a encolar uno terminado.
+    """
+    if kind not in TASKS:
+        raise ValueError(f"Tipo de trabajo desconocido: {kind}")
+    job_id = job_key(kind, params)
+    now = time.time()
+    conn = connect(db_path)
+    try:
+        with conn:
+            row = conn.execute("SELECT status FROM Jobs WHERE id = ?", (job_id,)).fetchone()
+            if row is None:
+                conn.execute(
+                    "INSERT INTO Jobs (id, kind, params, status, created, updated) VALUES (?, ?, ?, ?, ?, ?)",
+                    (job_id, kind, json.dumps(params), QUEUED, now, now),
+                )
+            elif force and row["status"] in FINISHED:
+                conn.execute(
+                    "UPDATE Jobs SET status = ?, params = ?, progress = 0, message = '', result = NULL, error = NULL, "
+                    "cancel_requested = 0, pid = NULL, created = ?, updated = ? WHERE id = ?",
+                    (QUEUED, json.dumps(params), now, now, job_id),
+                )
+    finally:
+        conn.close()
+    return job_id
+
+
+def get_job(job_id, db_path=JOBS_DB):
+    """Estado del trabajo como dict (result ya decodificado) o None."""
+    conn = connect(db_path)
+    try:
+        row = conn.execute("SELECT * FROM Jobs WHERE id = ?", (job_id,)).fetchone()
+    finally:
+        conn.close()
+    if row is None:
+        return None
+    job = dict(row)
+    job["params"] = json.loads(job["params"])
+    job["result"] = json.loads(job["result"]) if job["result"] is not None else None
+    return job
+
+
+def cancel(job_id, db_path=JOBS_DB):
+    conn = connect(db_path)
+    try:
+        with conn:
+            # En cola: se cancela ya. En curso: el worker lo ve en su siguiente aviso de progreso
+            conn.execute("UPDATE Jobs SET status = ?, updated = ? WHERE id = ? AND status = ?",
+                         (CANCELLED, time.time(), job_id, QUEUED))
+            conn.execute("UPDATE Jobs SET cancel_requested = 1 WHERE id = ? AND status = ?", (job_id, RUNNING))
+    finally:
+        conn.close()
+
+
+def _claim(conn):
+    while True:
+        row = conn.execute("SELECT id FROM Jobs WHERE status = ? ORDER BY created LIMIT 1", (QUEUED,)).fetchone()
+        if row is None:
+            return None
+        with conn:
+            claimed = conn.execute("UPDATE Jobs SET status = ?, pid = ?, updated = ? WHERE id = ? AND status = ?",
+                                   (RUNNING, os.getpid(), time.time(), row["id"], QUEUED)).rowcount
+        if claimed:
+            return row["id"]
+        # Otro dispatcher lo tomó antes: se prueba con el siguiente
+
+
+def _pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def requeue_orphans(db_path=JOBS_DB):
+    """Devuelve a la cola los trabajos cuyo proceso murió (p. ej. se reinició la app)."""
+    conn = connect(db_path)
+    try:
+        rows = conn.execute("SELECT id, pid FROM Jobs WHERE status = ?", (RUNNING,)).fetchall()
+        orphans = [(QUEUED, row["id"]) for row in rows if row["pid"] is None or not _pid_alive(row["pid"])]
+        with conn:
+            conn.executemany("UPDATE Jobs SET status = ?, pid = NULL WHERE id = ?", orphans)
+    finally:
+        conn.close()
+    return len(orphans)
+
+
+def run_job(job_id, db_path=JOBS_DB):
+    """Ejecuta un trabajo ya reclamado (en un proceso del pool) y guarda su resultado."""
+    conn = connect(db_path)
+    try:
+        row = conn.execute("SELECT kind, params FROM Jobs WHERE id = ?", (job_id,)).fetchone()
+        with conn:
+            conn.execute("UPDATE Jobs SET pid = ? WHERE id = ?", (os.getpid(), job_id))
+
+        def progress(done, total, message=""):
+            with conn:
+                conn.execute("UPDATE Jobs SET progress = ?, message = ?, updated = ? WHERE id = ?",
+                             (done / total if total else 0.0, str(message), time.time(), job_id))
+            if conn.execute("SELECT cancel_requested FROM Jobs WHERE id = ?", (job_id,)).fetchone()[0]:
+                raise JobCancelled()
+
+        try:
+            result = TASKS[row["kind"]](json.loads(row["params"]), progress)
+            status, payload, error = DONE, json.dumps(result, default=str), None
+        except JobCancelled:
+            status, payload, error = CANCELLED, None, None
+        except Exception as e:
+            status, payload, error = FAILED, None, f"{type(e).__name__}: {e}"
+        with conn:
+            conn.execute(
+                "UPDATE Jobs SET status = ?, result = ?, error = ?, progress = COALESCE(?, progress), pid = NULL, "
+                "updated = ? WHERE id = ?",
+                (status, payload, error, 1.0 if status == DONE else None, time.time(), job_id),
+            )
+    finally:
+        conn.close()
+    return job_id
+
+
+class JobRunner:
+    """Hilo dispatcher que reparte los trabajos en cola entre un pool de procesos."""
+
+    def __init__(self, workers=2, db_path=JOBS_DB):
+        self.workers = workers
+        self.db_path = db_path
+        # spawn: el proceso de Streamlit tiene hilos y fork no es seguro ahí
+        self.pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+        self._running = set()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._loop, name="job-dispatcher", daemon=True)
+
+    def start(self):
+        requeue_orphans(self.db_path)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+        self.pool.shutdown(wait=True)
+
+    def _loop(self):
+        conn = connect(self.db_path)
+        try:
+            while not self._stop.is_set():
+                self._running = {f for f in self._running if not f.done()}
+                job_id = _claim(conn) if len(self._running) < self.workers else None
+                if job_id is None:
+                    self._stop.wait(POLL_SECONDS)
+                    continue
+                self._running.add(self.pool.submit(run_job, job_id, self.db_path))
+        finally:
+            conn.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Pool de workers para la cola de trabajos de la app")
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--db", default=JOBS_DB)
+    args = parser.parse_args()
+
+    runner = JobRunner(args.workers, args.db).start()
+    print(f"Procesando trabajos de {args.db} con {args.workers} workers (Ctrl+C para salir)")
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        runner.stop()
+
+
+if __name__ == "__main__":
+    main()
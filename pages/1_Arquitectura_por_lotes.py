@@ -0,0 +1,46 @@
+import streamlit as st
+import pandas as pd
+import os
+
+from batch_architecture import load_mapping, save_mapping
+from db_utils import DB_PATH, get_all_records, bump_version
+from job_ui import enviar_job, seguir_job
+from perf_ui import iniciar_rerun, cerrar_rerun
+
+st.set_page_config(layout="wide")
+iniciar_rerun()
+st.title("🧮 Exones y 3'UTR de todos los registros")
+
+species = sorted(get_all_records()["species"].dropna().unique())
+
+mapping = load_mapping()
+st.markdown("Indica el archivo GFF3 (.gff3/.gz) de cada especie. Las especies sin archivo se omiten.")
+df_mapping = pd.DataFrame({"species": species, "annotation": [mapping.get(s, "") for s in species]})
+edited = st.data_editor(df_mapping, use_container_width=True, hide_index=True, disabled=["species"], key="batch_mapping")
+
+nuevo_mapping = {row.species: row.annotation.strip() for row in edited.itertuples() if row.annotation and row.annotation.strip()}
+faltan = [path for path in nuevo_mapping.values() if not os.path.exists(path)]
+if faltan:
+    st.warning("Archivos no encontrados: " + ", ".join(sorted(set(faltan))))
+
+workers = st.number_input("Procesos en paralelo", min_value=1, max_value=32, value=4)
+
+if st.button("▶️ Ejecutar para todas las especies", disabled=not nuevo_mapping or bool(faltan)):
+    save_mapping(nuevo_mapping)
+    # Se ejecuta en segundo plano: se puede seguir usando la app y volver a esta página
+    st.session_state["batch_job"] = enviar_job(
+        "batch_architecture", {"mapping": nuevo_mapping, "db": DB_PATH, "workers": int(workers)}, force=True,
+    )
+
+if "batch_job" in st.session_state:
+    job = seguir_job(st.session_state["batch_job"], "batch_job")
+    if job:
+        summary = job["result"]
+        if st.session_state.get("batch_job_applied") != (job["id"], job["updated"]):
+            st.session_state["batch_job_applied"] = (job["id"], job["updated"])
+            bump_version()
+        st.success(f"Registros actualizados: {summary['updated']} ({summary['annotations']} anotaciones)")
+        if summary["ids_not_found"]:
+            st.warning("IDs no encontrados: " + ", ".join(summary["ids_not_found"]))
+
+cerrar_rerun()
@@ -0,0 +1,61 @@
+import streamlit as st
+import pandas as pd
+import os
+
+from batch_architecture import load_mapping, save_mapping
+from rna_compare_utils import GENOMES_PATH, IDENTITY_FLOOR, KMER_SIZE, SEQUENCE_TYPES, heatmap_figure
+from db_utils import DB_PATH, get_all_records
+from job_ui import enviar_job, seguir_job
+from perf_ui import iniciar_rerun, cerrar_rerun
+
+st.set_page_config(layout="wide")
+iniciar_rerun()
+st.title("🧬 Comparar 3'UTR y mRNA entre especies")
+
+species = sorted(get_all_records()["species"].dropna().unique())
+mapping = load_mapping()
+genomes = load_mapping(GENOMES_PATH)
+
+st.markdown("Indica el FASTA del genoma de cada especie. Las anotaciones GFF3 se toman de la página de arquitectura por lotes.")
+df_genomes = pd.DataFrame({
+    "species": species,
+    "annotation": [mapping.get(s, "") for s in species],
+    "genome": [genomes.get(s, "") for s in species],
+})
+edited = st.data_editor(df_genomes, use_container_width=True, hide_index=True, disabled=["species", "annotation"], key="rna_genomes")
+
+nuevos_genomas = {row.species: row.genome.strip() for row in edited.itertuples() if row.genome and row.genome.strip()}
+faltan = [path for path in nuevos_genomas.values() if not os.path.exists(path)]
+if faltan:
+    st.warning("Archivos no encontrados: " + ", ".join(sorted(set(faltan))))
+
+seq_type = st.radio("Secuencia a comparar", list(SEQUENCE_TYPES), horizontal=True)
+workers = st.number_input("Procesos en paralelo", min_value=1, max_value=32, value=4)
+listas = [s for s in nuevos_genomas if s in mapping]
+
+if st.button("▶️ Comparar todas contra todas", disabled=len(listas) < 2 or bool(faltan)):
+    save_mapping(nuevos_genomas, GENOMES_PATH)
+    st.session_state["rna_job"] = enviar_job("rna_compare", {
+        "mapping": {s: mapping[s] for s in listas}, "genomes": {s: nuevos_genomas[s] for s in listas},
+        "seq_type": seq_type, "db": DB_PATH, "workers": int(workers),
+    })
+
+if "rna_job" in st.session_state:
+    job = seguir_job(st.session_state["rna_job"], "rna_job")
+    if job:
+        result = job["result"]
+        matrix = pd.read_csv(result["matrix"], index_col=0)
+        st.plotly_chart(heatmap_figure(matrix, job["params"]["seq_type"]), use_container_width=True)
+        st.caption(f"Celdas vacías: sin similitud detectable (no comparten más k-mers de {KMER_SIZE} pb que dos "
+                   f"secuencias al azar; los pares con más de ~{IDENTITY_FLOOR}% de identidad siempre se alinean). "
+                   "En el agrupamiento cuentan como 0% de identidad.")
+
+        st.subheader(f"Longitud de {job['params']['seq_type']}")
+        lengths = pd.DataFrame(result["lengths"])
+        referencia = st.selectbox("Especie de referencia", lengths["species"], key="rna_ref")
+        lengths["diff_vs_reference"] = lengths["length"] - lengths.loc[lengths["species"] == referencia, "length"].iloc[0]
+        st.dataframe(lengths, use_container_width=True, hide_index=True)
+        if result["missing"]:
+            st.warning("Sin secuencia: " + ", ".join(result["missing"]))
+
+cerrar_rerun()
@@ -0,0 +1,105 @@
+import streamlit as st
+import pandas as pd
+
+from db_utils import update_architecture
+from file_ui import cargar_archivo_con_opcion
+from job_ui import enviar_job, seguir_job
+from upload_cache_utils import local_path
+from perf_ui import iniciar_rerun, cerrar_rerun
+
+st.set_page_config(layout="wide")
+iniciar_rerun()
+st.title("📄 Consultas sobre anotaciones GFF3")
+
+
+def mostrar_vecinos(vecinos):
+    center = vecinos["center"]
+    st.info(f"🧬 Gen central: {center['gene']} ({center['start']} - {center['end']})")
+    st.markdown("**⬆️ Genes upstream:**")
+    for u in vecinos["upstream"]:
+        st.write(f"↖️ {u['gene']} ({u['start']} - {u['end']})")
+    st.markdown("**⬇️ Genes downstream:**")
+    for d in vecinos["downstream"]:
+        st.write(f"↘️ {d['gene']} ({d['start']} - {d['end']})")
+
+
+with st.expander("📥 Analizar exones y 3'UTR desde archivo GFF3 (.gff3/.gz)"):
+    gff_file, gff_file_name, fuente = cargar_archivo_con_opcion("GFF3 (.gff3/.gz)", [ "gff3", "gz"], "gff_exons")
+    gene_id_input = st.text_input("ID del gen ortólogo (ej: AT5G25350)", key="gene_input")
+
+    if gff_file and gene_id_input:
+        # En segundo plano: indexar un GFF3 nuevo no bloquea la sesión
+        job = seguir_job(enviar_job("architecture", {"gff": local_path(gff_file), "gene_id": gene_id_input}), "job_exones")
+        if job:
+            num_exons, utr3_len = job["result"]["exons"], job["result"]["utr3"]
+            st.success(f"Número de exones: {num_exons} | Longitud del 3'UTR: {utr3_len} nt (transcrito canónico)")
+            isoformas = job["result"]["isoforms"]
+            if len(isoformas) > 1:
+                st.dataframe(pd.DataFrame(isoformas), use_container_width=True, hide_index=True)
+
+            if st.button("📌 Guardar en base de datos"):
+                update_architecture(gene_id_input, num_exons, utr3_len)
+                st.success("Base de datos actualizada con éxito.")
+
+        if fuente == "Elegir desde carpeta 'data'":
+            gff_file.close()  # cerrar archivo abierto localmente
+
+
+
+with st.expander("🧬 Analizar genes vecinos (sintenia)"):
+    gff_file_synt, gff_file_synt_name, fuente_synt = cargar_archivo_con_opcion("GFF3 (.gff3/.gz) para sintenia", ["gff3", "gz"], "gff_synt")
+    gene_id_synt = st.text_input("ID del gen ortólogo a comparar (ej: AT5G25350)", key="gene_synt")
+
+    if gff_file_synt and gene_id_synt:
+        params = {"gff": local_path(gff_file_synt), "gene_id": gene_id_synt, "protein_id": None, "flank_genes": 3}
+        job = seguir_job(enviar_job("neighbors", params), "job_vecinos")
+        if job:
+            vecinos = job["result"]
+            if vecinos["center"]:
+                mostrar_vecinos(vecinos)
+            else:
+                st.error("No se encontró el gen en el archivo GFF.")
+
+        if fuente_synt == "Elegir desde carpeta 'data'":
+            gff_file_synt.close()
+
+
+with st.expander("🔍 Buscar ID de gen desde ID de proteína (archivo GFF)"):
+    gff_protein_file, gff_protein_file_name, fuente_prot = cargar_archivo_con_opcion("GFF3 (.gff3/.gz) para búsqueda", ["gff3", "gz"], "gff_protein")
+    protein_id_input = st.text_input("ID de proteína ortóloga (ej: XP_006842065.1)", key="prot_input")
+
+    if gff_protein_file and protein_id_input:
+        params = {"gff": local_path(gff_protein_file), "protein_id": protein_id_input}
+        job = seguir_job(enviar_job("protein_to_gene", params), "job_proteina")
+        if job:
+            gene_id_result = job["result"]
+            if gene_id_result:
+                st.success(f"Gene ID correspondiente: {gene_id_result}")
+            else:
+                st.error("No se encontró un gene ID correspondiente en el archivo.")
+
+        if fuente_prot == "Elegir desde carpeta 'data'":
+            gff_protein_file.close()
+
+with st.expander("🔄 Buscar gene ID y analizar genes vecinos automáticamente"):
+    gff_combo_file, gff_combo_file_name, fuente_combo = cargar_archivo_con_opcion("GFF3 (.gff3/.gz)", ["gff3", "gz"], "gff_combo")
+    protein_input = st.text_input("ID de proteína ortóloga (ej: XP_006842065.1)", key="prot_combo_input")
+
+    if gff_combo_file and protein_input:
+        params = {"gff": local_path(gff_combo_file), "gene_id": None, "protein_id": protein_input, "flank_genes": 3}
+        job = seguir_job(enviar_job("neighbors", params), "job_proteina_vecinos")
+        if job:
+            vecinos = job["result"]
+            if vecinos:
+                st.success(f"Gene ID correspondiente: {vecinos['gene']}")
+                if vecinos["center"]:
+                    mostrar_vecinos(vecinos)
+                else:
+                    st.warning("Gene ID encontrado, pero no se pudo analizar vecinos.")
+            else:
+                st.error("No se encontró un gene ID para ese ID de proteína.")
+
+        if fuente_combo == "Elegir desde carpeta 'data'":
+            gff_combo_file.close()
+
+cerrar_rerun()
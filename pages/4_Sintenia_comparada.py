@@ -0,0 +1,90 @@
+import streamlit as st
+
+from file_ui import cargar_archivo_con_opcion
+from job_ui import enviar_job, seguir_job
+from upload_cache_utils import local_path
+from visual_synteny import plot_synteny_tracks
+from perf_ui import iniciar_rerun, cerrar_rerun
+
+st.set_page_config(layout="wide")
+iniciar_rerun()
+st.title("🧬 Sintenia comparada entre dos especies")
+
+with st.expander("🧬 Comparar genes vecinos entre dos especies (sintenia comparada)"):
+    col1, col2 = st.columns(2)
+    with col1:
+        gff_species_a, gff_species_a_name, fuente_a = cargar_archivo_con_opcion("GFF3 especie A (referencia)", ["gff3", "gz"], "gff_species_a")
+        gene_a = st.text_input("🧬 ID de gen en especie A (ej: AT5G25350)", key="gene_a")
+    with col2:
+        gff_species_b, gff_species_b_name, fuente_b = cargar_archivo_con_opcion("GFF3 especie B (ortólogo)", ["gff3", "gz"], "gff_species_b")
+        gene_b = st.text_input("🧬 ID de gen ortólogo en especie B", key="gene_b")
+
+    modo_vecinos = st.radio("Vecinos a comparar", ["Por número de genes", "Por distancia (pb)"], key="modo_vecinos", horizontal=True)
+    if modo_vecinos == "Por número de genes":
+        n_vecinos = st.number_input("Genes a cada lado", min_value=1, max_value=200, value=3, key="n_vecinos")
+    else:
+        ventana_pb = st.number_input("Ventana a cada lado (pb)", min_value=1000, max_value=5000000, value=50000, step=1000, key="ventana_pb")
+
+    if gff_species_a and gff_species_b and gene_a and gene_b:
+        params = {
+            "gff_a": local_path(gff_species_a), "gene_a": gene_a,
+            "gff_b": local_path(gff_species_b), "gene_b": gene_b,
+            "flank_genes": int(n_vecinos) if modo_vecinos == "Por número de genes" else None,
+            "window_bp": int(ventana_pb) if modo_vecinos == "Por distancia (pb)" else None,
+        }
+        job = seguir_job(enviar_job("synteny", params), "job_sintenia")
+        comparacion = job["result"] if job else None
+
+        if comparacion:
+            shared, unique_a, unique_b = comparacion["shared"], comparacion["unique_a"], comparacion["unique_b"]
+
+            st.success(f"🔗 Genes vecinos compartidos: {len(shared)}")
+            st.markdown("**🟢 Comunes:**")
+            for g in sorted(shared):
+                st.write(f"✔️ {g}")
+
+            st.markdown("**🔴 Únicos en especie A:**")
+            for g in sorted(unique_a):
+                st.write(f"❌ {g}")
+
+            st.markdown("**🔵 Únicos en especie B:**")
+            for g in sorted(unique_b):
+                st.write(f"❌ {g}")
+        elif job:
+            st.error("No se pudieron obtener los genes vecinos de una de las especies.")
+
+        if fuente_a == "Elegir desde carpeta 'data'":
+            gff_species_a.close()
+        if fuente_b == "Elegir desde carpeta 'data'":
+            gff_species_b.close()
+
+
+with st.expander("🧬 Comparar genes vecinos + visualización"):
+    col1, col2 = st.columns(2)
+    with col1:
+        gff_species_a, gff_species_a_name, fuente_a = cargar_archivo_con_opcion("GFF3 especie A (referencia)", ["gff3", "gz"], "gff_va")
+        gene_a = st.text_input("ID gen especie A (ej: AT5G25350)", key="gene_viz_a")
+    with col2:
+        gff_species_b, gff_species_b_name, fuente_b = cargar_archivo_con_opcion("GFF3 especie B (ortólogo)", ["gff3", "gz"], "gff_viz_b")
+        gene_b = st.text_input("ID gen especie B (ej: Eucgr.Hxxxx)", key="gene_viz_b")
+
+    if gff_species_a and gff_species_b and gene_a and gene_b:
+        params = {"gff_a": local_path(gff_species_a), "gene_a": gene_a, "gff_b": local_path(gff_species_b), "gene_b": gene_b,
+                  "flank_genes": 3, "window_bp": None}
+        job = seguir_job(enviar_job("synteny", params), "job_sintenia_viz")
+        comparacion = job["result"] if job else None
+
+        if comparacion:
+            center_a, up_a, down_a = comparacion["a"]
+            center_b, up_b, down_b = comparacion["b"]
+            fig = plot_synteny_tracks(center_a, up_a, down_a, center_b, up_b, down_b, set(comparacion["shared"]))
+            st.plotly_chart(fig, use_container_width=True)
+        elif job:
+            st.error("No se pudieron obtener los genes vecinos de una de las especies.")
+
+        if fuente_a == "Elegir desde carpeta 'data'":
+            gff_species_a.close()
+        if fuente_b == "Elegir desde carpeta 'data'":
+            gff_species_b.close()
+
+cerrar_rerun()
@@ -0,0 +1,46 @@
+import streamlit as st
+
+from job_ui import enviar_job, seguir_job
+from sequence_utils import SEQUENCE_KINDS, DEFAULT_KINDS
+from upload_cache_utils import local_path
+from perf_ui import iniciar_rerun, cerrar_rerun
+
+st.set_page_config(layout="wide")
+iniciar_rerun()
+st.title("🧬 Extraer secuencias del gen")
+
+gff_file = st.file_uploader("📄 Archivo GFF3", type=["gff3", "gz"])
+genome_fasta = st.file_uploader("🧬 FASTA de genoma (DNA)", type=["fa", "fasta", "gz"], key="genome")
+protein_fasta = st.file_uploader("🧪 FASTA de proteínas (opcional: si falta, se traduce el CDS)", type=["fa", "fasta", "gz"], key="protein")
+gene_id = st.text_input("🔍 ID del gen (ej: AT5G25350)")
+tipo = st.selectbox("🧬 Tipo de secuencia a extraer", list(SEQUENCE_KINDS))
+
+if gff_file and genome_fasta and gene_id:
+    # Se ejecuta en segundo plano; un rerun no la relanza (resultado memorizado por hash de entradas)
+    params = {"gff": local_path(gff_file), "genome": local_path(genome_fasta),
+              "protein": local_path(protein_fasta) if protein_fasta else None, "gene_id": gene_id, "tipo": tipo}
+    job = seguir_job(enviar_job("extraction", params), "job_extraccion")
+    if job:
+        seq = job["result"]
+        if seq:
+            st.code(seq, language="text")
+        else:
+            st.error("No se pudo encontrar o extraer la secuencia.")
+
+st.markdown("**📦 Multi-FASTA de varios genes**")
+ids_multi = st.text_area("IDs de gen o de proteína (uno por línea)", key="multi_ids")
+tipos_multi = st.multiselect("Secuencias por gen", list(SEQUENCE_KINDS), default=list(DEFAULT_KINDS), key="multi_kinds")
+ids_multi = [line.strip() for line in ids_multi.splitlines() if line.strip()]
+if gff_file and genome_fasta and ids_multi and tipos_multi:
+    if st.button("📦 Generar multi-FASTA"):
+        st.session_state["multi_job"] = enviar_job("multifasta", {
+            "gff": local_path(gff_file), "genome": local_path(genome_fasta), "ids": ids_multi, "kinds": tipos_multi,
+        })
+    if "multi_job" in st.session_state:
+        job = seguir_job(st.session_state["multi_job"], "job_multifasta")
+        if job:
+            st.caption(f"{job['result']['records']} secuencias")
+            with open(job["result"]["path"], "rb") as f:
+                st.download_button("📤 Descargar FASTA", f, file_name="EBF2_secuencias.fa", mime="text/plain")
+
+cerrar_rerun()
@@ -1,11 +1,15 @@
 import streamlit as st
 import pandas as pd
-import plotly.express as px
-from gff_utils import extract_exons_utr3
-from synteny_utils import extract_neighbors
-from compare_neighbors_utils import compare_gene_neighbors
+import plotly.graph_objects as go
+from job_ui import enviar_job, seguir_job
+from upload_cache_utils import local_path
 from visual_synteny import plot_synteny_tracks
-from app import get_all_records
+from db_utils import get_all_records
+from perf_ui import iniciar_rerun, cerrar_rerun
+
+st.set_page_config(layout="wide")
+iniciar_rerun()
+st.title("🌱 Comparar con Arabidopsis (EBF2)")
 
 # Punto 2: Comparación de arquitectura génica vs Arabidopsis
 with st.expander("🧬 Comparar arquitectura génica con Arabidopsis"):
@@ -21,7 +25,13 @@ with st.expander("🧬 Comparar arquitectura génica con Arabidopsis"):
         st.write("🧬 Diferencia en número de exones y longitud del 3'UTR respecto a Arabidopsis (EBF2)")
         st.dataframe(df[["species", "ortholog_id", "exons", "exons_diff", "utr3", "utr3_diff"]])
 
-        fig = px.scatter(df, x="exons_diff", y="utr3_diff", hover_name="species", title="Comparación estructural vs Arabidopsis")
+        # go.Scatter y no plotly.express: px tarda ~80 ms en importarse y solo hace falta aquí
+        fig = go.Figure(go.Scatter(
+            x=df["exons_diff"], y=df["utr3_diff"], text=df["species"], mode="markers",
+            hovertemplate="<b>%{text}</b><br>exons_diff=%{x}<br>utr3_diff=%{y}<extra></extra>",
+        ))
+        fig.update_layout(title="Comparación estructural vs Arabidopsis", xaxis_title="exons_diff",
+                          yaxis_title="utr3_diff")
         st.plotly_chart(fig, use_container_width=True)
     else:
         st.warning("No se encontró el gen AT5G25350 como referencia.")
@@ -34,12 +44,19 @@ with st.expander("🧬 Ver si se conserva la sintenia con Arabidopsis"):
     ortho_gene_id = st.text_input("ID del gen ortólogo a comparar", key="ortho_gene_id")
 
     if arabidopsis_gff and ortho_gff and ortho_gene_id:
-        ca, upa, downa = extract_neighbors(arabidopsis_gff, "AT5G25350", is_gz=arabidopsis_gff.name.endswith(".gz"))
-        cb, upb, downb = extract_neighbors(ortho_gff, ortho_gene_id, is_gz=ortho_gff.name.endswith(".gz"))
-
-        if ca and cb:
-            shared, _, _ = compare_gene_neighbors(upa, downa, upb, downb)
+        # Mismo trabajo que la sintenia comparada, con AT5G25350 como especie A
+        params = {"gff_a": local_path(arabidopsis_gff), "gene_a": "AT5G25350", "gff_b": local_path(ortho_gff),
+                  "gene_b": ortho_gene_id, "flank_genes": 3, "window_bp": None}
+        job = seguir_job(enviar_job("synteny", params), "job_sintenia_arabidopsis")
+        comparacion = job["result"] if job else None
+
+        if comparacion:
+            ca, upa, downa = comparacion["a"]
+            cb, upb, downb = comparacion["b"]
+            shared = set(comparacion["shared"])
             st.success(f"Genes vecinos compartidos: {len(shared)}")
             st.plotly_chart(plot_synteny_tracks(ca, upa, downa, cb, upb, downb, shared))
-        else:
-            st.error("No se pudo encontrar el gen o sus vecinos en alguno de los archivos.")
\ No newline at end of file
+        elif job:
+            st.error("No se pudo encontrar el gen o sus vecinos en alguno de los archivos.")
+
+cerrar_rerun()
@@ -0,0 +1,68 @@
+import os
+
+import streamlit as st
+
+from batch_architecture import load_mapping
+from db_utils import get_all_records
+from visual_synteny import MAX_SEGMENTS, multi_species_data, synteny_figure
+from perf_ui import iniciar_rerun, cerrar_rerun
+
+st.set_page_config(layout="wide")
+iniciar_rerun()
+st.title("🧬 Sintenia entre varias especies")
+
+st.markdown(
+    "Una pista por especie en coordenadas reales, centrada en el ortólogo de la base de datos. "
+    "Las anotaciones se toman de `annotations.tsv` (página de arquitectura por lotes)."
+)
+
+records = get_all_records()
+mapping = load_mapping()
+# Un ortólogo por especie: el primer registro con ID y anotación disponible (sin hit el ID es '')
+candidatos = records[records["ortholog_id"].fillna("").str.strip() != ""].drop_duplicates("species")
+candidatos = candidatos[candidatos["species"].map(lambda s: os.path.exists(mapping.get(s, "")))]
+
+if candidatos.empty:
+    st.info("No hay especies con ortólogo y anotación GFF3 asignada.")
+else:
+    especies = st.multiselect("Especies (en el orden de las pistas)", list(candidatos["species"]),
+                              default=list(candidatos["species"]), key="multi_species")
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        modo = st.radio("Ventana", ["Por número de genes", "Por distancia (pb)"], key="multi_modo", horizontal=True)
+        if modo == "Por número de genes":
+            n_vecinos = st.number_input("Genes a cada lado", min_value=1, max_value=5000, value=50, key="multi_n")
+        else:
+            ventana_pb = st.number_input("Ventana a cada lado (pb)", min_value=1000, max_value=50000000, value=200000,
+                                         step=1000, key="multi_pb")
+    with col2:
+        ortogrupos = st.text_input("Ortogrupos (TSV u Orthogroups.tsv, opcional)", key="multi_orthogroups").strip()
+        if not ortogrupos:
+            st.caption("Sin ortogrupos solo se unen genes con el mismo ID y los ortólogos centrales.")
+    with col3:
+        max_segmentos = st.number_input("Genes por pista antes de agrupar", min_value=50, max_value=5000,
+                                        value=MAX_SEGMENTS, step=50, key="multi_max")
+
+    if ortogrupos and not os.path.exists(ortogrupos):
+        st.warning(f"Archivo de ortogrupos no encontrado: {ortogrupos}")
+    elif especies:
+        ortologos = dict(zip(candidatos["species"], candidatos["ortholog_id"]))
+        entries = [(s, mapping[s], ortologos[s]) for s in especies]
+        barra = st.progress(0.0)
+        data, sin_gen = multi_species_data(
+            entries,
+            flank_genes=int(n_vecinos) if modo == "Por número de genes" else None,
+            window_bp=int(ventana_pb) if modo == "Por distancia (pb)" else None,
+            orthogroups_path=ortogrupos or None,
+            max_segments=int(max_segmentos),
+            progress=lambda hechos, total: barra.progress(hechos / total, text=f"{hechos}/{total} especies"),
+        )
+        barra.empty()
+        if sin_gen:
+            st.warning("Ortólogo no encontrado en la anotación de: " + ", ".join(sin_gen))
+        if data["labels"]:
+            st.plotly_chart(synteny_figure(data), use_container_width=True)
+            st.caption(f"{sum(data['genes'])} genes en {len(data['labels'])} pistas; "
+                       "las pistas marcadas como agrupadas muestran bloques de genes (pasa el ratón para ver cuántos).")
+
+cerrar_rerun()
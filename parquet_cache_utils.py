@@ -0,0 +1,207 @@
+import os
+import shutil
+import tempfile
+
+import pyarrow as pa
+import pyarrow.dataset as ds
+
+from gene_index_utils import flanking_genes, genes_within, index_genes
+from gff_store_utils import connect_store
+from transcript_model_utils import TRANSCRIPT_TYPES, assemble_models
+from upload_cache_utils import evict, touch
+
+# Tabla Parquet -> tipos GFF3 que guarda
+TABLES = {
+    "gene": ("gene",),
+    "mRNA": TRANSCRIPT_TYPES,
+    "exon": ("exon",),
+    "utr": ("five_prime_UTR", "three_prime_UTR"),
+    "cds": ("CDS",),
+}
+# Columnas del store salvo el texto crudo de atributos, que se queda en SQLite.
+# row es el rowid del store (desempate estable) y canonical, el tag Ensembl_canonical
+SCHEMA = pa.schema(
+    [("row", pa.int64()), ("seqid", pa.string()), ("type", pa.string()), ("start", pa.int64()),
+     ("end", pa.int64()), ("strand", pa.string()), ("phase", pa.string())]
+    + [(c, pa.string()) for c in ("id", "name", "parent", "parent_name", "protein_id", "alias")]
+    + [("canonical", pa.bool_())]
+)
+# seqid siempre como texto (si no, "1", "2"... se leerían como enteros)
+PARTITIONING = ds.partitioning(pa.schema([("seqid", pa.string())]), flavor="hive")
+ROW_GROUP_ROWS = 64 * 1024
+
+# (directorio, tabla) -> pyarrow Dataset ya descubierto
+_datasets = {}
+
+
+def parquet_dir(db_path):
+    # Junto al store y con su misma raíz: .cache/gff/<sha1>.parquet/ se expulsa con <sha1>.db
+    return os.path.splitext(db_path)[0] + ".parquet"
+
+
+def build_parquet(db_path, out_dir):
+    """Exporta el store a tablas Parquet (gene/mRNA/exon/utr/cds) particionadas por seqid.
+
+    Se lee del store ya creado, así que el GFF3 no se vuelve a parsear.
+    """
+    columns = [field.name for field in SCHEMA if field.name not in ("row", "canonical")]
+    tmp_dir = tempfile.mkdtemp(suffix=".tmp", dir=os.path.dirname(os.path.abspath(out_dir)))
+    conn = connect_store(db_path)
+    try:
+        for name, types in TABLES.items():
+            rows = conn.execute(
+                f"SELECT rowid, {', '.join(columns)}, "
+                f"coalesce(instr(attributes, 'Ensembl_canonical') > 0, 0) FROM features "
+                f"WHERE type IN ({','.join('?' * len(types))}) ORDER BY seqid, start, rowid",
+                types,
+            ).fetchall()
+            if not rows:
+                continue
+            values = list(zip(*rows))
+            values[-1] = [bool(v) for v in values[-1]]
+            table = pa.Table.from_arrays([pa.array(v, type=f.type) for v, f in zip(values, SCHEMA)], schema=SCHEMA)
+            # Ordenado por posición: las estadísticas de start/end de cada row group sirven para filtrar rangos
+            ds.write_dataset(
+                table, os.path.join(tmp_dir, name), format="parquet", partitioning=PARTITIONING,
+                max_rows_per_group=ROW_GROUP_ROWS, max_partitions=max(1024, len(set(values[1]))),
+            )
+        conn.close()
+        os.replace(tmp_dir, out_dir)
+    except BaseException:
+        conn.close()
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        raise
+
+
+def ensure_parquet(db_path):
+    """Directorio Parquet del store; se crea la primera vez (el nombre ya es el hash del GFF)."""
+    out_dir = parquet_dir(db_path)
+    if os.path.isdir(out_dir):
+        touch(out_dir)
+    else:
+        # Datasets de un directorio ya expulsado apuntan a archivos que no existen
+        for key in [key for key in _datasets if key[0] == out_dir]:
+            del _datasets[key]
+        try:
+            build_parquet(db_path, out_dir)
+        except OSError:
+            # Otro proceso lo creó a la vez: os.replace no pisa un directorio no vacío
+            if not os.path.isdir(out_dir):
+                raise
+        evict(keep=out_dir)
+    return out_dir
+
+
+def _dataset(out_dir, table):
+    key = (out_dir, table)
+    dataset = _datasets.get(key)
+    if dataset is None:
+        table_dir = os.path.join(out_dir, table)
+        if not os.path.isdir(table_dir):
+            return None
+        dataset = _datasets[key] = ds.dataset(table_dir, format="parquet", partitioning=PARTITIONING)
+    return dataset
+
+
+def read_features(db_path, table, columns=None, filter=None):
+    """Lee una tabla del caché con proyección de columnas y filtros empujados al lector.
+
+    filter es una expresión de pyarrow.dataset, por ejemplo
+    (ds.field("seqid") == "1") & (ds.field("start") < 50000): el filtro por
+    seqid descarta particiones enteras y el de posición, row groups.
+    Devuelve una lista de dicts ordenada por posición.
+    """
+    columns = list(columns or SCHEMA.names)
+    dataset = _dataset(ensure_parquet(db_path), table)
+    if dataset is None:
+        return []
+    rows = dataset.to_table(columns=columns + ["row"], filter=filter).to_pylist()
+    # El orden de las particiones no está garantizado: se restablece el del store
+    rows.sort(key=lambda r: r["row"])
+    return rows
+
+
+def _isin(column, values):
+    # Con tipo explícito: un isin([]) sin tipo no se puede comparar con una columna de texto
+    return ds.field(column).isin(pa.array(list(values), type=pa.string()))
+
+
+def batch_gene_architecture(db_path, gene_ids):
+    """{id de gen: (exones, longitud 3'UTR) del transcrito canónico}, leyendo solo las filas de esos genes.
+
+    Mismo modelo que gene_architecture (transcript_model_utils); (0, 0) si
+    el gen no tiene transcritos y None si no está en la anotación.
+    """
+    gene_ids = list(set(gene_ids))
+    genes = {g["id"]: g for g in read_features(db_path, "gene", ["id", "name", "alias", "seqid", "start", "end", "strand"],
+                                               _isin("id", gene_ids))}
+    transcripts = read_features(db_path, "mRNA", ["id", "name", "parent", "seqid", "start", "strand", "canonical"],
+                                _isin("parent", genes))
+    transcripts.sort(key=lambda t: (t["seqid"], t["start"], t["row"]))
+    owners = _isin("parent", list(genes) + [t["id"] for t in transcripts])
+    part_rows = [
+        (part["type"], part["start"], part["end"], part["parent"], part["protein_id"], part["phase"])
+        for table in ("exon", "utr", "cds")
+        for part in read_features(db_path, table, ["type", "start", "end", "parent", "protein_id", "phase"], owners)
+    ]
+    models = assemble_models(genes, transcripts, part_rows)
+
+    result = {}
+    for gene_id in gene_ids:
+        if gene_id not in genes:
+            result[gene_id] = None
+        elif gene_id not in models["canonical"]:
+            result[gene_id] = (0, 0)
+        else:
+            i = models["canonical"][gene_id]
+            result[gene_id] = (models["n_exons"][i], models["utr3_len"][i])
+    return result
+
+
+def batch_neighbors(db_path, gene_names, flank_genes=10, window_bp=None):
+    """{nombre de gen: nombres de sus vecinos, o None si no está}, leyendo solo sus cromosomas.
+
+    Vecinos como flanking_genes (flank_genes a cada lado) o, con window_bp,
+    como genes_within.
+    """
+    wanted = set(gene_names)
+    seqids = {g["seqid"] for g in read_features(db_path, "gene", ["name", "seqid"], _isin("name", wanted))}
+    genes = read_features(db_path, "gene", ["seqid", "start", "end", "strand", "name"], _isin("seqid", seqids))
+    genes.sort(key=lambda g: (g["seqid"], g["start"], g["row"]))
+    index = index_genes((g["seqid"], g["start"], g["end"], g["strand"], g["name"]) for g in genes)
+
+    result = {}
+    for name in wanted:
+        if window_bp:
+            center, found = genes_within(index, name, window_bp)
+        else:
+            center, upstream, downstream = flanking_genes(index, name, flank_genes)
+            found = (upstream or []) + (downstream or [])
+        result[name] = [g["gene"] for g in found] if center is not None else None
+    return result
+
+
+def gene_products(db_path, gene_names):
+    """{nombre de gen: nombres de sus hijos y luego sus protein_id}, los IDs con los que un mapa de ortogrupos puede nombrarlo."""
+    genes = read_features(db_path, "gene", ["id", "name"], _isin("name", set(gene_names)))
+    owner = {}
+    for g in genes:
+        owner.setdefault(g["id"], g["name"])
+    children = []
+    for table in ("mRNA", "exon", "utr", "cds"):
+        children += read_features(db_path, table, ["id", "name", "parent"], _isin("parent", owner))
+    children.sort(key=lambda r: r["row"])
+    transcript_gene = {c["id"]: owner[c["parent"]] for c in children if c["id"]}
+    cds = read_features(db_path, "cds", ["parent", "protein_id"],
+                        _isin("parent", list(owner) + list(transcript_gene)) & ds.field("protein_id").is_valid())
+
+    products = {name: [] for name in owner.values()}
+    for child in children:
+        if child["name"] is not None:
+            products[owner[child["parent"]]].append(child["name"])
+    proteins = {name: [] for name in owner.values()}
+    for row in cds:
+        name = owner.get(row["parent"]) or transcript_gene[row["parent"]]
+        if row["protein_id"] not in proteins[name]:
+            proteins[name].append(row["protein_id"])
+    return {name: products[name] + proteins[name] for name in products}
@@ -0,0 +1,73 @@
+import cProfile
+import io
+import os
+import pstats
+import uuid
+
+import streamlit as st
+
+from perf_utils import PERF_DIR, begin_run, end_run, latency_table, load_spans
+
+PROFILE_LINES = 40
+
+
+def iniciar_rerun():
+    """Al principio del script: asocia los spans al rerun y arranca el perfil si se pidió."""
+    session = st.session_state.setdefault("perf_session", uuid.uuid4().hex[:12])
+    begin_run(session)
+    # Un perfil que quedó abierto (rerun interrumpido) se descarta
+    stale = st.session_state.pop("_perf_profiler", None)
+    if stale is not None:
+        stale.disable()
+    if st.session_state.pop("perf_profile_next", False):
+        profiler = cProfile.Profile()
+        st.session_state["_perf_profiler"] = profiler
+        profiler.enable()
+
+
+def cerrar_rerun():
+    """Al final del script: span del rerun completo y, si había perfil, su resumen."""
+    end_run()
+    profiler = st.session_state.pop("_perf_profiler", None)
+    if profiler is None:
+        return
+    profiler.disable()
+    os.makedirs(PERF_DIR, exist_ok=True)
+    path = os.path.join(PERF_DIR, f"{st.session_state['perf_session']}.prof")
+    profiler.dump_stats(path)
+    out = io.StringIO()
+    pstats.Stats(profiler, stream=out).sort_stats("cumulative").print_stats(PROFILE_LINES)
+    st.session_state["perf_profile"] = (path, out.getvalue())
+    # La pestaña ya se pintó en este rerun: otro rerun para mostrar el perfil
+    st.rerun()
+
+
+def pestaña_rendimiento():
+    alcance = st.radio("Spans de", ["Esta sesión", "Todas las sesiones"], horizontal=True, key="perf_scope")
+    session = st.session_state.get("perf_session") if alcance == "Esta sesión" else None
+    spans = load_spans(session=session)
+
+    if spans.empty:
+        st.info("Aún no hay spans registrados (se escriben en .cache/perf/spans.jsonl).")
+    else:
+        st.markdown("**Latencia por función (ms)**")
+        st.dataframe(latency_table(spans).round(2), use_container_width=True, hide_index=True)
+
+        # El rerun actual aún no terminó: se muestra el último completo de la sesión
+        reruns = spans[(spans["name"] == "app.rerun") & (spans["session"] == st.session_state.get("perf_session"))]
+        if not reruns.empty:
+            last = reruns.iloc[-1]
+            st.markdown(f"**Último rerun: {last['ms']:.0f} ms**")
+            detalle = spans[(spans["run"] == last["run"]) & (spans["name"] != "app.rerun")]
+            columnas = [c for c in detalle.columns if c not in ("ts", "session", "run", "pid")]
+            st.dataframe(detalle[columnas].dropna(axis=1, how="all").round(2), use_container_width=True, hide_index=True)
+
+    st.markdown("**Perfil (cProfile)**")
+    if st.button("🎯 Perfilar el siguiente rerun", key="perf_profile_button"):
+        st.session_state["perf_profile_next"] = True
+        st.rerun()
+    if "perf_profile" in st.session_state:
+        path, resumen = st.session_state["perf_profile"]
+        st.code(resumen, language="text")
+        with open(path, "rb") as f:
+            st.download_button("📤 Descargar .prof", f, file_name="ebf2_rerun.prof", key="perf_profile_download")
@@ -0,0 +1,162 @@
+import atexit
+import functools
+import json
+import os
+import threading
+import time
+import uuid
+from collections import defaultdict
+from contextlib import contextmanager
+
+PERF_DIR = os.path.join(".cache", "perf")
+PERF_LOG = os.path.join(PERF_DIR, "spans.jsonl")
+# Al superar este tamaño el log pasa a spans.jsonl.1 (se guarda una sola rotación)
+PERF_LOG_BYTES = 5 * 1024 ** 2
+# Spans en memoria antes de escribirlos sin esperar al fin del rerun (trabajos largos, scripts)
+FLUSH_SPANS = 500
+# EBF2_PERF=0 desactiva la instrumentación (los decoradores quedan como llamadas directas)
+ENABLED = os.environ.get("EBF2_PERF", "1") != "0"
+
+# Rerun en curso y pila de spans abiertos, por hilo (cada sesión de Streamlit corre en su hilo)
+_local = threading.local()
+_lock = threading.Lock()
+_flush_lock = threading.Lock()
+# nombre -> [llamadas, segundos] en este proceso
+_counters = defaultdict(lambda: [0, 0.0])
+# Spans aún sin escribir en el log (de todos los hilos)
+_pending = []
+
+
+def flush(path=PERF_LOG):
+    """Escribe en el log los spans pendientes, en una sola apertura del archivo."""
+    global _pending
+    with _lock:
+        records, _pending = _pending, []
+    if not records:
+        return
+    lines = "".join(json.dumps(record, default=str) + "\n" for record in records)
+    with _flush_lock:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "a", encoding="utf-8") as f:
+            f.write(lines)
+
+
+# Scripts y procesos que no pasan por end_run
+atexit.register(flush)
+
+
+def begin_run(session=None, path=PERF_LOG):
+    """Marca el inicio de un rerun: los spans siguientes de este hilo quedan asociados a él."""
+    try:
+        if os.path.getsize(path) > PERF_LOG_BYTES:
+            os.replace(path, path + ".1")
+    except OSError:
+        pass
+    _local.session = session
+    _local.run = uuid.uuid4().hex[:12]
+    _local.run_start = time.perf_counter()
+    _local.stack = []
+    return _local.run
+
+
+def end_run(name="app.rerun"):
+    """Cierra el rerun con un span de su duración total."""
+    start = getattr(_local, "run_start", None)
+    if not ENABLED or start is None:
+        return
+    record = {
+        "ts": time.time(), "session": _local.session, "run": _local.run, "pid": os.getpid(),
+        "name": name, "parent": None, "ms": (time.perf_counter() - start) * 1000,
+    }
+    with _lock:
+        _pending.append(record)
+    _local.run_start = None
+    flush()
+
+
+@contextmanager
+def span(name, **fields):
+    """Mide un bloque; fields (y lo que se añada al dict devuelto) se guarda con el span."""
+    if not ENABLED:
+        yield fields
+        return
+    stack = getattr(_local, "stack", None)
+    if stack is None:
+        stack = _local.stack = []
+    parent = stack[-1] if stack else None
+    stack.append(name)
+    t0 = time.perf_counter()
+    try:
+        yield fields
+    finally:
+        seconds = time.perf_counter() - t0
+        stack.pop()
+        record = {
+            "ts": time.time(), "session": getattr(_local, "session", None), "run": getattr(_local, "run", None),
+            "pid": os.getpid(), "name": name, "parent": parent, "ms": seconds * 1000, **fields,
+        }
+        with _lock:
+            counter = _counters[name]
+            counter[0] += 1
+            counter[1] += seconds
+            _pending.append(record)
+            full = len(_pending) >= FLUSH_SPANS
+        if full:
+            flush()
+
+
+def timed(fn):
+    """Decorador: un span por llamada con el nombre módulo.función."""
+    name = f"{fn.__module__}.{fn.__name__}"
+
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        with span(name):
+            return fn(*args, **kwargs)
+    return wrapper
+
+
+def counters():
+    """Llamadas y tiempo acumulado por span en este proceso."""
+    with _lock:
+        return {name: {"calls": calls, "total_ms": seconds * 1000} for name, (calls, seconds) in _counters.items()}
+
+
+def load_spans(path=PERF_LOG, session=None, max_rows=50000):
+    """Spans del log (incluida la rotación anterior) como DataFrame, los más recientes al final."""
+    # pandas solo hace falta para leer el log, no para registrar spans
+    import pandas as pd
+
+    lines = []
+    for p in (path + ".1", path):
+        if os.path.exists(p):
+            with open(p, encoding="utf-8") as f:
+                lines += f.readlines()
+    records = []
+    for line in lines[-max_rows:]:
+        try:
+            records.append(json.loads(line))
+        except ValueError:
+            continue  # línea a medio escribir por otro proceso
+    df = pd.DataFrame(records, columns=None if records else ["ts", "session", "run", "pid", "name", "parent", "ms"])
+    if session is not None:
+        df = df[df["session"] == session]
+    return df.reset_index(drop=True)
+
+
+def latency_table(spans):
+    """Percentiles de latencia (ms) por función."""
+    import pandas as pd
+
+    if spans.empty:
+        return pd.DataFrame(columns=["name", "calls", "p50", "p90", "p99", "max", "total"])
+    grouped = spans.groupby("name")["ms"]
+    table = pd.DataFrame({
+        "calls": grouped.size(),
+        "p50": grouped.quantile(0.5),
+        "p90": grouped.quantile(0.9),
+        "p99": grouped.quantile(0.99),
+        "max": grouped.max(),
+        "total": grouped.sum(),
+    })
+    return table.sort_values("total", ascending=False).reset_index()
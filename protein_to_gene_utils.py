@@ -1,30 +1,23 @@
-import gzip
-from io import BytesIO, TextIOWrapper
+from gff_store_utils import gff_store_path, find_by_protein, get_feature
+from perf_utils import timed
 
 def is_gzipped_by_content(file_bytes):
     return file_bytes[:2] == b'\x1f\x8b'
 
-def find_gene_id_from_protein(uploaded_file, protein_id):
-    if uploaded_file is None:
+def gene_id_from_protein(db_path, protein_id):
+    feat = find_by_protein(db_path, protein_id)
+    if feat is None:
         return None
 
-    file_bytes = uploaded_file.read()
-    buffer = BytesIO(file_bytes)
+    # CDS -> transcrito -> gen
+    parent = get_feature(db_path, feat["parent"]) if feat["parent"] else None
+    if parent and parent["parent"]:
+        return parent["parent_name"]
+    return feat["parent_name"]
 
-    if is_gzipped_by_content(file_bytes):
-        f = gzip.open(buffer, 'rt')
-    else:
-        f = TextIOWrapper(buffer, encoding="utf-8")
+@timed
+def find_gene_id_from_protein(uploaded_file, protein_id):
+    if uploaded_file is None:
+        return None
 
-    for line in f:
-        if line.startswith("#"):
-            continue
-        fields = line.strip().split("\t")
-        if len(fields) < 9:
-            continue
-        attributes = fields[8]
-        if protein_id in attributes:
-            for part in attributes.split(";"):
-                if part.startswith("Parent="):
-                    return part.replace("Parent=", "").split(":")[-1]
-    return None
\ No newline at end of file
+    return gene_id_from_protein(gff_store_path(uploaded_file), protein_id)
\ No newline at end of file
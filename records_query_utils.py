@@ -0,0 +1,49 @@
+# SQL de las consultas de Records compartido por la app (db_utils) y el paquete de
+# solo lectura (replica_utils); sin Streamlit para que los scripts no lo carguen
+
+
+def records_where(filters):
+    """Cláusula WHERE y parámetros para los filtros de la tabla (clados, especie, identidad, e-value)."""
+    clauses = []
+    params = []
+    filters = filters or {}
+    if filters.get("clades"):
+        clauses.append(f"clade IN ({','.join('?' * len(filters['clades']))})")
+        params += list(filters["clades"])
+    if filters.get("species"):
+        clauses.append("species LIKE ?")
+        params.append(f"%{filters['species']}%")
+    if filters.get("identity"):
+        clauses.append("CAST(percent_identity AS REAL) BETWEEN ? AND ? AND percent_identity != ''")
+        params += list(filters["identity"])
+    if filters.get("max_evalue") is not None:
+        clauses.append("CAST(evalue AS REAL) <= ? AND evalue != ''")
+        params.append(filters["max_evalue"])
+    return (" WHERE " + " AND ".join(clauses) if clauses else ""), params
+
+
+def quantile_sql(p, alias):
+    # Interpolación lineal entre las posiciones floor/ceil de p * (n - 1), como pandas
+    pos = f"({p} * (n - 1))"
+    lo = f"CAST({pos} AS INTEGER)"
+    return (f"SUM(CASE WHEN rn = {lo} THEN pid * (1 - ({pos} - {lo})) "
+            f"WHEN rn = {lo} + 1 THEN pid * ({pos} - {lo}) ELSE 0 END) AS {alias}")
+
+
+def identity_quantiles_sql(where=""):
+    """SELECT de cuartiles de % identidad por clado (clade, n, min, q1, median, q3, max)."""
+    extra = "percent_identity IS NOT NULL AND percent_identity != ''"
+    where = f"{where} AND {extra}" if where else f" WHERE {extra}"
+    return f"""
+        WITH v AS (
+            SELECT clade, CAST(percent_identity AS REAL) AS pid FROM Records{where}
+        ), r AS (
+            SELECT clade, pid,
+                   ROW_NUMBER() OVER (PARTITION BY clade ORDER BY pid) - 1 AS rn,
+                   COUNT(*) OVER (PARTITION BY clade) AS n
+            FROM v
+        )
+        SELECT clade, MAX(n) AS n, MIN(pid) AS min, {quantile_sql(0.25, "q1")},
+               {quantile_sql(0.5, "median")}, {quantile_sql(0.75, "q3")}, MAX(pid) AS max
+        FROM r GROUP BY clade ORDER BY clade
+    """
@@ -0,0 +1,351 @@
+import argparse
+import json
+import os
+import sqlite3
+import tempfile
+import time
+import zlib
+from collections import defaultdict
+
+from records_query_utils import identity_quantiles_sql
+
+DB_PATH = "species_records.db"
+REPLICA_DIR = "replica"
+BUNDLE_PATH = os.path.join(REPLICA_DIR, "ebf2_replica.db")
+BUNDLE_FORMAT = 1
+# Secuencias por registro que viajan en el paquete (comprimidas con zlib)
+BUNDLE_KINDS = ("DNA", "mRNA", "3'UTR", "Proteína")
+
+# Versión por fila en la base de edición: cada INSERT/UPDATE/DELETE de Records
+# recibe la siguiente versión global (los borrados quedan marcados con deleted = 1)
+_NEXT_VERSION = "(SELECT COALESCE(MAX(version), 0) + 1 FROM RecordVersions)"
+_VERSIONING_SQL = f"""
+    CREATE TABLE IF NOT EXISTS RecordVersions (
+        id INTEGER PRIMARY KEY,
+        version INTEGER NOT NULL,
+        deleted INTEGER NOT NULL DEFAULT 0
+    );
+    CREATE INDEX IF NOT EXISTS idx_record_versions ON RecordVersions (version);
+    CREATE TRIGGER IF NOT EXISTS records_version_insert AFTER INSERT ON Records BEGIN
+        INSERT OR REPLACE INTO RecordVersions (id, version, deleted) VALUES (NEW.id, {_NEXT_VERSION}, 0);
+    END;
+    CREATE TRIGGER IF NOT EXISTS records_version_update AFTER UPDATE ON Records BEGIN
+        INSERT OR REPLACE INTO RecordVersions (id, version, deleted)
+            SELECT OLD.id, {_NEXT_VERSION}, 1 WHERE OLD.id != NEW.id;
+        INSERT OR REPLACE INTO RecordVersions (id, version, deleted) VALUES (NEW.id, {_NEXT_VERSION}, 0);
+    END;
+    CREATE TRIGGER IF NOT EXISTS records_version_delete AFTER DELETE ON Records BEGIN
+        INSERT OR REPLACE INTO RecordVersions (id, version, deleted) VALUES (OLD.id, {_NEXT_VERSION}, 1);
+    END;
+"""
+
+_BUNDLE_SQL = """
+    CREATE TABLE Manifest (key TEXT PRIMARY KEY, value TEXT);
+    CREATE TABLE Deleted (id INTEGER PRIMARY KEY, row_version INTEGER NOT NULL);
+    CREATE TABLE Sequences (
+        record_id INTEGER,
+        kind TEXT,
+        gene TEXT,
+        transcript TEXT,
+        sequence BLOB,
+        PRIMARY KEY (record_id, kind)
+    );
+    CREATE TABLE CladeCounts (clade TEXT, count INTEGER);
+    CREATE TABLE IdentityQuantiles (clade TEXT, n INTEGER, min REAL, q1 REAL, median REAL, q3 REAL, max REAL);
+"""
+
+
+def ensure_row_versions(conn):
+    """Instala la versión por fila en la base de edición (idempotente).
+
+    Los registros que ya existían antes de instalarla quedan con versión 0.
+    """
+    with conn:
+        conn.executescript(_VERSIONING_SQL)
+        conn.execute("INSERT OR IGNORE INTO RecordVersions (id, version) SELECT id, 0 FROM Records")
+
+
+def _source(db_path):
+    conn = sqlite3.connect(db_path, timeout=30)
+    conn.execute("PRAGMA busy_timeout = 30000")
+    ensure_row_versions(conn)
+    return conn
+
+
+def _changes(src, since):
+    """Filas de Records con versión > since y registros borrados desde entonces, en una sola lectura."""
+    with src:  # transacción de lectura: filas y versión máxima consistentes entre sí
+        src.execute("BEGIN")
+        version = src.execute("SELECT COALESCE(MAX(version), 0) FROM RecordVersions").fetchone()[0]
+        cursor = src.execute(
+            "SELECT r.*, v.version FROM Records r JOIN RecordVersions v ON v.id = r.id "
+            "WHERE v.version > ? AND v.deleted = 0 ORDER BY r.id", (since,)
+        )
+        columns = [d[0] for d in cursor.description][:-1]
+        rows = cursor.fetchall()
+        deleted = src.execute(
+            "SELECT id, version FROM RecordVersions WHERE version > ? AND deleted = 1", (since,)
+        ).fetchall()
+    return version, columns, rows, deleted
+
+
+def _species_sequences(annotation, genome, items, kinds):
+    from gff_store_utils import gff_store_path
+    from protein_to_gene_utils import gene_id_from_protein
+    from sequence_utils import cargar_fasta, gene_sequences
+
+    db_path = gff_store_path(annotation)
+    fasta = cargar_fasta(genome)
+    rows = []
+    for record_id, ortholog_id in items:
+        seqs = gene_sequences(db_path, fasta, ortholog_id, kinds)
+        if seqs is None:
+            gene_id = gene_id_from_protein(db_path, ortholog_id)
+            seqs = gene_sequences(db_path, fasta, gene_id, kinds) if gene_id else None
+        for kind in kinds:
+            if seqs and seqs.get(kind):
+                rows.append((record_id, kind, seqs["gene"], seqs["transcript"], zlib.compress(seqs[kind].encode())))
+    return rows
+
+
+def collect_sequences(rows, columns, mapping, genomes, kinds=BUNDLE_KINDS, progress=None):
+    """Secuencias del ortólogo de cada fila (solo especies con anotación y genoma)."""
+    id_col, species_col, ortholog_col = (columns.index(c) for c in ("id", "species", "ortholog_id"))
+    groups = defaultdict(list)
+    for row in rows:
+        species, ortholog_id = row[species_col], row[ortholog_col]
+        if ortholog_id and species in mapping and species in genomes:
+            groups[(mapping[species], genomes[species])].append((row[id_col], ortholog_id))
+    out = []
+    for done, ((annotation, genome), items) in enumerate(groups.items(), start=1):
+        out += _species_sequences(annotation, genome, items, kinds)
+        if progress:
+            progress(done, len(groups), annotation)
+    return out
+
+
+def _write_rows(conn, columns, rows, deleted, sequences):
+    placeholders = ",".join("?" * (len(columns) + 1))
+    ids = [(row[columns.index("id")],) for row in rows] + [(record_id,) for record_id, _ in deleted]
+    # Una fila cambiada pierde sus secuencias anteriores aunque ya no tenga ortólogo
+    conn.executemany("DELETE FROM Sequences WHERE record_id = ?", ids)
+    conn.executemany("DELETE FROM Records WHERE id = ?", [(record_id,) for record_id, _ in deleted])
+    conn.executemany(f"INSERT OR REPLACE INTO Records ({','.join(columns)}, row_version) VALUES ({placeholders})", rows)
+    # Un id borrado que vuelve a insertarse deja de contar como borrado
+    conn.executemany("DELETE FROM Deleted WHERE id = ?", [(row[columns.index("id")],) for row in rows])
+    conn.executemany("INSERT OR REPLACE INTO Deleted VALUES (?, ?)", deleted)
+    conn.executemany("INSERT OR REPLACE INTO Sequences VALUES (?, ?, ?, ?, ?)", sequences)
+
+
+def _write_derived(conn):
+    # Las consultas del visor quedan precalculadas: conteos y cuartiles de % identidad por clado
+    conn.execute("DELETE FROM CladeCounts")
+    conn.execute("INSERT INTO CladeCounts SELECT clade, COUNT(*) FROM Records GROUP BY clade ORDER BY clade")
+    conn.execute("DELETE FROM IdentityQuantiles")
+    conn.execute("INSERT INTO IdentityQuantiles " + identity_quantiles_sql())
+
+
+def _set_manifest(conn, **values):
+    conn.executemany("INSERT OR REPLACE INTO Manifest VALUES (?, ?)",
+                     [(key, json.dumps(value)) for key, value in values.items()])
+
+
+def bundle_manifest(conn):
+    return {key: json.loads(value) for key, value in conn.execute("SELECT key, value FROM Manifest")}
+
+
+def read_manifest(path):
+    conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+    try:
+        return bundle_manifest(conn)
+    finally:
+        conn.close()
+
+
+def _new_package(path, src, kind, base_version, version):
+    """Crea un paquete vacío (completo o delta) con el mismo esquema de Records que la base de edición."""
+    conn = sqlite3.connect(path)
+    records_sql = src.execute("SELECT sql FROM sqlite_master WHERE type = 'table' AND name = 'Records'").fetchone()[0]
+    conn.executescript(_BUNDLE_SQL)
+    conn.execute(records_sql)
+    conn.execute("ALTER TABLE Records ADD COLUMN row_version INTEGER")
+    _set_manifest(conn, format=BUNDLE_FORMAT, kind=kind, base_version=base_version, version=version,
+                  created=time.strftime("%Y-%m-%d %H:%M:%S"))
+    return conn
+
+
+def _load_sequence_maps(mapping_path, genomes_path):
+    from batch_architecture import load_mapping
+
+    return load_mapping(mapping_path), load_mapping(genomes_path)
+
+
+def export_delta(out_path, since=None, db_path=DB_PATH, sequences=True, mapping_path=None, genomes_path=None,
+                 progress=None):
+    """Escribe en out_path los cambios de Records con versión > since (since=None: instantánea completa).
+
+    Devuelve el manifiesto del paquete.
+    """
+    from batch_architecture import MAPPING_PATH
+    from rna_compare_utils import GENOMES_PATH
+
+    src = _source(db_path)
+    try:
+        full = since is None
+        # Los registros anteriores a la versión por fila tienen versión 0
+        version, columns, rows, deleted = _changes(src, -1 if full else since)
+        seqs = []
+        if sequences:
+            mapping, genomes = _load_sequence_maps(mapping_path or MAPPING_PATH, genomes_path or GENOMES_PATH)
+            seqs = collect_sequences(rows, columns, mapping, genomes, progress=progress)
+        # Se escribe aparte y se renombra: nadie llega a leer un paquete a medias
+        out_dir = os.path.dirname(os.path.abspath(out_path))
+        os.makedirs(out_dir, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(suffix=".db", dir=out_dir)
+        os.close(fd)
+        os.remove(tmp_path)
+        conn = _new_package(tmp_path, src, "full" if full else "delta", since, version)
+    finally:
+        src.close()
+    try:
+        with conn:
+            _write_rows(conn, columns, rows, [] if full else deleted, seqs)
+            _set_manifest(conn, records=len(rows), deleted=0 if full else len(deleted), sequences=len(seqs))
+            if full:
+                for column in ("clade", "species", "ortholog_id", "row_version"):
+                    conn.execute(f"CREATE INDEX idx_records_{column} ON Records ({column})")
+                _write_derived(conn)
+        conn.execute("VACUUM")
+    finally:
+        conn.close()
+    os.replace(tmp_path, out_path)
+    return read_manifest(out_path)
+
+
+def export_bundle(path=BUNDLE_PATH, db_path=DB_PATH, sequences=True, mapping_path=None, genomes_path=None,
+                  progress=None):
+    """Instantánea completa de solo lectura: Records, resultados derivados, secuencias y consultas del visor."""
+    return export_delta(path, None, db_path, sequences, mapping_path, genomes_path, progress)
+
+
+def apply_delta(bundle_path, delta_path):
+    """Aplica un delta al paquete en una sola transacción (los visores ven el estado anterior o el nuevo).
+
+    Devuelve el manifiesto actualizado; un delta ya aplicado no cambia nada.
+    """
+    bundle, delta = read_manifest(bundle_path), read_manifest(delta_path)
+    if delta["kind"] != "delta":
+        raise ValueError(f"{delta_path} no es un delta")
+    if delta["base_version"] > bundle["version"]:
+        raise ValueError(f"El delta parte de la versión {delta['base_version']} y el paquete está en la "
+                         f"{bundle['version']}: falta un delta intermedio")
+    if delta["version"] <= bundle["version"]:
+        return bundle
+
+    # uri=True también para poder adjuntar el delta en modo solo lectura
+    conn = sqlite3.connect(f"file:{bundle_path}", uri=True, timeout=30)
+    try:
+        conn.execute("ATTACH ? AS delta", (f"file:{delta_path}?mode=ro",))
+        with conn:
+            columns = [row[1] for row in conn.execute("PRAGMA delta.table_info(Records)")]
+            rows = conn.execute(f"SELECT {','.join(columns)} FROM delta.Records").fetchall()
+            deleted = conn.execute("SELECT id, row_version FROM delta.Deleted").fetchall()
+            seqs = conn.execute("SELECT * FROM delta.Sequences").fetchall()
+            _write_rows(conn, columns[:-1], rows, deleted, seqs)
+            _write_derived(conn)
+            records = conn.execute("SELECT COUNT(*) FROM Records").fetchone()[0]
+            sequences = conn.execute("SELECT COUNT(*) FROM Sequences").fetchone()[0]
+            deleted = conn.execute("SELECT COUNT(*) FROM Deleted").fetchone()[0]
+            _set_manifest(conn, version=delta["version"], updated=delta["created"], records=records,
+                          deleted=deleted, sequences=sequences, deltas=bundle.get("deltas", 0) + 1)
+        conn.execute("DETACH delta")
+    finally:
+        conn.close()
+    return read_manifest(bundle_path)
+
+
+def update_bundle(path=BUNDLE_PATH, db_path=DB_PATH, sequences=True, mapping_path=None, genomes_path=None,
+                  progress=None):
+    """Trae al paquete solo las filas cambiadas desde su versión (o lo crea si no existe)."""
+    if not os.path.exists(path):
+        return export_bundle(path, db_path, sequences, mapping_path, genomes_path, progress)
+    fd, delta_path = tempfile.mkstemp(suffix=".delta.db", dir=os.path.dirname(os.path.abspath(path)))
+    os.close(fd)
+    try:
+        export_delta(delta_path, read_manifest(path)["version"], db_path, sequences, mapping_path, genomes_path,
+                     progress)
+        return apply_delta(path, delta_path)
+    finally:
+        os.remove(delta_path)
+
+
+# Lecturas del visor: conexión de solo lectura al paquete
+
+def open_bundle(path=BUNDLE_PATH):
+    return sqlite3.connect(f"file:{path}?mode=ro", uri=True, check_same_thread=False)
+
+
+def bundle_records(conn, clades=(), species=""):
+    import pandas as pd
+
+    clauses, params = [], []
+    if clades:
+        clauses.append(f"clade IN ({','.join('?' * len(clades))})")
+        params += list(clades)
+    if species:
+        clauses.append("species LIKE ?")
+        params.append(f"%{species}%")
+    where = " WHERE " + " AND ".join(clauses) if clauses else ""
+    df = pd.read_sql_query(f"SELECT * FROM Records{where} ORDER BY id", conn, params=params)
+    return df.drop(columns="row_version")
+
+
+def bundle_table(conn, table, clades=()):
+    """Tabla precalculada (CladeCounts, IdentityQuantiles), opcionalmente solo de algunos clados."""
+    import pandas as pd
+
+    if table not in ("CladeCounts", "IdentityQuantiles"):
+        raise ValueError(f"Tabla desconocida: {table}")
+    df = pd.read_sql_query(f"SELECT * FROM {table} ORDER BY clade", conn)
+    return df[df["clade"].isin(clades)].reset_index(drop=True) if clades else df
+
+
+def bundle_sequences(conn, record_id):
+    """{tipo: (gen, transcrito, secuencia)} del ortólogo de un registro."""
+    rows = conn.execute("SELECT kind, gene, transcript, sequence FROM Sequences WHERE record_id = ?", (record_id,))
+    return {kind: (gene, transcript, zlib.decompress(seq).decode()) for kind, gene, transcript, seq in rows}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Paquete de solo lectura de la base de datos para el visor")
+    sub = parser.add_subparsers(dest="command", required=True)
+    for name, help_text in (("export", "Instantánea completa"), ("update", "Aplicar al paquete los cambios desde su versión")):
+        p = sub.add_parser(name, help=help_text)
+        p.add_argument("--bundle", default=BUNDLE_PATH)
+    delta = sub.add_parser("delta", help="Escribir un delta con las filas cambiadas desde una versión")
+    delta.add_argument("out")
+    delta.add_argument("--since", type=int, required=True, help="Versión del paquete al que se aplicará")
+    apply = sub.add_parser("apply", help="Aplicar un delta a un paquete")
+    apply.add_argument("delta")
+    apply.add_argument("--bundle", default=BUNDLE_PATH)
+    for p in (sub.choices["export"], sub.choices["update"], delta):
+        p.add_argument("--db", default=DB_PATH)
+        p.add_argument("--no-sequences", action="store_true", help="No incluir secuencias")
+        p.add_argument("--mapping", help="TSV species<TAB>ruta_gff3 (annotations.tsv por defecto)")
+        p.add_argument("--genomes", help="TSV species<TAB>ruta_fasta_genoma (genomes.tsv por defecto)")
+    args = parser.parse_args()
+
+    progress = lambda done, total, label: print(f"[{done}/{total}] {label}", flush=True)
+    if args.command == "apply":
+        manifest = apply_delta(args.bundle, args.delta)
+    elif args.command == "delta":
+        manifest = export_delta(args.out, args.since, args.db, not args.no_sequences, args.mapping, args.genomes,
+                                progress)
+    else:
+        fn = export_bundle if args.command == "export" else update_bundle
+        manifest = fn(args.bundle, args.db, not args.no_sequences, args.mapping, args.genomes, progress)
+    print(json.dumps(manifest, indent=1, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
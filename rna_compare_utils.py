@@ -0,0 +1,232 @@
+import argparse
+import hashlib
+import os
+import sqlite3
+import tempfile
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+import plotly.graph_objects as go
+
+from alignment_utils import CACHE_PATH, align_pairs
+from batch_architecture import DB_PATH, MAPPING_PATH, load_mapping
+from gff_store_utils import gff_store_path
+from protein_to_gene_utils import gene_id_from_protein
+from sequence_utils import cargar_fasta, gene_sequences
+from upload_cache_utils import evict
+
+# Mismo formato que annotations.tsv: especie<TAB>FASTA del genoma
+GENOMES_PATH = "genomes.tsv"
+MATRIX_DIR = os.path.join(".cache", "rna_compare")
+SEQUENCE_TYPES = ("3'UTR", "mRNA")
+# Prefiltro: un par no se alinea si no comparte más k-mers que dos secuencias al azar
+# (sin similitud detectable: NaN en la matriz). Con k=8 el umbral queda justo sobre el azar;
+# con k=11 y un umbral fijo del 1% se perdían los pares por debajo de ~65% de identidad
+KMER_SIZE = 8
+# Más cortas se alinean siempre: con tan pocos k-mers el prefiltro no distingue
+MIN_FILTER_LEN = 300
+# Identidad a partir de la cual un par pasa el prefiltro (≥93% de los pares a 300 pb y ≥99%
+# desde 1 kb, con secuencias simuladas); por debajo de ~55% el alineamiento da ~0% igualmente
+IDENTITY_FLOOR = 60
+
+
+def _species_sequences(annotation, genome, items, seq_type):
+    # Un proceso por anotación/genoma: el store y el índice FASTA se abren una vez
+    db_path = gff_store_path(annotation)
+    fasta = cargar_fasta(genome)
+    found = {}
+    for species, ortholog_id in items:
+        seqs = gene_sequences(db_path, fasta, ortholog_id, (seq_type,))
+        if seqs is None:
+            gene_id = gene_id_from_protein(db_path, ortholog_id)
+            seqs = gene_sequences(db_path, fasta, gene_id, (seq_type,)) if gene_id else None
+        if seqs and seqs.get(seq_type):
+            found[species] = seqs[seq_type]
+    return found
+
+
+def collect_sequences(mapping, genomes, seq_type="3'UTR", db_path=DB_PATH, workers=None):
+    """Secuencia (3'UTR o mRNA del transcrito canónico) del ortólogo de cada especie."""
+    conn = sqlite3.connect(db_path)
+    try:
+        records = conn.execute("SELECT species, ortholog_id FROM Records WHERE ortholog_id != ''").fetchall()
+    finally:
+        conn.close()
+
+    groups = defaultdict(list)
+    for species, ortholog_id in records:
+        if species in mapping and species in genomes:
+            groups[(mapping[species], genomes[species])].append((species, ortholog_id))
+
+    seqs = {}
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(_species_sequences, annotation, genome, items, seq_type)
+                   for (annotation, genome), items in groups.items()]
+        for future in futures:
+            seqs.update(future.result())
+    missing = sorted({species for species, _ in records} - set(seqs))
+    return seqs, missing
+
+
+def kmer_set(seq, k=KMER_SIZE):
+    seq = seq.upper()
+    return {seq[i:i + k] for i in range(len(seq) - k + 1)}
+
+
+def shared_kmers(a, b):
+    """Fracción de k-mers compartidos, sobre el conjunto menor."""
+    if not a or not b:
+        return 0.0
+    return len(a & b) / min(len(a), len(b))
+
+
+def chance_shared(n, k=KMER_SIZE):
+    """Fracción de k-mers de una secuencia que estarían por azar en un conjunto de n k-mers distintos."""
+    return 1.0 - (1.0 - 4.0 ** -k) ** n
+
+
+def _pair_identity(r):
+    # Identidad sobre la secuencia más corta (query): un alineamiento corto entre
+    # secuencias no relacionadas no cuenta como identidad alta
+    return r["identity"] * r["coverage"] / 100.0
+
+
+def matrix_path(seqs, seq_type, matrix_dir=MATRIX_DIR):
+    # La matriz depende solo de las secuencias (y su etiqueta) y del prefiltro, no de los archivos de origen
+    h = hashlib.sha1(f"{seq_type}\0k{KMER_SIZE}:{MIN_FILTER_LEN}".encode())
+    for label in sorted(seqs):
+        h.update(f"\0{label}\0{seqs[label]}".encode())
+    kind = "utr3" if seq_type == "3'UTR" else seq_type.lower()
+    return os.path.join(matrix_dir, f"{kind}_{h.hexdigest()}.csv")
+
+
+def pairwise_identity(seqs, seq_type="3'UTR", workers=None, cache_path=CACHE_PATH, matrix_dir=MATRIX_DIR,
+                      progress=None):
+    """Matriz todos contra todos de % identidad nucleotídica (DataFrame especie x especie).
+
+    Se alinean solo los pares que pasan el prefiltro de k-mers (o que son
+    demasiado cortos para filtrar); el resto queda en NaN. Los pares ya
+    alineados salen de .cache/alignments.db y la matriz completa se guarda
+    en CSV.
+    """
+    path = matrix_path(seqs, seq_type, matrix_dir)
+    if os.path.exists(path):
+        return pd.read_csv(path, index_col=0)
+
+    labels = sorted(seqs)
+    kmers = {label: kmer_set(seqs[label]) for label in labels}
+    matrix = pd.DataFrame(np.diag(np.full(len(labels), 100.0)), index=labels, columns=labels)
+    matrix[matrix == 0] = np.nan
+    to_align = {}
+    for i, first in enumerate(labels):
+        for second in labels[i + 1:]:
+            # La más corta como query
+            a, b = sorted((first, second), key=lambda label: len(seqs[label]))
+            short = len(seqs[a]) < MIN_FILTER_LEN
+            chance = chance_shared(max(len(kmers[a]), len(kmers[b])))
+            if short or shared_kmers(kmers[a], kmers[b]) > chance:
+                to_align[(a, b)] = (seqs[a], seqs[b])
+
+    results = align_pairs(to_align, mode="dna", workers=workers, cache_path=cache_path, progress=progress)
+
+    for (a, b), r in results.items():
+        matrix.loc[a, b] = matrix.loc[b, a] = _pair_identity(r)
+
+    os.makedirs(matrix_dir, exist_ok=True)
+    # Temporal único: dos trabajos con las mismas secuencias no se pisan
+    fd, tmp_path = tempfile.mkstemp(suffix=".tmp", dir=matrix_dir)
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8", newline="") as out:
+            matrix.to_csv(out)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.remove(tmp_path)
+        raise
+    evict(keep=path)
+    return matrix
+
+
+def cluster_order(matrix):
+    """Orden de las especies por clustering jerárquico UPGMA sobre 100 - identidad.
+
+    Los pares en NaN (descartados por el prefiltro de k-mers, por debajo de
+    ~60% de identidad) cuentan como 0% de identidad, es decir, a distancia
+    máxima: se tratan como no relacionados y no como pares sin dato.
+    """
+    labels = list(matrix.index)
+    # NaN = sin similitud detectable por el prefiltro -> distancia 100
+    dist = 100.0 - matrix.fillna(0.0).to_numpy(dtype=float)
+    np.fill_diagonal(dist, np.inf)
+    members = [[i] for i in range(len(labels))]
+    active = list(range(len(labels)))
+    while len(active) > 1:
+        sub = dist[np.ix_(active, active)]
+        x, y = np.unravel_index(np.argmin(sub), sub.shape)
+        a, b = active[x], active[y]
+        na, nb = len(members[a]), len(members[b])
+        dist[a, :] = dist[:, a] = (dist[a, :] * na + dist[b, :] * nb) / (na + nb)
+        dist[a, a] = np.inf
+        members[a] += members[b]
+        active.remove(b)
+    return [labels[i] for i in members[active[0]]] if active else []
+
+
+def heatmap_figure(matrix, seq_type="3'UTR"):
+    order = cluster_order(matrix)
+    ordered = matrix.loc[order, order]
+    fig = go.Figure(go.Heatmap(
+        z=ordered.to_numpy(), x=order, y=order, zmin=0, zmax=100, colorscale="Viridis",
+        colorbar=dict(title="% id"), hovertemplate="%{y} vs %{x}: %{z:.1f}%<extra></extra>",
+    ))
+    fig.update_layout(
+        title=f"% identidad de {seq_type} entre especies (agrupado por UPGMA)",
+        yaxis=dict(autorange="reversed"), height=max(500, 18 * len(order) + 200),
+    )
+    return fig
+
+
+def length_table(seqs, reference=None):
+    """Longitud de cada secuencia y diferencia respecto a la especie de referencia."""
+    df = pd.DataFrame({"species": list(seqs), "length": [len(s) for s in seqs.values()]}).sort_values("length")
+    if reference in seqs:
+        df["diff_vs_reference"] = df["length"] - len(seqs[reference])
+    return df.reset_index(drop=True)
+
+
+def compare_rna(mapping, genomes, seq_type="3'UTR", db_path=DB_PATH, workers=None, progress=None):
+    seqs, missing = collect_sequences(mapping, genomes, seq_type, db_path, workers)
+    matrix = pairwise_identity(seqs, seq_type, workers, progress=progress)
+    return seqs, matrix, missing
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Identidad todos contra todos del 3'UTR/mRNA de los ortólogos")
+    parser.add_argument("--type", choices=SEQUENCE_TYPES, default="3'UTR")
+    parser.add_argument("--mapping", default=MAPPING_PATH, help="TSV species<TAB>ruta_gff3")
+    parser.add_argument("--genomes", default=GENOMES_PATH, help="TSV species<TAB>ruta_fasta_genoma")
+    parser.add_argument("--db", default=DB_PATH)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--html", help="Guardar el heatmap en HTML")
+    args = parser.parse_args()
+
+    mapping, genomes = load_mapping(args.mapping), load_mapping(args.genomes)
+    if not mapping or not genomes:
+        parser.error(f"Hacen falta anotaciones ({args.mapping}) y genomas ({args.genomes})")
+
+    seqs, matrix, missing = compare_rna(
+        mapping, genomes, args.type, args.db, args.workers,
+        progress=lambda done, total: print(f"\r{done}/{total} alineamientos", end="", flush=True),
+    )
+    print()
+    print(length_table(seqs).to_string(index=False))
+    print(f"Matriz: {matrix_path(seqs, args.type)}")
+    if args.html:
+        heatmap_figure(matrix, args.type).write_html(args.html)
+    if missing:
+        print("Especies sin secuencia:", ", ".join(missing))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,222 @@
+import argparse
+import sys
+
+import numpy as np
+
+from fasta_index_utils import open_indexed_fasta, reverse_complement, reverse_complement_bytes
+from gff_store_utils import gff_store_path, get_gene_features
+from perf_utils import timed
+from protein_to_gene_utils import gene_id_from_protein
+from transcript_model_utils import get_transcript_models, gene_transcripts, spans
+
+FASTA_WIDTH = 60
+# Secuencias que se pueden pedir por gen (las tres de la app por defecto)
+SEQUENCE_KINDS = ("DNA", "mRNA", "CDS", "3'UTR", "Proteína")
+DEFAULT_KINDS = ("DNA", "mRNA", "Proteína")
+
+# Base -> índice 0..3 (A, C, G, T) o 4 (otra)
+_BASE_CODE = np.full(256, 4, dtype=np.uint8)
+for _code, _bases in enumerate(("Aa", "Cc", "Gg", "Tt")):
+    for _base in _bases:
+        _BASE_CODE[ord(_base)] = _code
+# Código genético NCBI -> tabla de 5x5x5 codones -> aminoácido, armada al primer uso
+_codon_tables = {}
+
+
+@timed
+def cargar_fasta(file, is_gz=True):
+    # Índice .fai/.gzi en disco + lectura por mmap; la compresión se detecta por contenido
+    return open_indexed_fasta(file)
+
+
+def parse_gff3(gff_file, gene_id, is_gz=True):
+    # Exones del transcrito canónico, ya resueltos en el modelo de transcritos
+    db_path = gff_store_path(gff_file, is_gz=is_gz)
+    gene, transcripts = gene_transcripts(db_path, gene_id)
+    if gene is None:
+        return None, None, None, "+", []
+
+    exons = spans(get_transcript_models(db_path), transcripts[0]) if transcripts else []
+    return gene["seqid"], gene["start"], gene["end"], gene["strand"], exons
+
+
+def get_sequence(chrom, start, end, strand, fasta):
+    if chrom not in fasta:
+        return None
+    region = fasta.fetch(chrom, start, end)
+    return reverse_complement(region) if strand == "-" else region
+
+
+def get_protein_sequence(gene_id, protein_fasta, protein_ids=()):
+    # Primero los protein_id del GFF, luego las claves de la cabecera (gene:, transcript:...)
+    for key in list(protein_ids) + [gene_id]:
+        seq = protein_fasta.get(key)
+        if seq:
+            return seq
+    return None
+
+
+def assemble(fasta, seqid, strand, regions):
+    """Une los intervalos (orden genómico) en un buffer preasignado; en hebra "-" invierte el total una vez."""
+    if seqid not in fasta:
+        return None
+    buf = bytearray(sum(end - start + 1 for start, end in regions))
+    pos = 0
+    for start, end in regions:
+        pos += fasta.fetch_into(buf, pos, seqid, start, end)
+    del buf[pos:]  # regiones recortadas al final del cromosoma
+    if strand == "-":
+        buf = reverse_complement_bytes(buf)
+    return buf.decode("ascii")
+
+
+def _codon_table(table_id=1):
+    table = _codon_tables.get(table_id)
+    if table is None:
+        # Biopython solo se importa si se traduce algo
+        from Bio.Data.CodonTable import unambiguous_dna_by_id
+
+        code = unambiguous_dna_by_id[table_id]
+        table = np.full(125, ord("X"), dtype=np.uint8)
+        for codon, aa in list(code.forward_table.items()) + [(stop, "*") for stop in code.stop_codons]:
+            table[25 * "ACGT".index(codon[0]) + 5 * "ACGT".index(codon[1]) + "ACGT".index(codon[2])] = ord(aa)
+        _codon_tables[table_id] = table
+    return table
+
+
+def translate(cds, phase=0):
+    # Vectorizado con numpy; se saltan las `phase` bases iniciales (fase GFF3 del primer
+    # segmento de CDS), solo codones completos y sin el stop final
+    cds = cds[phase:]
+    cds = cds[:len(cds) - len(cds) % 3]
+    codons = _BASE_CODE[np.frombuffer(cds.encode("ascii"), dtype=np.uint8)].reshape(-1, 3).astype(np.intp)
+    protein = _codon_table()[25 * codons[:, 0] + 5 * codons[:, 1] + codons[:, 2]]
+    # Codones con bases ambiguas (N, R, Y...): los resuelve Biopython
+    ambiguous = np.flatnonzero((codons == 4).any(axis=1))
+    if len(ambiguous):
+        from Bio.Seq import Seq
+    for i in ambiguous:
+        protein[i] = ord(str(Seq(cds[3 * i:3 * i + 3]).translate()))
+    return protein.tobytes().decode("ascii").rstrip("*")
+
+
+def transcript_sequences(fasta, models, i, kinds=SEQUENCE_KINDS):
+    """Secuencias de un transcrito del modelo (mRNA, CDS, 3'UTR, proteína traducida)."""
+    seqid, strand = models["seqid"][i], models["strand"][i]
+    out = {}
+    if "mRNA" in kinds:
+        out["mRNA"] = assemble(fasta, seqid, strand, spans(models, i, "exon"))
+    if "CDS" in kinds or "Proteína" in kinds:
+        cds = assemble(fasta, seqid, strand, spans(models, i, "cds"))
+        if "CDS" in kinds:
+            out["CDS"] = cds
+        if "Proteína" in kinds:
+            out["Proteína"] = translate(cds, models["cds_phase"][i]) if cds else None
+    if "3'UTR" in kinds:
+        out["3'UTR"] = assemble(fasta, seqid, strand, spans(models, i, "utr3"))
+    return out
+
+
+def gene_sequences(db_path, fasta, gene_id, kinds=DEFAULT_KINDS):
+    """Secuencias del transcrito canónico del gen; None si el gen no está en la anotación."""
+    gene, transcripts = gene_transcripts(db_path, gene_id)
+    if gene is None:
+        return None
+    out = {"gene": gene["name"], "transcript": None}
+    if "DNA" in kinds:
+        out["DNA"] = get_sequence(gene["seqid"], gene["start"], gene["end"], gene["strand"], fasta)
+    if transcripts:
+        models = get_transcript_models(db_path)
+        out["transcript"] = models["names"][transcripts[0]]
+        out.update(transcript_sequences(fasta, models, transcripts[0], kinds))
+    return out
+
+
+def _wrap(seq, width=FASTA_WIDTH):
+    return "\n".join(seq[i:i + width] for i in range(0, len(seq), width))
+
+
+def iter_multifasta(gff_file, genome_fasta, ids, kinds=DEFAULT_KINDS, progress=None):
+    """Genera el multi-FASTA de varios genes registro a registro (sin acumular el archivo).
+
+    ids admite IDs de gen o de proteína; las cabeceras son >id|gen|transcrito|tipo.
+    progress(hechos, total) se llama cada 100 IDs y al terminar.
+    """
+    db_path = gff_store_path(gff_file)
+    fasta = cargar_fasta(genome_fasta)
+    ids = list(ids)
+    for done, query_id in enumerate(ids, start=1):
+        if progress and done > 1 and (done - 1) % 100 == 0:
+            progress(done - 1, len(ids))
+        # El modelo ya resuelve IDs de proteína y transcrito; el store cubre el resto
+        seqs = gene_sequences(db_path, fasta, query_id, kinds)
+        if seqs is None:
+            gene_id = gene_id_from_protein(db_path, query_id)
+            seqs = gene_sequences(db_path, fasta, gene_id, kinds) if gene_id else None
+        if seqs is None:
+            continue
+        for kind in kinds:
+            seq = seqs.get(kind)
+            if seq:
+                yield f">{query_id}|{seqs['gene']}|{seqs['transcript'] or ''}|{kind}\n{_wrap(seq)}\n"
+    if progress:
+        progress(len(ids), len(ids))
+
+
+def write_multifasta(out, gff_file, genome_fasta, ids, kinds=DEFAULT_KINDS, progress=None):
+    # Un solo generador: store e índice del FASTA se abren una vez para todos los IDs
+    n = 0
+    for record in iter_multifasta(gff_file, genome_fasta, ids, kinds, progress):
+        out.write(record)
+        n += 1
+    return n
+
+
+@timed
+def extraer_secuencia(gff_file, genome_fasta, protein_fasta, gene_id, tipo, is_gz=True):
+    db_path = gff_store_path(gff_file, is_gz=is_gz)
+    if tipo == "Proteína":
+        # Primero el FASTA de proteínas; si no está, se traduce el CDS canónico
+        gene, cds = get_gene_features(db_path, gene_id, ["CDS"])
+        if gene is None:
+            return None
+        protein_ids = list(dict.fromkeys(c["protein_id"] for c in cds if c["protein_id"]))
+        seq = get_protein_sequence(gene_id, cargar_fasta(protein_fasta), protein_ids) if protein_fasta else None
+        if seq:
+            return seq
+    if tipo not in SEQUENCE_KINDS:
+        return None
+    seqs = gene_sequences(db_path, cargar_fasta(genome_fasta), gene_id, (tipo,))
+    return seqs.get(tipo) if seqs else None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Multi-FASTA (DNA, mRNA, proteína...) de varios genes en una pasada")
+    parser.add_argument("gff", help="Anotación GFF3 (.gff3/.gz)")
+    parser.add_argument("genome", help="FASTA del genoma (.fa/.gz/bgzip)")
+    parser.add_argument("ids", nargs="*", help="IDs de gen o de proteína (o --ids-file)")
+    parser.add_argument("--ids-file", help="Un ID por línea")
+    parser.add_argument("--kinds", default=",".join(DEFAULT_KINDS), help=f"Entre {', '.join(SEQUENCE_KINDS)}")
+    parser.add_argument("--out", help="Archivo de salida (stdout por defecto)")
+    args = parser.parse_args()
+
+    ids = list(args.ids)
+    if args.ids_file:
+        with open(args.ids_file, encoding="utf-8") as f:
+            ids += [line.strip() for line in f if line.strip()]
+    kinds = tuple(k.strip() for k in args.kinds.split(","))
+    unknown = [k for k in kinds if k not in SEQUENCE_KINDS]
+    if unknown:
+        parser.error(f"Tipos desconocidos: {', '.join(unknown)}")
+
+    out = open(args.out, "w", encoding="utf-8") if args.out else sys.stdout
+    try:
+        n = write_multifasta(out, args.gff, args.genome, ids, kinds)
+    finally:
+        if args.out:
+            out.close()
+    print(f"{n} secuencias escritas", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
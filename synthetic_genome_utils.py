@@ -0,0 +1,162 @@
+import argparse
+import gzip
+import os
+import random
+
+import numpy as np
+
+SYNTHETIC_DIR = os.path.join(".cache", "synthetic")
+GENES_PER_SEQID = 2500
+FASTA_WIDTH = 60
+# Proporción de genes con una segunda isoforma (sin tag=Ensembl_canonical)
+ISOFORM_RATE = 0.2
+
+
+def _blocks(exons, strand, lo, hi):
+    # Intervalo [lo, hi) en coordenadas del transcrito (desde su 5') -> bloques genómicos
+    out, pos = [], 0
+    for start, end in (exons[::-1] if strand == "-" else exons):
+        length = end - start + 1
+        a, b = max(lo, pos), min(hi, pos + length)
+        if a < b:
+            out.append((end - (b - pos) + 1, end - (a - pos)) if strand == "-" else (start + a - pos, start + b - pos - 1))
+        pos += length
+    return sorted(out)
+
+
+def _transcript_lines(seqid, strand, tx_id, gene_id, exons, utr5, utr3, canonical):
+    # exons en orden genómico; UTR y CDS se reparten desde el 5' del transcrito
+    length = sum(e - s + 1 for s, e in exons)
+    utr3 = min(utr3, max(0, length - utr5 - 300))
+    cds_end = utr5 + (length - utr5 - utr3) // 3 * 3
+    parts = {
+        "five_prime_UTR": _blocks(exons, strand, 0, utr5),
+        "CDS": _blocks(exons, strand, utr5, cds_end),
+        "three_prime_UTR": _blocks(exons, strand, cds_end, length),
+    }
+
+    tag = ";tag=Ensembl_canonical" if canonical else ""
+    lines = [
+        f"{seqid}\tsynthetic\tmRNA\t{exons[0][0]}\t{exons[-1][1]}\t.\t{strand}\t.\t"
+        f"ID=transcript:{tx_id};Parent=gene:{gene_id};biotype=protein_coding{tag};transcript_id={tx_id}"
+    ]
+    rows = [(s, e, "exon", f"Parent=transcript:{tx_id};Name={tx_id}-{n}")
+            for n, (s, e) in enumerate(exons, start=1)]
+    for ftype, blocks in parts.items():
+        attrs = f"ID=CDS:{tx_id};Parent=transcript:{tx_id};protein_id={tx_id}" if ftype == "CDS" \
+            else f"Parent=transcript:{tx_id}"
+        rows += [(s, e, ftype, attrs) for s, e in blocks]
+    for start, end, ftype, attrs in sorted(rows, key=lambda r: (r[0], r[2] != "exon")):
+        phase = "0" if ftype == "CDS" else "."
+        lines.append(f"{seqid}\tsynthetic\t{ftype}\t{start}\t{end}\t.\t{strand}\t{phase}\t{attrs}")
+    return lines
+
+
+def _gene_models(rng, n_genes):
+    """Genes sintéticos por seqid: (seqid, strand, gene_id, [(tx_id, exons, utr5, utr3, canonical)])."""
+    n_seqids = max(1, n_genes // GENES_PER_SEQID)
+    lengths = {}
+    genes = []
+    for g in range(n_genes):
+        seqid = str(1 + g * n_seqids // n_genes)
+        pos = lengths.get(seqid, 0) + rng.randint(200, 2000)
+        exons = []
+        for _ in range(min(1 + int(rng.expovariate(0.4)), 12)):
+            start = pos + (rng.randint(60, 300) if exons else 1)
+            end = start + rng.randint(80, 400)
+            exons.append((start, end))
+            pos = end
+        lengths[seqid] = pos
+        gene_id = f"SYN_{g + 1:06d}"
+        transcripts = [(f"SYNT{g + 1:06d}", exons, rng.randint(20, 60), rng.randint(50, 400), True)]
+        if len(exons) > 2 and rng.random() < ISOFORM_RATE:
+            # Isoforma sin uno de los exones internos
+            skipped = rng.randrange(1, len(exons) - 1)
+            transcripts.append((f"SYNT{g + 1:06d}.2", exons[:skipped] + exons[skipped + 1:],
+                                rng.randint(20, 60), rng.randint(50, 400), False))
+        strand = rng.choice("+-")
+        genes.append((seqid, strand, gene_id, transcripts))
+    return genes, {seqid: end + 1000 for seqid, end in lengths.items()}
+
+
+def _open_out(path, gz):
+    # mtime=0: el mismo seed da exactamente los mismos bytes (y el mismo hash de caché)
+    return gzip.GzipFile(path, "wb", compresslevel=1, mtime=0) if gz else open(path, "wb")
+
+
+def write_synthetic_genome(n_genes, out_dir=SYNTHETIC_DIR, seed=0, gz=False):
+    """GFF3 estilo Ensembl y FASTA del genoma deterministas para n_genes genes.
+
+    Devuelve un dict con las rutas, el número de líneas del GFF3 y un gen y
+    una proteína de ejemplo (a mitad del primer cromosoma). Si los archivos
+    ya existen no se regeneran.
+    """
+    rng = random.Random(seed)
+    genes, seqid_lengths = _gene_models(rng, n_genes)
+    ext = ".gz" if gz else ""
+    base = os.path.join(out_dir, f"synthetic_{n_genes}genes_s{seed}")
+    gff_path, fasta_path = f"{base}.gff3{ext}", f"{base}.fa{ext}"
+    sample = genes[len(genes) // (2 * len(seqid_lengths))]
+    other = genes[len(genes) // (2 * len(seqid_lengths)) + 1]
+    info = {"gff": gff_path, "genome": fasta_path, "gene": sample[2], "protein": other[3][0][0]}
+
+    os.makedirs(out_dir, exist_ok=True)
+    if not os.path.exists(gff_path):
+        lines = 0
+        with _open_out(gff_path + ".tmp", gz) as out:
+            out.write(b"##gff-version 3\n")
+            for seqid, length in seqid_lengths.items():
+                out.write(f"##sequence-region {seqid} 1 {length}\n".encode())
+            lines += 1 + len(seqid_lengths)
+            for seqid, strand, gene_id, transcripts in genes:
+                exons = transcripts[0][1]
+                block = [f"{seqid}\tsynthetic\tgene\t{exons[0][0]}\t{exons[-1][1]}\t.\t{strand}\t.\t"
+                         f"ID=gene:{gene_id};biotype=protein_coding;gene_id={gene_id}"]
+                for tx_id, tx_exons, utr5, utr3, canonical in transcripts:
+                    block += _transcript_lines(seqid, strand, tx_id, gene_id, tx_exons, utr5, utr3, canonical)
+                out.write(("\n".join(block) + "\n").encode())
+                lines += len(block)
+        os.replace(gff_path + ".tmp", gff_path)
+    else:
+        lines = count_lines(gff_path)
+    info["lines"] = lines
+
+    if not os.path.exists(fasta_path):
+        bases = np.frombuffer(b"ACGT", dtype=np.uint8)
+        np_rng = np.random.default_rng(seed)
+        with _open_out(fasta_path + ".tmp", gz) as out:
+            for seqid, length in seqid_lengths.items():
+                out.write(f">{seqid} dna:chromosome synthetic\n".encode())
+                # Filas de 60 bases + salto de línea armadas en un solo array
+                full, rest = divmod(length, FASTA_WIDTH)
+                rows = np.empty((full, FASTA_WIDTH + 1), dtype=np.uint8)
+                rows[:, :FASTA_WIDTH] = bases[np_rng.integers(0, 4, size=(full, FASTA_WIDTH))]
+                rows[:, FASTA_WIDTH] = ord("\n")
+                out.write(rows.tobytes())
+                if rest:
+                    out.write(bases[np_rng.integers(0, 4, size=rest)].tobytes() + b"\n")
+        os.replace(fasta_path + ".tmp", fasta_path)
+    return info
+
+
+def count_lines(path):
+    opener = gzip.open if path.endswith(".gz") else open
+    with opener(path, "rb") as f:
+        return sum(1 for _ in f)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Genera un GFF3 + FASTA sintético y determinista")
+    parser.add_argument("genes", type=int, help="Número de genes (p. ej. 1000, 30000, 100000)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--gz", action="store_true", help="Comprimir con gzip")
+    parser.add_argument("--out-dir", default=SYNTHETIC_DIR)
+    args = parser.parse_args()
+
+    info = write_synthetic_genome(args.genes, args.out_dir, args.seed, args.gz)
+    print(f"{info['gff']} ({info['lines']} líneas)\n{info['genome']}")
+    print(f"Gen de ejemplo: {info['gene']}  proteína: {info['protein']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,50 @@
+from fasta_index_utils import reverse_complement
+from sequence_utils import extraer_secuencia, translate
+
+# M A K L * con una base sobrante delante (fase 1)
+CDS = "ATGGCCAAACTGTAA"
+
+
+def _write_gene(tmp_path, strand):
+    # Cromosoma de 60 pb con el CDS partido en dos segmentos; el primero (en el sentido
+    # del transcrito) empieza con una base que no pertenece a ningún codón
+    coding = "G" + CDS
+    seq = "C" * 10 + coding[:7] + "T" * 10 + coding[7:]
+    seq += "C" * (60 - len(seq))
+    segments = [(11, 17), (28, 36)]
+    if strand == "-":
+        seq = reverse_complement(seq)
+        segments = [(61 - end, 61 - start) for start, end in segments]
+    # Fase 1 en el primer segmento en el sentido del transcrito (segments[0] en ambas hebras);
+    # 0 en el otro, que empieza justo tras 7 - 1 = 6 bases codificantes
+    first = segments[0]
+    (tmp_path / "genome.fa").write_text(f">chr1\n{seq}\n")
+    lines = [
+        f"chr1\ttest\tgene\t1\t60\t.\t{strand}\t.\tID=gene:G1;Name=G1",
+        f"chr1\ttest\tmRNA\t1\t60\t.\t{strand}\t.\tID=transcript:T1;Parent=gene:G1",
+    ]
+    for start, end in segments:
+        lines.append(f"chr1\ttest\texon\t{start}\t{end}\t.\t{strand}\t.\tParent=transcript:T1")
+        phase = "1" if (start, end) == first else "0"
+        lines.append(
+            f"chr1\ttest\tCDS\t{start}\t{end}\t.\t{strand}\t{phase}\tID=CDS:P1;Parent=transcript:T1;protein_id=P1"
+        )
+    (tmp_path / "genes.gff3").write_text("##gff-version 3\n" + "\n".join(lines) + "\n")
+    return str(tmp_path / "genes.gff3"), str(tmp_path / "genome.fa")
+
+
+def test_translate_skips_phase():
+    assert translate(CDS) == "MAKL"
+    assert translate("G" + CDS, phase=1) == "MAKL"
+    assert translate("GG" + CDS, phase=2) == "MAKL"
+
+
+def test_protein_from_phase_1_cds(tmp_path, monkeypatch):
+    # Los stores e índices se crean en .cache/ del directorio actual
+    monkeypatch.chdir(tmp_path)
+    for strand in ("+", "-"):
+        directory = tmp_path / ("plus" if strand == "+" else "minus")
+        directory.mkdir()
+        gff, genome = _write_gene(directory, strand)
+        assert extraer_secuencia(gff, genome, None, "G1", "CDS") == "G" + CDS
+        assert extraer_secuencia(gff, genome, None, "G1", "Proteína") == "MAKL"
@@ -0,0 +1,240 @@
+import os
+import pickle
+import tempfile
+from array import array
+from collections import defaultdict
+
+from gff_store_utils import connect_store, find_gene
+
+TRANSCRIPT_TYPES = ("mRNA", "transcript")
+PART_TYPES = ("exon", "CDS", "five_prime_UTR", "three_prime_UTR")
+# Nombre del bloque en el modelo -> tipo GFF3
+SPANS = {"exon": "exon", "cds": "CDS", "utr5": "five_prime_UTR", "utr3": "three_prime_UTR"}
+
+# Cambia con la estructura de los modelos: un .models.pkl de otra versión se reconstruye
+MODELS_FORMAT = 3
+
+# Un modelo por store (el nombre del store ya es el hash del GFF)
+_models_cache = {}
+
+
+def models_path(db_path):
+    return os.path.splitext(db_path)[0] + ".models.pkl"
+
+
+def _merge(spans):
+    merged = []
+    for start, end in sorted(spans):
+        if merged and start <= merged[-1][1] + 1:
+            merged[-1][1] = max(merged[-1][1], end)
+        else:
+            merged.append([start, end])
+    return [tuple(s) for s in merged]
+
+
+def _outside_cds(exons, cds, strand, side):
+    # UTR implícita (anotaciones sin filas UTR, ej. NCBI): parte exónica antes/después del CDS
+    lo, hi = min(s for s, _ in cds), max(e for _, e in cds)
+    before = [(s, min(e, lo - 1)) for s, e in exons if s < lo]
+    after = [(max(s, hi + 1), e) for s, e in exons if e > hi]
+    if (side == "utr3") == (strand == "-"):
+        return before
+    return after
+
+
+def build_transcript_models(db_path):
+    """Resuelve gene -> transcrito -> exon/UTR/CDS una sola vez y lo guarda en arrays compactos.
+
+    Cada bloque (exon, cds, utr5, utr3) es un CSR: starts/ends de todos los
+    transcritos seguidos y un array de offsets por transcrito, ordenados por
+    posición genómica.
+    """
+    conn = connect_store(db_path)
+    try:
+        genes = {
+            r["id"]: dict(r)
+            for r in conn.execute("SELECT id, name, alias, seqid, start, end, strand FROM features WHERE type = 'gene'")
+        }
+        transcripts = [
+            {**dict(r), "canonical": "Ensembl_canonical" in (r["attributes"] or "")}
+            for r in conn.execute(
+                f"SELECT id, name, parent, seqid, strand, attributes FROM features "
+                f"WHERE type IN ({','.join('?' * len(TRANSCRIPT_TYPES))}) ORDER BY seqid, start",
+                TRANSCRIPT_TYPES,
+            )
+        ]
+        part_rows = conn.execute(
+            f"SELECT type, start, end, parent, protein_id, phase FROM features "
+            f"WHERE type IN ({','.join('?' * len(PART_TYPES))})",
+            PART_TYPES,
+        ).fetchall()
+    finally:
+        conn.close()
+    return assemble_models(genes, transcripts, part_rows)
+
+
+def assemble_models(genes, transcripts, part_rows):
+    """Modelos de transcrito a partir de filas ya leídas (del store o del caché Parquet).
+
+    genes: {id: fila del gen}; transcripts: filas con id, name, parent,
+    seqid, strand y canonical (marcado Ensembl_canonical), en orden
+    genómico; part_rows: (type, start, end, parent, protein_id, phase).
+    """
+    parts = defaultdict(lambda: defaultdict(list))
+    for ftype, start, end, parent, protein_id, phase in part_rows:
+        parts[parent][ftype].append((start, end))
+        if protein_id:
+            parts[parent]["protein_id"] = protein_id
+        if ftype == "CDS" and phase in ("1", "2"):
+            parts[parent]["phase"].append((start, end, int(phase)))
+
+    models = {
+        "format": MODELS_FORMAT,
+        "ids": [], "names": [], "gene": [], "seqid": [], "strand": [], "protein_id": [],
+        "genes": defaultdict(list), "canonical": {},
+        "n_exons": array("q"), "length": array("q"), "cds_len": array("q"), "utr3_len": array("q"),
+        # Fase del primer segmento de CDS en el sentido del transcrito (bases a saltar al traducir)
+        "cds_phase": array("q"),
+    }
+    for block in SPANS:
+        models[block] = {"offsets": array("q", [0]), "starts": array("q"), "ends": array("q")}
+    tagged = set()
+
+    def add(tx_id, tx_name, gene_id, seqid, strand, spans):
+        exons = _merge(spans.get("exon") or spans.get("CDS", []) + spans.get("five_prime_UTR", []) + spans.get("three_prime_UTR", []))
+        if not exons:
+            return None
+        cds = sorted(spans.get("CDS", []))
+        blocks = {"exon": exons, "cds": cds}
+        for block in ("utr5", "utr3"):
+            explicit = sorted(spans.get(SPANS[block], []))
+            blocks[block] = explicit or (_outside_cds(exons, cds, strand, block) if cds else [])
+
+        i = len(models["ids"])
+        models["ids"].append(tx_id)
+        models["names"].append(tx_name)
+        models["gene"].append(gene_id)
+        models["seqid"].append(seqid)
+        models["strand"].append(strand)
+        models["protein_id"].append(spans.get("protein_id"))
+        for block, values in blocks.items():
+            arrays = models[block]
+            arrays["starts"].extend(s for s, _ in values)
+            arrays["ends"].extend(e for _, e in values)
+            arrays["offsets"].append(len(arrays["starts"]))
+        models["n_exons"].append(len(exons))
+        models["length"].append(sum(e - s + 1 for s, e in exons))
+        models["cds_len"].append(sum(e - s + 1 for s, e in cds))
+        models["utr3_len"].append(sum(e - s + 1 for s, e in blocks["utr3"]))
+        first = (cds[-1] if strand == "-" else cds[0]) if cds else None
+        models["cds_phase"].append(next((p for s, e, p in spans.get("phase", []) if (s, e) == first), 0))
+        models["genes"][gene_id].append(i)
+        return i
+
+    for tx in transcripts:
+        if tx["parent"] not in genes:
+            continue
+        i = add(tx["id"], tx["name"], tx["parent"], tx["seqid"], tx["strand"], parts.get(tx["id"], {}))
+        if i is not None and tx["canonical"]:
+            tagged.add(i)
+    for gene_id, gene in genes.items():
+        # Genes con exones colgando directamente del gen (sin mRNA)
+        if gene_id not in models["genes"] and gene_id in parts:
+            add(gene_id, gene["name"], gene_id, gene["seqid"], gene["strand"], parts[gene_id])
+
+    for gene_id, idxs in models["genes"].items():
+        # Canónico: el marcado como tal en la anotación; si no, CDS más largo y luego mRNA más largo
+        marked = [i for i in idxs if i in tagged]
+        models["canonical"][gene_id] = marked[0] if marked else max(
+            idxs, key=lambda i: (models["cds_len"][i], models["length"][i], models["ids"][i])
+        )
+    models["genes"] = dict(models["genes"])
+
+    # Búsqueda O(1) de gen por ID/nombre/alias de gen, transcrito o proteína
+    models["gene_info"] = genes
+    lookup = models["lookup"] = {}
+    for gene_id, gene in genes.items():
+        for key in (gene_id, gene["name"], gene["alias"]):
+            if key:
+                lookup.setdefault(key, gene_id)
+    for i, gene_id in enumerate(models["gene"]):
+        for key in (models["ids"][i], models["names"][i], models["protein_id"][i]):
+            if key:
+                lookup.setdefault(key, gene_id)
+    return models
+
+
+def get_transcript_models(db_path):
+    models = _models_cache.get(db_path)
+    if models is None:
+        path = models_path(db_path)
+        if os.path.exists(path):
+            try:
+                with open(path, "rb") as f:
+                    models = pickle.load(f)
+            except (pickle.UnpicklingError, EOFError, AttributeError):
+                models = None
+            if not isinstance(models, dict) or models.get("format") != MODELS_FORMAT:
+                models = None
+        if models is None:
+            models = build_transcript_models(db_path)
+            fd, tmp_path = tempfile.mkstemp(suffix=".tmp", dir=os.path.dirname(path))
+            with os.fdopen(fd, "wb") as f:
+                pickle.dump(models, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, path)
+        _models_cache[db_path] = models
+    return models
+
+
+def spans(models, i, block="exon"):
+    """Intervalos (start, end) de un bloque del transcrito i, en orden genómico."""
+    arrays = models[block]
+    lo, hi = arrays["offsets"][i], arrays["offsets"][i + 1]
+    return list(zip(arrays["starts"][lo:hi], arrays["ends"][lo:hi]))
+
+
+def introns(models, i):
+    """Tamaños de intrón en el sentido del transcrito."""
+    exons = spans(models, i)
+    sizes = [b[0] - a[1] - 1 for a, b in zip(exons, exons[1:])]
+    return sizes[::-1] if models["strand"][i] == "-" else sizes
+
+
+def transcript_metrics(models, i):
+    return {
+        "transcript": models["names"][i],
+        "protein_id": models["protein_id"][i],
+        "exons": models["n_exons"][i],
+        "length": models["length"][i],
+        "cds_len": models["cds_len"][i],
+        "utr3_len": models["utr3_len"][i],
+        "introns": introns(models, i),
+    }
+
+
+def gene_transcripts(db_path, gene_id):
+    """Gen e índices de sus transcritos (el canónico primero).
+
+    gene_id puede ser el ID/nombre del gen o de uno de sus transcritos o proteínas.
+    """
+    models = get_transcript_models(db_path)
+    gene = models["gene_info"].get(models["lookup"].get(gene_id))
+    if gene is None:
+        # IDs con prefijo u otras variantes que resuelve el store
+        gene = find_gene(db_path, gene_id)
+        if gene is None:
+            return None, []
+    idxs = models["genes"].get(gene["id"], [])
+    if idxs:
+        canonical = models["canonical"][gene["id"]]
+        idxs = [canonical] + [i for i in idxs if i != canonical]
+    return gene, idxs
+
+
+def isoform_metrics(db_path, gene_id):
+    """Métricas de cada isoforma del gen (la canónica primero), o None si el gen no está."""
+    gene, idxs = gene_transcripts(db_path, gene_id)
+    if gene is None:
+        return None
+    models = get_transcript_models(db_path)
+    return [transcript_metrics(models, i) for i in idxs]
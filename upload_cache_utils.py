@@ -0,0 +1,174 @@
+import gzip
+import hashlib
+import io
+import os
+import shutil
+import tempfile
+from collections import defaultdict
+
+CACHE_DIR = ".cache"
+UPLOAD_DIR = os.path.join(CACHE_DIR, "uploads")
+CHUNK_SIZE = 1 << 20
+# Cachés derivadas (se regeneran si faltan) que comparten un único presupuesto de disco:
+# archivos subidos, FASTA descomprimidos e índices, stores GFF con sus modelos y su caché Parquet,
+# matrices y alineamientos
+CACHE_PATHS = ("uploads", "fasta", "gff", "rna_compare", "alignments.db")
+# Se expulsan las entradas menos usadas al superarlo (EBF2_UPLOAD_CACHE_BYTES se acepta por compatibilidad)
+CACHE_BYTES = int(os.environ.get("EBF2_CACHE_BYTES", os.environ.get("EBF2_UPLOAD_CACHE_BYTES", 20 * 1024 ** 3)))
+
+# file_id de Streamlit -> ruta ya volcada a disco
+_spooled = {}
+# (ruta, tamaño, mtime) -> sha1 del contenido
+_digests = {}
+
+
+def is_gzip_file(path):
+    with open(path, "rb") as f:
+        return f.read(2) == b"\x1f\x8b"
+
+
+def open_text(path):
+    """Abre un GFF/FASTA en modo texto, detectando gzip por el contenido y no por la extensión."""
+    if is_gzip_file(path):
+        return gzip.open(path, "rt", encoding="utf-8", errors="replace")
+    return open(path, "rt", encoding="utf-8", errors="replace")
+
+
+def touch(path):
+    try:
+        os.utime(path)
+    except OSError:
+        pass
+
+
+def _entry(path):
+    # Archivos con la misma raíz forman una entrada: x.db + x.models.pkl + x.parquet/, x.fa + x.fai + x.pidx, a.db-wal
+    directory, name = os.path.split(path)
+    return os.path.join(directory, name.split(".")[0])
+
+
+def _disk_usage(path):
+    """(último uso, bytes) de un archivo o de un directorio entero (p. ej. un caché Parquet)."""
+    stat = os.stat(path)
+    if not os.path.isdir(path):
+        return stat.st_mtime, stat.st_size
+    size = 0
+    for root, _, files in os.walk(path):
+        for name in files:
+            try:
+                size += os.stat(os.path.join(root, name)).st_size
+            except OSError:
+                pass
+    # El directorio se toca al usarlo (touch)
+    return stat.st_mtime, size
+
+
+def _cache_entries(cache_dir):
+    """Entradas de caché -> [último uso, bytes, rutas]. Los temporales (.tmp) no cuentan."""
+    entries = defaultdict(lambda: [0.0, 0, []])
+    for name in CACHE_PATHS:
+        path = os.path.join(cache_dir, name)
+        if os.path.isdir(path):
+            files = [os.path.join(path, f) for f in os.listdir(path)]
+        else:
+            files = [path + suffix for suffix in ("", "-wal", "-shm", "-journal")]
+        for file in files:
+            if file.endswith(".tmp"):
+                continue
+            try:
+                mtime, size = _disk_usage(file)
+            except OSError:
+                continue
+            entry = entries[_entry(file)]
+            entry[0] = max(entry[0], mtime)
+            entry[1] += size
+            entry[2].append(file)
+    return entries
+
+
+def evict(cache_dir=CACHE_DIR, budget=CACHE_BYTES, keep=None):
+    """Borra las entradas de caché menos usadas hasta quedar dentro del presupuesto.
+
+    keep es un archivo o directorio de la entrada recién creada, que nunca se borra.
+    """
+    entries = _cache_entries(cache_dir)
+    total = sum(size for _, size, _ in entries.values())
+    keep = _entry(keep) if keep else None
+    for stem, (_, size, files) in sorted(entries.items(), key=lambda e: e[1][0]):
+        if total <= budget:
+            break
+        if stem == keep:
+            continue
+        for file in files:
+            if os.path.isdir(file):
+                shutil.rmtree(file, ignore_errors=True)
+                continue
+            try:
+                os.remove(file)
+            except FileNotFoundError:
+                pass
+        total -= size
+        for file_id, spooled in list(_spooled.items()):
+            if spooled in files:
+                del _spooled[file_id]
+
+
+def spool_upload(file_obj, upload_dir=UPLOAD_DIR):
+    """Vuelca un archivo subido a disco por bloques; el nombre es el sha1 del contenido."""
+    file_id = getattr(file_obj, "file_id", None)
+    path = _spooled.get(file_id) if file_id else None
+    if path and os.path.exists(path):
+        touch(path)
+        return path
+
+    os.makedirs(upload_dir, exist_ok=True)
+    h = hashlib.sha1()
+    fd, tmp_path = tempfile.mkstemp(suffix=".tmp", dir=upload_dir)
+    try:
+        file_obj.seek(0)
+        with os.fdopen(fd, "wb") as out:
+            for chunk in iter(lambda: file_obj.read(CHUNK_SIZE), b""):
+                h.update(chunk)
+                out.write(chunk)
+        file_obj.seek(0)
+        path = os.path.join(upload_dir, h.hexdigest())
+        if os.path.exists(path):
+            os.remove(tmp_path)
+            touch(path)
+        else:
+            os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+    if file_id:
+        _spooled[file_id] = path
+    evict(keep=path)
+    return path
+
+
+def local_path(file_obj):
+    """Ruta en disco de una ruta, un archivo local abierto o un archivo subido (que se vuelca)."""
+    if isinstance(file_obj, (str, os.PathLike)):
+        return os.fspath(file_obj)
+    name = getattr(file_obj, "name", None)
+    if isinstance(file_obj, io.BufferedReader) and isinstance(name, str) and os.path.isfile(name):
+        return name
+    return spool_upload(file_obj)
+
+
+def content_digest(path):
+    # Los archivos volcados ya se llaman como su hash
+    if os.path.dirname(os.path.abspath(path)) == os.path.abspath(UPLOAD_DIR):
+        return os.path.basename(path)
+    stat = os.stat(path)
+    key = (os.path.realpath(path), stat.st_size, stat.st_mtime_ns)
+    digest = _digests.get(key)
+    if digest is None:
+        h = hashlib.sha1()
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(CHUNK_SIZE), b""):
+                h.update(chunk)
+        digest = _digests[key] = h.hexdigest()
+    return digest
@@ -0,0 +1,129 @@
+import os
+import threading
+
+import plotly.graph_objects as go
+import streamlit as st
+
+from replica_utils import BUNDLE_PATH, bundle_manifest, bundle_records, bundle_sequences, bundle_table, open_bundle
+
+# Visor de solo lectura: sirve el paquete exportado con replica_utils, sin tocar
+# species_records.db. st.navigation deja fuera las páginas de edición de pages/.
+BUNDLE = os.environ.get("EBF2_BUNDLE", BUNDLE_PATH)
+
+
+@st.cache_resource
+def _readers():
+    # Una conexión de solo lectura por hilo (cada sesión corre en el suyo), como los lectores de
+    # db_utils: las sesiones leen en paralelo en vez de turnarse una conexión compartida.
+    # En cache_resource y no a nivel de módulo porque este script se vuelve a ejecutar en cada rerun
+    return threading.local()
+
+
+def get_bundle():
+    # export sustituye el archivo (os.replace): se reabre si cambia el inodo o la fecha de modificación.
+    # La conexión sustituida se guarda y se cierra en el cambio siguiente, así no se cierra
+    # una conexión de la que puede quedar un cursor a medias
+    local = _readers()
+    stat = os.stat(BUNDLE)
+    stamp = (stat.st_ino, stat.st_mtime_ns)
+    if getattr(local, "stamp", None) != stamp:
+        previous = getattr(local, "previous", None)
+        if previous is not None:
+            previous.close()
+        local.previous = getattr(local, "conn", None)
+        local.conn, local.stamp = open_bundle(BUNDLE), stamp
+    return local.conn
+
+
+def bundle_version():
+    # Una consulta por rerun: al aplicar un delta o reexportar cambia la clave y se descartan los datos memorizados
+    conn = get_bundle()
+    version = int(conn.execute("SELECT value FROM Manifest WHERE key = 'version'").fetchone()[0])
+    return _readers().stamp, version
+
+
+@st.cache_data(show_spinner=False)
+def _manifest(version):
+    return bundle_manifest(get_bundle())
+
+
+@st.cache_data(show_spinner=False)
+def _records(version, clades, species):
+    return bundle_records(get_bundle(), clades, species)
+
+
+@st.cache_data(show_spinner=False)
+def _table(version, table, clades):
+    return bundle_table(get_bundle(), table, clades)
+
+
+@st.cache_data(show_spinner=False)
+def _sequences(version, record_id):
+    return bundle_sequences(get_bundle(), record_id)
+
+
+def vista_registros():
+    version = bundle_version()
+    st.title("🧬 Base de Datos EBF2 (solo lectura)")
+    manifest = _manifest(version)
+    st.caption(f"Paquete versión {manifest['version']} · creado {manifest['created']}"
+               + (f" · actualizado {manifest['updated']}" if "updated" in manifest else ""))
+
+    col1, col2 = st.columns(2)
+    with col1:
+        clados = tuple(st.multiselect("Clado", list(_table(version, "CladeCounts", ())["clade"].dropna()), key="v_clades"))
+    with col2:
+        especie = st.text_input("Especie contiene", key="v_species").strip()
+
+    df = _records(version, clados, especie)
+    st.caption(f"{len(df)} registros")
+    st.dataframe(df, use_container_width=True, hide_index=True)
+    st.download_button("📤 Descargar CSV", df.to_csv(index=False).encode("utf-8"),
+                       file_name="EBF2_records_export.csv", mime="text/csv")
+
+    # Conteos y cuartiles precalculados en el paquete (por clado, sin filtrar por especie)
+    col1, col2 = st.columns(2)
+    with col1:
+        conteos = _table(version, "CladeCounts", clados)
+        fig1 = go.Figure(go.Bar(x=conteos["clade"], y=conteos["count"]))
+        fig1.update_layout(title="Distribución por Clado", xaxis_title="clade", yaxis_title="count")
+        st.plotly_chart(fig1, use_container_width=True)
+    with col2:
+        cuartiles = _table(version, "IdentityQuantiles", clados)
+        if not cuartiles.empty:
+            fig2 = go.Figure(go.Box(
+                x=cuartiles["clade"], q1=cuartiles["q1"], median=cuartiles["median"], q3=cuartiles["q3"],
+                lowerfence=cuartiles["min"], upperfence=cuartiles["max"], name="% identidad",
+            ))
+            fig2.update_layout(title="% Identidad por Clado", yaxis_title="percent_identity")
+            st.plotly_chart(fig2, use_container_width=True)
+
+
+def vista_secuencias():
+    version = bundle_version()
+    st.title("🧬 Secuencias de los ortólogos")
+    df = _records(version, (), "")
+    opciones = {f"{r.id} · {r.species} · {r.ortholog_id}": r.id for r in df.itertuples()}
+    elegido = st.selectbox("Registro", list(opciones), key="v_record")
+    if not elegido:
+        return
+    seqs = _sequences(version, opciones[elegido])
+    if not seqs:
+        st.info("El paquete no incluye secuencias de este registro.")
+        return
+    fasta = []
+    for tipo, (gen, transcrito, secuencia) in seqs.items():
+        st.markdown(f"**{tipo}** · {gen} · {transcrito or '-'} · {len(secuencia)} {'aa' if tipo == 'Proteína' else 'pb'}")
+        st.code(secuencia, language="text", wrap_lines=True)
+        fasta.append(f">{elegido.split(' · ')[-1]}|{gen}|{transcrito or ''}|{tipo}\n{secuencia}")
+    st.download_button("📤 Descargar FASTA", "\n".join(fasta) + "\n", file_name=f"registro_{opciones[elegido]}.fasta")
+
+
+st.set_page_config(page_title="EBF2 (solo lectura)", layout="wide")
+if not os.path.exists(BUNDLE):
+    st.error(f"No se encontró el paquete {BUNDLE}. Genéralo con: python replica_utils.py export")
+    st.stop()
+st.navigation([
+    st.Page(vista_registros, title="Registros", icon="📋", default=True),
+    st.Page(vista_secuencias, title="Secuencias", icon="🧬"),
+]).run()
@@ -1,36 +1,251 @@
+import numpy as np
 import plotly.graph_objects as go
 
-def plot_synteny_tracks(center_a, up_a, down_a, center_b, up_b, down_b, shared_genes):
-    def build_track(center, upstream, downstream, y, label_prefix):
-        genes = upstream[::-1] + [center] + downstream
-        x = 0
-        positions = []
-        for gene in genes:
-            positions.append((gene["gene"], x))
-            x += (gene["end"] - gene["start"]) // 1000 + 10
-        return [
-            go.Scatter(
-                x=[p[1] for p in positions],
-                y=[y]*len(positions),
-                mode="markers+text",
-                marker=dict(size=12, color=["green" if p[0] in shared_genes else "gray" for p in positions]),
-                text=[p[0] for p in positions],
-                textposition="bottom center",
-                name=label_prefix
-            )
-        ]
+from perf_utils import timed
 
-    fig = go.Figure()
-    fig.add_traces(build_track(center_a, up_a, down_a, 1, "Especie A"))
-    fig.add_traces(build_track(center_b, up_b, down_b, 0, "Especie B"))
+# Segmentos por pista antes de agrupar genes en bloques (nivel de detalle)
+MAX_SEGMENTS = 400
+# Medio grosor de la barra de un gen, en unidades del eje y (una pista por unidad)
+GENE_HALF_HEIGHT = 0.12
+FIGURE_CACHE_SIZE = 64
+# Mapas de ortogrupos en memoria (uno por versión del archivo)
+ORTHOGROUP_MAPS = 4
+# El gen ortólogo de cada especie: siempre se une con el de la pista vecina
+ORTHOLOG_KEY = "__ortholog__"
+
+# (especies y genes, ventana, ortogrupos, detalle) -> datos de la figura ya calculados
+_figure_data_cache = {}
+# hash del archivo de ortogrupos -> {gen/proteína: ortogrupo}
+_orthogroup_maps = {}
+
+
+def track_from_genes(label, center, genes, groups=None):
+    """Pista de una especie con coordenadas reales relativas al gen central.
+
+    x = pb desde el inicio del gen central, en el sentido de su hebra (en
+    hebra "-" se invierte), así los ortólogos quedan alineados en x = 0.
+    groups[i] es la clave de ortología de cada gen de genes (None = sin par).
+    """
+    flip = center["strand"] == "-"
+    origin = center["end"] if flip else center["start"]
+    rows = [(center, ORTHOLOG_KEY)] + list(zip(genes, groups or [None] * len(genes)))
+    rows.sort(key=lambda r: r[0]["start"], reverse=flip)
+    x0 = np.array([origin - g["end"] if flip else g["start"] - origin for g, _ in rows], dtype=np.int64)
+    x1 = np.array([origin - g["start"] if flip else g["end"] - origin for g, _ in rows], dtype=np.int64)
+    return {
+        "label": label,
+        "seqid": center.get("seqid"),
+        "names": [g["gene"] for g, _ in rows],
+        "starts": [g["start"] for g, _ in rows],
+        "ends": [g["end"] for g, _ in rows],
+        # Hebra relativa al gen central: "+" = misma orientación que el ortólogo
+        "same_strand": np.array([(g["strand"] == center["strand"]) for g, _ in rows]),
+        "groups": [key for _, key in rows],
+        "x0": x0,
+        "x1": x1,
+        "center": next(i for i, (g, _) in enumerate(rows) if g is center),
+    }
+
+
+def species_track(annotation, gene_id, label=None, flank_genes=50, window_bp=None, orthogroups_path=None):
+    """Pista de una especie a partir de su anotación; gene_id puede ser un ID de gen o de proteína.
+
+    Sin orthogroups_path se unen los genes con el mismo ID. None si el gen no está en la anotación.
+    """
+    from batch_synteny import gene_orthogroups, load_orthogroups
+    from gene_index_utils import flanking_genes, genes_within, get_gene_index
+    from gff_store_utils import gff_store_path
+    from protein_to_gene_utils import gene_id_from_protein
+    from upload_cache_utils import content_digest
+
+    gene_id = (gene_id or "").strip()
+    if not gene_id:
+        return None
+    db_path = gff_store_path(annotation)
+    gene_id = gene_id_from_protein(db_path, gene_id) or gene_id
+    index = get_gene_index(db_path)
+    if window_bp:
+        center, genes = genes_within(index, gene_id, window_bp)
+    else:
+        center, upstream, downstream = flanking_genes(index, gene_id, flank_genes)
+        genes = (upstream or []) + (downstream or [])
+    if center is None:
+        return None
+
+    names = [g["gene"] for g in genes]
+    groups = names
+    if orthogroups_path:
+        # Por contenido, como la caché de la figura: un TSV editado se vuelve a leer
+        digest = content_digest(orthogroups_path)
+        orthogroups = _orthogroup_maps.get(digest)
+        if orthogroups is None:
+            if len(_orthogroup_maps) >= ORTHOGROUP_MAPS:
+                _orthogroup_maps.pop(next(iter(_orthogroup_maps)))
+            orthogroups = _orthogroup_maps[digest] = load_orthogroups(orthogroups_path)
+        groups = gene_orthogroups(db_path, names, orthogroups)
+    return track_from_genes(label or gene_id, center, genes, groups)
+
+
+def _segments(track, max_segments):
+    """Segmentos a dibujar: un gen por segmento o, con demasiados genes, bloques agrupados.
+
+    Devuelve (x0, x1, etiquetas, same_strand, segmento de cada gen).
+    """
+    n = len(track["names"])
+    if n <= max_segments:
+        labels = [f"{name}<br>{track['seqid']}:{s}-{e}" for name, s, e in zip(track["names"], track["starts"], track["ends"])]
+        return track["x0"], track["x1"], labels, track["same_strand"], np.arange(n)
+
+    # Nivel de detalle: genes agrupados en max_segments bloques de igual ancho; el ortólogo queda solo
+    mid = (track["x0"] + track["x1"]) / 2
+    edges = np.linspace(track["x0"].min(), track["x1"].max(), max_segments)
+    bins = np.digitize(mid, edges)
+    bins[track["center"]] = -1
+    keys, seg = np.unique(bins, return_inverse=True)
+    x0 = np.full(len(keys), np.iinfo(np.int64).max)
+    x1 = np.full(len(keys), np.iinfo(np.int64).min)
+    np.minimum.at(x0, seg, track["x0"])
+    np.maximum.at(x1, seg, track["x1"])
+    counts = np.bincount(seg, minlength=len(keys))
+    plus = np.bincount(seg, weights=track["same_strand"], minlength=len(keys))
+    labels = []
+    for k in range(len(keys)):
+        if keys[k] == -1:
+            i = track["center"]
+            labels.append(f"{track['names'][i]}<br>{track['seqid']}:{track['starts'][i]}-{track['ends'][i]}")
+        else:
+            labels.append(f"{counts[k]} genes")
+    return x0, x1, labels, plus * 2 >= counts, seg
+
+
+def synteny_figure_data(tracks, max_segments=MAX_SEGMENTS):
+    """Coordenadas de todas las trazas (barras de genes por hebra, ortólogos y cintas).
 
+    Cada grupo es un array plano con NaN entre elementos: una sola traza
+    Scattergl por tipo, sin importar cuántas especies o genes haya. Con
+    arrays (no listas) plotly no valida punto a punto al crear la figura.
+    """
+    data = {
+        "labels": [t["label"] for t in tracks],
+        "genes": [len(t["names"]) for t in tracks],
+        "grouped": [len(t["names"]) > max_segments for t in tracks],
+        "same": {"x": [], "y": [], "text": []},
+        "opposite": {"x": [], "y": [], "text": []},
+        "orthologs": {"x": [], "y": [], "text": []},
+        "ribbons": {"x": [], "y": []},
+    }
+    segments = []
+    for k, track in enumerate(tracks):
+        y = -k
+        x0, x1, labels, same, seg = _segments(track, max_segments)
+        segments.append((x0, x1, seg))
+        for a, b, label, s in zip(x0.tolist(), x1.tolist(), labels, np.asarray(same).tolist()):
+            trace = data["same" if s else "opposite"]
+            trace["x"] += [a, b, None]
+            trace["y"] += [y, y, None]
+            trace["text"] += [label, label, None]
+        c = track["center"]
+        data["orthologs"]["x"].append((track["x0"][c] + track["x1"][c]) / 2)
+        data["orthologs"]["y"].append(y)
+        data["orthologs"]["text"].append(f"{track['label']}: {track['names'][c]}")
+
+    # Cintas entre pistas consecutivas: genes con la misma clave de ortología (un par por segmento)
+    for k in range(len(tracks) - 1):
+        upper, lower = tracks[k], tracks[k + 1]
+        by_group = {}
+        for i, group in enumerate(lower["groups"]):
+            if group:
+                by_group.setdefault(group, []).append(i)
+        pairs = set()
+        for i, group in enumerate(upper["groups"]):
+            for j in by_group.get(group, ()) if group else ():
+                pairs.add((int(segments[k][2][i]), int(segments[k + 1][2][j])))
+        ya, yb = -k - GENE_HALF_HEIGHT, -k - 1 + GENE_HALF_HEIGHT
+        (ux0, ux1, _), (lx0, lx1, _) = segments[k], segments[k + 1]
+        for a, b in sorted(pairs):
+            data["ribbons"]["x"] += [int(ux0[a]), int(ux1[a]), int(lx1[b]), int(lx0[b]), int(ux0[a]), None]
+            data["ribbons"]["y"] += [ya, ya, yb, yb, ya, None]
+
+    for trace in ("same", "opposite", "orthologs", "ribbons"):
+        for axis in ("x", "y"):
+            data[trace][axis] = np.array(data[trace][axis], dtype=float)
+        if "text" in data[trace]:
+            data[trace]["text"] = np.array(data[trace]["text"], dtype=object)
+    return data
+
+
+def _cache_key(entries, flank_genes, window_bp, orthogroups_path, max_segments):
+    from upload_cache_utils import content_digest
+
+    species = tuple((label, content_digest(annotation), gene_id) for label, annotation, gene_id in entries)
+    groups = content_digest(orthogroups_path) if orthogroups_path else None
+    return species, flank_genes, window_bp, groups, max_segments
+
+
+def multi_species_data(entries, flank_genes=50, window_bp=None, orthogroups_path=None, max_segments=MAX_SEGMENTS,
+                       progress=None):
+    """Datos de la figura para [(especie, anotación, gen)], calculados una vez por conjunto y ventana.
+
+    Devuelve (datos, especies sin el gen en su anotación).
+    """
+    key = _cache_key(entries, flank_genes, window_bp, orthogroups_path, max_segments)
+    cached = _figure_data_cache.get(key)
+    if cached is not None:
+        return cached
+
+    tracks, missing = [], []
+    for done, (label, annotation, gene_id) in enumerate(entries, start=1):
+        track = species_track(annotation, gene_id, label, flank_genes, window_bp, orthogroups_path)
+        if track is None:
+            missing.append(label)
+        else:
+            tracks.append(track)
+        if progress:
+            progress(done, len(entries))
+    result = (synteny_figure_data(tracks, max_segments), missing)
+
+    if len(_figure_data_cache) >= FIGURE_CACHE_SIZE:
+        _figure_data_cache.pop(next(iter(_figure_data_cache)))
+    _figure_data_cache[key] = result
+    return result
+
+
+@timed
+def synteny_figure(data, title="🧬 Sintenia entre especies"):
+    """Figura WebGL (Scattergl) a partir de synteny_figure_data."""
+    n = len(data["labels"])
+    fig = go.Figure()
+    fig.add_trace(go.Scattergl(
+        x=data["ribbons"]["x"], y=data["ribbons"]["y"], mode="lines", fill="toself",
+        fillcolor="rgba(46, 139, 87, 0.25)", line=dict(width=0), hoverinfo="skip", name="ortólogos",
+    ))
+    for key, color, name in (("same", "#1f77b4", "misma hebra que el ortólogo"), ("opposite", "#ff7f0e", "hebra opuesta")):
+        trace = data[key]
+        fig.add_trace(go.Scattergl(
+            x=trace["x"], y=trace["y"], text=trace["text"], mode="lines", line=dict(width=10, color=color),
+            hovertemplate="%{text}<extra></extra>", name=name,
+        ))
+    fig.add_trace(go.Scattergl(
+        x=data["orthologs"]["x"], y=data["orthologs"]["y"], text=data["orthologs"]["text"], mode="markers",
+        marker=dict(symbol="diamond", size=12, color="crimson"), hovertemplate="%{text}<extra></extra>",
+        name="gen ortólogo",
+    ))
+    ticks = [f"{label} (agrupado)" if grouped else label for label, grouped in zip(data["labels"], data["grouped"])]
     fig.update_layout(
-        title="🧬 Comparación visual de genes vecinos (sintenia)",
-        yaxis=dict(
-            tickvals=[1, 0],
-            ticktext=["Especie A", "Especie B"]
-        ),
-        height=400,
-        showlegend=False
+        title=title,
+        xaxis=dict(title="pb respecto al inicio del ortólogo (en su hebra)", zeroline=False),
+        yaxis=dict(tickvals=[-k for k in range(n)], ticktext=ticks, range=[-n + 0.5, 0.5], fixedrange=True),
+        height=max(300, 150 + 28 * n), dragmode="pan", legend=dict(orientation="h"),
     )
-    return fig
\ No newline at end of file
+    return fig
+
+
+@timed
+def plot_synteny_tracks(center_a, up_a, down_a, center_b, up_b, down_b, shared_genes):
+    # Dos especies a coordenadas reales; las cintas unen los vecinos compartidos
+    tracks = []
+    for label, center, upstream, downstream in (("Especie A", center_a, up_a, down_a),
+                                                 ("Especie B", center_b, up_b, down_b)):
+        genes = list(upstream) + list(downstream)
+        tracks.append(track_from_genes(label, center, genes, [g["gene"] if g["gene"] in shared_genes else None for g in genes]))
+    return synteny_figure(synteny_figure_data(tracks), title="🧬 Comparación visual de genes vecinos (sintenia)")